@@ -0,0 +1,5 @@
+"""
+Whispers of the Undead - Core game modules.
+Subsystems used by main.py (profiling, update pipeline, waves, ...)
+live here so the entry point stays focused on the game itself.
+"""
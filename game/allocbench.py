@@ -0,0 +1,275 @@
+"""
+Allocation Harness
+Measures Python allocations and garbage-collector pauses per frame while a
+wave is in a steady state, headlessly, and fails when a frame allocates
+more than the budget.
+
+Short-lived objects (a Vector2 for a distance check, a Surface for a
+health bar) cost allocator time every frame. Objects that survive the
+frame, or any container the cyclic collector tracks, also count towards
+the next generation 0 collection, and a collection that lands in a frame
+is a pause the player sees. Both are measured, in two consecutive
+windows so tracemalloc's overhead does not inflate the pause times:
+
+    gc       gc.callbacks time every collection; also counts net tracked
+             containers per frame (what fills generation 0)
+    alloc    tracemalloc measures each pipeline system: bytes allocated
+             (its peak above where it started) and bytes kept
+
+The report lists the systems that allocate the most, then the source
+lines whose objects outlived the window. Pixel buffers of Surfaces and
+Fonts live in SDL's own heap and are not seen by tracemalloc; only
+their Python objects are.
+
+The wave is held steady: the player cannot die, enemies are topped back
+up to the target count and an attack is fired every few frames, all
+outside the measured part of the frame. There is no input, so the player
+stands still; the minimap is shown.
+
+    python -m game.allocbench
+    python -m game.allocbench --enemies 60 --frames 300 --budget-kb 32
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+TOP_SITES = 10
+
+
+class GcMonitor:
+    """
+    Times collections with gc.callbacks and counts net tracked containers per frame.
+    """
+    def __init__(self):
+        self.pauses = []            # (generation, ms) for the current frame
+        self.containers = 0         # Net tracked containers created in the current frame
+        self.reference = 0          # Generation 0 count when counting last resumed
+        self.start = 0.0
+
+    def callback(self, phase, info):
+        if phase == "start":
+            self.containers += gc.get_count()[0] - self.reference
+            self.start = time.perf_counter()
+        else:
+            self.pauses.append((info["generation"], (time.perf_counter() - self.start) * 1000))
+            self.reference = gc.get_count()[0]
+
+    def begin_frame(self):
+        self.pauses = []
+        self.containers = 0
+        self.reference = gc.get_count()[0]
+
+    def end_frame(self):
+        self.containers += gc.get_count()[0] - self.reference
+
+    def __enter__(self):
+        gc.callbacks.append(self.callback)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        gc.callbacks.remove(self.callback)
+        return False
+
+
+class AllocationMeter:
+    """
+    Wraps callables so each call records the bytes it allocated and kept under tracemalloc.
+    """
+    def __init__(self):
+        self.allocated = {}         # name -> bytes allocated over the window
+        self.kept = {}              # name -> bytes still held when it returned
+        self.frame_allocated = 0
+        self.overhead = (0, 0)      # What measuring a call allocates and keeps by itself
+
+    def wrap(self, name, function):
+        def measured():
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            function()
+            current, peak = tracemalloc.get_traced_memory()
+            allocated = peak - before - self.overhead[0]
+            self.allocated[name] = self.allocated.get(name, 0) + allocated
+            self.kept[name] = self.kept.get(name, 0) + current - before - self.overhead[1]
+            self.frame_allocated += allocated
+        return measured
+
+    def calibrate(self):
+        """
+        Measures an empty call, so the wrapper's own objects are not charged to systems.
+        tracemalloc must be running.
+        """
+        self.overhead = (0, 0)
+        empty = self.wrap("calibration", lambda: None)
+        empty()
+        self.allocated["calibration"] = self.kept["calibration"] = 0
+        empty()
+        self.overhead = (self.allocated.pop("calibration"), self.kept.pop("calibration"))
+
+
+def system_name(system):
+    """
+    Returns a readable name for a pipeline system (a function or a bound method).
+    """
+    owner = getattr(system, "__self__", None)
+    if owner is not None:
+        return f"{type(owner).__name__}.{system.__name__}"
+    return system.__name__
+
+
+def steady_wave(game, enemies, seed):
+    """
+    Restarts the session without its first wave and fills the castle with
+    `enemies` regular enemies. Returns a function that keeps it that way between frames.
+    """
+    game.session.reset(seed)
+    game.wave_director.clear()
+    enemy_types = (game.Ghoul, game.Vampire, game.Werewolf)
+    spawned = [0]
+
+    def top_up(frame, attack_every):
+        player = game.player
+        player.health = player.max_health
+        while len(game.enemy_group) < enemies:
+            game.add_enemy(game.enemy_pool.acquire(enemy_types[spawned[0] % len(enemy_types)]))
+            spawned[0] += 1
+        if attack_every and frame and frame % attack_every == 0:
+            player.perform_attack()
+    return top_up
+
+
+def run(enemies=60, warmup=120, frames=300, attack_every=10, seed=0):
+    """
+    Runs the warm-up, the gc window and the allocation window and returns the measurements.
+    """
+    from game.headless import load_game
+
+    game = load_game()
+    game.show_minimap = True
+    top_up = steady_wave(game, enemies, seed)
+    meter = AllocationMeter()
+
+    # Every pipeline system, plus the work the game loop does around the pipeline
+    phases = game.pipeline.systems
+    original = {phase: list(systems) for phase, systems in phases.items()}
+    background = meter.wrap("draw_background", lambda: game.render_backend.draw_background(game.camera, game.background))
+    profile_end = meter.wrap("profiler", game.profiler.end_frame)
+
+    def frame():
+        game.profiler.begin_frame()
+        background()
+        game.pipeline.run()
+        profile_end()
+
+    frame_number = 0
+    for _ in range(warmup):
+        top_up(frame_number, attack_every)
+        frame()
+        frame_number += 1
+
+    # gc window: no tracemalloc
+    monitor = GcMonitor()
+    gc_frames = []
+    with monitor:
+        for _ in range(frames):
+            top_up(frame_number, attack_every)
+            monitor.begin_frame()
+            start = time.perf_counter()
+            frame()
+            frame_ms = (time.perf_counter() - start) * 1000
+            monitor.end_frame()
+            gc_frames.append((frame_ms, monitor.containers, monitor.pauses))
+            frame_number += 1
+
+    # Allocation window: every system wrapped
+    for phase, systems in phases.items():
+        phases[phase] = [meter.wrap(system_name(system), system) for system in systems]
+    tracemalloc.start()
+    try:
+        meter.calibrate()
+        top_up(frame_number, attack_every)
+        frame()
+        frame_number += 1
+        meter.allocated.clear()
+        meter.kept.clear()
+        first = tracemalloc.take_snapshot()
+        allocation_frames = []
+        for _ in range(frames):
+            top_up(frame_number, attack_every)
+            meter.frame_allocated = 0
+            before = tracemalloc.get_traced_memory()[0]
+            frame()
+            allocation_frames.append((meter.frame_allocated, tracemalloc.get_traced_memory()[0] - before))
+            frame_number += 1
+        last = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+        phases.update(original)
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    growth = [stat for stat in last.filter_traces(filters).compare_to(first.filter_traces(filters), "lineno")
+              if stat.size_diff > 0]
+    return gc_frames, allocation_frames, meter, growth
+
+
+def percentile(values, fraction):
+    """
+    Returns the value below which the given fraction of the sorted values fall.
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(gc_frames, allocation_frames, meter, growth):
+    """
+    Prints the measurements. Returns the 95th-percentile bytes allocated per frame.
+    """
+    frames = len(gc_frames)
+    pauses = [pause for _, _, frame_pauses in gc_frames for pause in frame_pauses]
+    paused_frames = sum(1 for _, _, frame_pauses in gc_frames if frame_pauses)
+    frame_ms = sum(ms for ms, _, _ in gc_frames)
+    pause_ms = sum(ms for _, ms in pauses)
+    containers = sum(count for _, count, _ in gc_frames) / frames
+    print(f"gc window ({frames} frames)")
+    print(f"  frame time          {frame_ms / frames:8.2f} ms mean")
+    print(f"  tracked containers  {containers:8.1f} net per frame")
+    for generation in range(3):
+        times = [ms for collected, ms in pauses if collected == generation]
+        longest = max(times) if times else 0.0
+        print(f"  gen {generation} collections    {len(times):8d}   {sum(times):7.2f} ms total  {longest:6.2f} ms max")
+    print(f"  frames with a pause {paused_frames:8d}   {pause_ms / frame_ms * 100:7.2f} % of frame time")
+
+    allocated = [bytes_allocated for bytes_allocated, _ in allocation_frames]
+    kept = sum(bytes_kept for _, bytes_kept in allocation_frames) / frames
+    print(f"allocation window ({frames} frames)")
+    print(f"  allocated per frame {sum(allocated) / frames / 1024:8.1f} KiB mean  "
+          f"{percentile(allocated, 0.95) / 1024:.1f} KiB p95  {max(allocated) / 1024:.1f} KiB max")
+    print(f"  kept per frame      {kept / 1024:8.2f} KiB mean")
+    print(f"{'system':>32}{'KiB/frame':>11}{'kept B/frame':>14}")
+    for name, total in sorted(meter.allocated.items(), key=lambda item: -item[1]):
+        print(f"{name:>32}{total / frames / 1024:>11.2f}{meter.kept[name] / frames:>14.1f}")
+    print(f"objects that outlived the window (top {TOP_SITES} lines)")
+    for stat in growth[:TOP_SITES]:
+        frame = stat.traceback[0]
+        print(f"  {stat.size_diff / frames:>9.1f} B/frame {stat.count_diff:>6d} blocks  {frame.filename}:{frame.lineno}")
+    return percentile(allocated, 0.95)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure per-frame allocations and GC pauses in a steady wave.")
+    parser.add_argument("--enemies", type=int, default=60)
+    parser.add_argument("--warmup", type=int, default=120)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--attack-every", type=int, default=10, help="Frames between attacks (0 for none)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget-kb", type=float, default=32.0,
+                        help="Fail if the 95th-percentile frame allocates more KiB than this (0 disables the check)")
+    args = parser.parse_args()
+
+    p95 = report(*run(args.enemies, args.warmup, args.frames, args.attack_every, args.seed))
+    if args.budget_kb and p95 > args.budget_kb * 1024:
+        print(f"FAILED: frames allocate {p95 / 1024:.1f} KiB at the 95th percentile, over the {args.budget_kb:g} KiB budget")
+        sys.exit(1)
+    print(f"OK: frames allocate {p95 / 1024:.1f} KiB at the 95th percentile, within the {args.budget_kb:g} KiB budget")
@@ -0,0 +1,80 @@
+"""
+Camera
+Scrolling view over a world that may be larger than the window.
+Sprites are kept in world coordinates; the camera converts them to screen
+coordinates when drawing and skips anything outside the view.
+"""
+
+import pygame
+
+
+class Camera:
+    """
+    Tracks the visible part of the world and draws only what intersects it.
+    """
+    def __init__(self, view_width, view_height, world_width, world_height):
+        self.view = pygame.Rect(0, 0, view_width, view_height)
+        self.world_width = world_width
+        self.world_height = world_height
+        self.drawn = 0          # Sprites drawn last frame
+        self.culled = 0         # Sprites skipped last frame
+
+    @property
+    def offset(self):
+        """
+        Top-left corner of the view in world coordinates.
+        """
+        return self.view.topleft
+
+    def follow(self, position):
+        """
+        Centres the view on a world position, clamped to the world edges.
+        """
+        self.view.center = (int(position[0]), int(position[1]))
+        self.view.clamp_ip(pygame.Rect(0, 0, max(self.world_width, self.view.width),
+                                       max(self.world_height, self.view.height)))
+
+    def is_visible(self, rect):
+        """
+        Returns True if a world-space rect intersects the view.
+        """
+        return self.view.colliderect(rect)
+
+    def to_screen(self, position):
+        """
+        Converts a world position to screen coordinates.
+        """
+        return position[0] - self.view.x, position[1] - self.view.y
+
+    def to_world(self, position):
+        """
+        Converts a screen position (e.g. the mouse) to world coordinates.
+        """
+        return position[0] + self.view.x, position[1] + self.view.y
+
+    def apply(self, rect):
+        """
+        Returns a copy of a world-space rect moved into screen space.
+        """
+        return rect.move(-self.view.x, -self.view.y)
+
+    def draw_background(self, surface, background):
+        """
+        Blits the visible part of a world-sized background.
+        """
+        surface.blit(background, (0, 0), self.view)
+
+    def draw_group(self, surface, group):
+        """
+        Blits every sprite in the group that intersects the view.
+        """
+        view = self.view
+        view_x, view_y = view.x, view.y
+        drawn = 0
+        for sprite in group:
+            rect = sprite.rect
+            if view.colliderect(rect):
+                surface.blit(sprite.image, (rect.x - view_x, rect.y - view_y))
+                drawn += 1
+        self.drawn = drawn
+        self.culled = len(group) - drawn
@@ -0,0 +1,307 @@
+"""
+Clearance Map
+Path queries for enemies of different sizes over one walkability grid.
+
+An enemy's position on the grid is the cell under its top-left corner
+(the point steering tests), and its size class is how many cells its
+unrotated image spans. A size-k enemy fits at a cell when the k x k block
+of cells starting there is walkable. The clearance of a cell is the
+largest k that fits, so a size-k query treats every cell with clearance
+below k as blocked. Clearance is a distance transform, built in one pass
+from the bottom-right corner:
+
+    clearance[y][x] = 1 + min(right, below, below-right)    walkable cells
+                      0                                      blocked cells
+
+When the grid's version changes (chunks streamed in or out), only the
+streamed regions are recomputed, plus the cells above and to the left
+of them whose clearance actually changes; flow fields that never reached
+those cells are kept. Without a list of changed regions the whole map is
+rebuilt.
+
+Paths come from flow fields: a breadth-first distance map from the goal
+over the size class's cells. Every enemy of that size chasing the same
+goal cell walks down the same field, so one field replaces an A* search
+per enemy. The most recently used fields are kept per (size, goal).
+Results are string-pulled against the size class's grid (game/pathing.py).
+
+    clearance = ClearanceMap(tile_map.grid)
+    clearance.sync(tile_map.version, tile_map.changes_since(clearance.version))
+    path = clearance.find_path(size, start_cell, player_cell)
+"""
+
+import math
+from array import array
+from collections import OrderedDict, deque
+
+from game.pathing import MOVES, string_pull
+
+MAX_CLEARANCE = 255
+UNREACHED = 0xFFFF
+ESCAPE_REACH = 3            # Cells beyond its size an agent stuck in a wall looks for open space
+
+
+def size_class(width, height, cell_size):
+    """
+    Returns how many grid cells a sprite of this size spans (at least 1).
+    """
+    return max(1, math.ceil(max(width, height) / cell_size))
+
+
+def block_origin(center_x, center_y, size, cell_size):
+    """
+    Returns the world position of the centre of the top-left cell of a
+    size x size block of cells centred on a sprite. Paths are planned and
+    followed from this point, so the block stays under the sprite; it only
+    depends on the sprite's centre, which rotating its image does not move.
+    """
+    offset = (size - 1) * cell_size / 2
+    return center_x - offset, center_y - offset
+
+
+class FlowField:
+    """
+    Breadth-first step counts from the goal cell to every cell a size class can reach.
+    """
+    __slots__ = ("goal", "columns", "distance")
+
+    def __init__(self, grid, goal):
+        rows = len(grid)
+        columns = len(grid[0])
+        self.goal = goal
+        self.columns = columns
+        distance = array("H", [UNREACHED]) * (columns * rows)
+        goal_x, goal_y = goal
+        distance[goal_y * columns + goal_x] = 0
+        frontier = deque([goal])
+        while frontier:
+            x, y = frontier.popleft()
+            next_distance = distance[y * columns + x] + 1
+            for move_x, move_y in MOVES:
+                new_x = x + move_x
+                new_y = y + move_y
+                if 0 <= new_x < columns and 0 <= new_y < rows and not grid[new_y][new_x]:
+                    index = new_y * columns + new_x
+                    if distance[index] == UNREACHED:
+                        distance[index] = next_distance
+                        frontier.append((new_x, new_y))
+        self.distance = distance
+
+    def touches(self, left, top, right, bottom):
+        """
+        Returns True if any cell in the inclusive rect (clipped to the grid) was reached.
+        """
+        columns = self.columns
+        distance = self.distance
+        rows = len(distance) // columns
+        left = max(0, left)
+        right = min(columns - 1, right)
+        for y in range(max(0, top), min(rows - 1, bottom) + 1):
+            cells = distance[y * columns + left:y * columns + right + 1]
+            if cells.count(UNREACHED) != len(cells):
+                return True
+        return False
+
+    def reaches(self, cell):
+        """
+        Returns True if the goal can be reached from the cell.
+        """
+        x, y = cell
+        return self.distance[y * self.columns + x] != UNREACHED
+
+    def path_from(self, start):
+        """
+        Returns the cells from start down to the goal as a flat x, y array('h').
+        start must be reachable.
+        """
+        columns = self.columns
+        distance = self.distance
+        rows = len(distance) // columns
+        x, y = start
+        path = array("h", (x, y))
+        remaining = distance[y * columns + x]
+        while remaining:
+            for move_x, move_y in MOVES:
+                new_x = x + move_x
+                new_y = y + move_y
+                if 0 <= new_x < columns and 0 <= new_y < rows and distance[new_y * columns + new_x] == remaining - 1:
+                    x, y = new_x, new_y
+                    break
+            remaining -= 1
+            path.append(x)
+            path.append(y)
+        return path
+
+
+class ClearanceMap:
+    """
+    Clearance per cell, per-size blocked grids and cached flow fields for one walkability grid.
+    grid is indexed grid[y][x] and is truthy for blocked cells; it may change between syncs.
+    """
+    def __init__(self, grid, max_fields=16):
+        self.grid = grid
+        self.version = None
+        self.clearance = []                 # Rows of bytearray, capped at MAX_CLEARANCE
+        self.size_grids = {}                # size -> rows of bytearray, 1 = too tight for that size
+        self.fields = OrderedDict()         # (size, goal) -> FlowField, least recently used first
+        self.max_fields = max_fields
+        self.fields_built = 0
+        self.fields_reused = 0
+
+    def sync(self, version, changes=None):
+        """
+        Brings the clearance map up to date with the grid at `version`.
+        changes lists the grid regions written since the last sync as
+        (column, row, columns, rows); without it everything is rebuilt.
+        """
+        if version == self.version:
+            return
+        if changes is None or self.version is None:
+            self.rebuild()
+        else:
+            for region in changes:
+                self.update(region)
+        self.version = version
+
+    def rebuild(self):
+        """
+        Recomputes the whole clearance map and drops every size grid and flow field.
+        """
+        grid = self.grid
+        rows = len(grid)
+        columns = len(grid[0]) if rows else 0
+        clearance = [bytearray(columns + 1) for _ in range(rows + 1)]     # Zero border below and right
+        for y in range(rows - 1, -1, -1):
+            grid_row = grid[y]
+            row = clearance[y]
+            below = clearance[y + 1]
+            for x in range(columns - 1, -1, -1):
+                if not grid_row[x]:
+                    row[x] = min(MAX_CLEARANCE, 1 + min(row[x + 1], below[x], below[x + 1]))
+        self.clearance = clearance
+        self.size_grids.clear()
+        self.fields.clear()
+
+    def update(self, region):
+        """
+        Recomputes clearance for a changed grid region. Clearance only depends
+        on cells to the right and below, so rows are walked upwards from the
+        region's bottom and each row leftwards from its right edge, stopping
+        once a row (above the region) or a run of cells (left of it) is unchanged.
+        Size grids are patched and flow fields that reached a changed cell dropped.
+        """
+        grid = self.grid
+        clearance = self.clearance
+        rows = len(clearance) - 1
+        columns = len(clearance[0]) - 1
+        left, top, width, height = region
+        right = min(columns, left + width)
+        bottom = min(rows, top + height)
+        left = max(0, left)
+        top = max(0, top)
+        if left >= right or top >= bottom:
+            return
+        changed_left = changed_top = changed_right = changed_bottom = None
+        below_changed = None                # Leftmost changed column in the row below
+        for y in range(bottom - 1, -1, -1):
+            required = left if y >= top else None
+            if below_changed is not None:
+                required = below_changed - 1 if required is None else min(required, below_changed - 1)
+            if required is None:
+                break
+            grid_row = grid[y]
+            row = clearance[y]
+            below = clearance[y + 1]
+            below_changed = None
+            for x in range(right - 1, -1, -1):
+                value = 0 if grid_row[x] else min(MAX_CLEARANCE, 1 + min(row[x + 1], below[x], below[x + 1]))
+                if value != row[x]:
+                    row[x] = value
+                    below_changed = x
+                    if changed_right is None or x > changed_right:
+                        changed_right = x
+                elif x < required:
+                    break
+            if below_changed is not None:
+                changed_top = y
+                changed_left = below_changed if changed_left is None else min(changed_left, below_changed)
+                if changed_bottom is None:
+                    changed_bottom = y
+        if changed_top is None:
+            return
+
+        for size, size_grid in self.size_grids.items():
+            table = bytes(1 if value < size else 0 for value in range(256))
+            for y in range(changed_top, changed_bottom + 1):
+                size_grid[y] = clearance[y][:-1].translate(table)
+        # A field changes if a changed cell was reached or borders one that was
+        for key in [key for key, field in self.fields.items()
+                    if field.touches(changed_left - 1, changed_top - 1, changed_right + 1, changed_bottom + 1)]:
+            del self.fields[key]
+
+    def fits(self, x, y, size):
+        """
+        Returns True if a size-`size` agent fits with its top-left in cell (x, y).
+        """
+        clearance = self.clearance
+        return 0 <= y < len(clearance) - 1 and 0 <= x < len(clearance[0]) - 1 and clearance[y][x] >= size
+
+    def grid_for(self, size):
+        """
+        Returns the blocked-cell grid for a size class, indexed like the walkability grid.
+        """
+        if size <= 1:
+            return self.grid
+        size_grid = self.size_grids.get(size)
+        if size_grid is None:
+            # Map each clearance value to 1 (blocked) or 0 in one pass per row
+            table = bytes(1 if value < size else 0 for value in range(256))
+            size_grid = [row[:-1].translate(table) for row in self.clearance[:-1]]
+            self.size_grids[size] = size_grid
+        return size_grid
+
+    def nearest_fit(self, cell, size, reach=None):
+        """
+        Returns the closest cell (in rings of growing radius, up to `reach`
+        cells away, `size` by default) where the agent fits, or None.
+        """
+        x, y = cell
+        for radius in range((size if reach is None else reach) + 1):
+            for offset_y in range(-radius, radius + 1):
+                for offset_x in range(-radius, radius + 1):
+                    if max(abs(offset_x), abs(offset_y)) == radius and self.fits(x + offset_x, y + offset_y, size):
+                        return x + offset_x, y + offset_y
+        return None
+
+    def flow_field(self, size, goal):
+        """
+        Returns the flow field towards a goal cell for a size class, building it on first use.
+        """
+        key = (size, goal)
+        field = self.fields.get(key)
+        if field is not None:
+            self.fields.move_to_end(key)
+            self.fields_reused += 1
+            return field
+        field = FlowField(self.grid_for(size), goal)
+        self.fields[key] = field
+        self.fields_built += 1
+        if len(self.fields) > self.max_fields:
+            self.fields.popitem(last=False)
+        return field
+
+    def find_path(self, size, start, target):
+        """
+        Returns waypoints for a size-`size` agent whose top-left is in the
+        start cell to centre itself on the target cell, as a flat x, y
+        array('h') of top-left cells, or an empty array if it cannot get there.
+        """
+        offset = (size - 1) // 2
+        goal = self.nearest_fit((target[0] - offset, target[1] - offset), size)
+        start = self.nearest_fit(start, size)
+        if goal is None or start is None:
+            return array("h")
+        field = self.flow_field(size, goal)
+        if not field.reaches(start):
+            return array("h")
+        return string_pull(field.path_from(start), self.grid_for(size))
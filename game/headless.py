@@ -0,0 +1,117 @@
+"""
+Headless Harness
+Loads main.py with SDL's dummy video/audio drivers so the game can be
+stepped frame by frame without a window, sound card or menu.
+
+Run directly to check that the update pipeline updates every entity
+exactly once per frame, and that the boss can still reach the player
+from another room:
+
+    python -m game.headless
+"""
+
+import math
+import os
+import sys
+
+
+def load_game():
+    """
+    Imports main.py with dummy SDL drivers and returns the module.
+    The game loop only runs when main.py is the entry point, so importing
+    it just builds the player, sprite groups and first wave.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import main
+    main.HEADLESS = True
+    return main
+
+
+def run_frames(game, frames, render=False):
+    """
+    Steps the update pipeline for the given number of frames.
+    """
+    for _ in range(frames):
+        game.pipeline.run(render=render)
+
+
+def count_updates(game, frames=120, attack_every=10):
+    """
+    Steps the pipeline while counting update() calls per sprite.
+    Fires an attack and drops a blood pickup every attack_every frames so
+    projectiles and pickups are exercised alongside enemies.
+    Returns a list of (frame, sprite, count) for every sprite that was not
+    updated exactly once.
+    """
+    counts = {}
+
+    def counted(sprite):
+        update = type(sprite).update.__get__(sprite)
+
+        def wrapper(*args, **kwargs):
+            counts[sprite] = counts.get(sprite, 0) + 1
+            return update(*args, **kwargs)
+        sprite.update = wrapper
+
+    failures = []
+    for frame in range(frames):
+        if frame > 0 and frame % attack_every == 0:
+            game.player.perform_attack()
+            drop = game.BloodDrop(game.player.pos.x + 200, game.player.pos.y, 5)
+            game.pickup_group.add(drop)
+            game.all_sprites_group.add(drop)
+
+        alive = game.all_sprites_group.sprites()
+        counts.clear()
+        for sprite in alive:
+            if "update" not in sprite.__dict__:
+                counted(sprite)
+
+        game.pipeline.run(render=False)
+
+        for sprite in alive:
+            if counts.get(sprite, 0) != 1:
+                failures.append((frame, sprite, counts.get(sprite, 0)))
+    return failures
+
+
+def boss_chase(game, frames=900, seed=0):
+    """
+    Starts a seeded run with the boss in its chasing phase at its spawn point,
+    in another room from the player, and steps the pipeline with the player
+    standing still and invincible. Returns the boss's distance to the player
+    at the start and the closest it got.
+    """
+    game.session.reset(seed)
+    boss = game.VampireLord()
+    boss.health = 4
+    boss.phase = 2
+    boss.apply_phase_image(2)
+    game.add_enemy(boss)
+    boss.update()                       # Spawns at the level's boss spawn
+    player = game.player
+    player.invincible = True
+    player.invincibility_timer = frames + 1
+    start = closest = math.dist(boss.rect.center, player.pos)
+    for _ in range(frames):
+        game.pipeline.run(render=False)
+        closest = min(closest, math.dist(boss.rect.center, player.pos))
+    return start, closest
+
+
+if __name__ == "__main__":
+    game = load_game()
+    failures = count_updates(game)
+    for frame, sprite, count in failures[:20]:
+        print(f"frame {frame}: {type(sprite).__name__} updated {count} times")
+    if failures:
+        print(f"FAILED: {len(failures)} sprite updates were not exactly once per frame")
+        sys.exit(1)
+    print("OK: every sprite was updated exactly once per frame")
+
+    start, closest = boss_chase(game)
+    if closest > start / 2:
+        print(f"FAILED: the boss only closed from {start:.0f} to {closest:.0f} px of the player")
+        sys.exit(1)
+    print(f"OK: the boss closed from {start:.0f} to {closest:.0f} px of the player")
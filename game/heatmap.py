@@ -0,0 +1,230 @@
+"""
+Heatmaps
+Counts where things happen on the level's walkability grid (one cell per
+tile, 15 px on the castle map), so room layouts and spawn zones can be
+tuned from many runs instead of one playthrough.
+
+Layers:
+    player          frames the player spent in each cell
+    enemies         enemy-frames spent in each cell
+    enemy_deaths    where enemies were killed
+    player_damage   where the player took a hit
+    player_deaths   where the player died
+
+Recording is a bounds check and an array increment per sample, and does
+nothing while the heatmap is disabled. Heatmaps from separate runs or
+processes are merged by adding their counts; the binary file format lets
+batch runs on different machines be combined later.
+
+    python main.py --heatmap run.heat
+    python -m game.simulate --runs 64 --heatmap balance.heat
+    python -m game.heatmap merge a.heat b.heat --out all.heat
+    python -m game.heatmap render all.heat --out heatmaps/
+"""
+
+import argparse
+import math
+import os
+import struct
+from array import array
+
+import pygame
+
+LAYERS = ("player", "enemies", "enemy_deaths", "player_damage", "player_deaths")
+MAGIC = b"WUHEAT"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<6sHHHHHII32s")     # magic, version, columns, rows, tile size, layers, frames, runs, level
+
+# Colour ramp for rendered layers, cold to hot
+RAMP = ((0, 0, 255), (0, 255, 255), (0, 255, 0), (255, 255, 0), (255, 0, 0))
+
+
+class Heatmap:
+    """
+    One counter array per layer over a columns x rows grid of tile_size cells.
+    """
+    def __init__(self, columns, rows, tile_size=15, level="level"):
+        self.columns = columns
+        self.rows = rows
+        self.tile_size = tile_size
+        self.level = level
+        self.layers = {name: array("I", bytes(4 * columns * rows)) for name in LAYERS}
+        self.frames = 0                     # Frames recorded
+        self.runs = 0                       # Runs merged into this heatmap
+        self.enabled = False
+
+    @classmethod
+    def for_tile_map(cls, tile_map):
+        """
+        Returns an empty heatmap matching a tile map's grid.
+        """
+        return cls(tile_map.columns, tile_map.rows, tile_map.tile_size, tile_map.name)
+
+    def clear(self):
+        """
+        Zeroes every layer.
+        """
+        for name in LAYERS:
+            self.layers[name] = array("I", bytes(4 * self.columns * self.rows))
+        self.frames = 0
+        self.runs = 0
+
+    def add(self, layer, position, amount=1):
+        """
+        Adds to the cell containing a world position.
+        """
+        if not self.enabled:
+            return
+        column = int(position[0] // self.tile_size)
+        row = int(position[1] // self.tile_size)
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            self.layers[layer][row * self.columns + column] += amount
+
+    def record_frame(self, player_position, enemies):
+        """
+        Adds one frame of occupancy for the player and every spawned enemy.
+        """
+        if not self.enabled:
+            return
+        self.frames += 1
+        self.add("player", player_position)
+        counts = self.layers["enemies"]
+        size = self.tile_size
+        columns = self.columns
+        rows = self.rows
+        for enemy in enemies:
+            if enemy.spawned:
+                x, y = enemy.rect.center
+                column = x // size
+                row = y // size
+                if 0 <= column < columns and 0 <= row < rows:
+                    counts[row * columns + column] += 1
+
+    def merge(self, other):
+        """
+        Adds another heatmap's counts into this one. Grids must match.
+        """
+        if (other.columns, other.rows, other.tile_size) != (self.columns, self.rows, self.tile_size):
+            raise ValueError(f"Cannot merge a {other.columns}x{other.rows} heatmap into {self.columns}x{self.rows}")
+        for name in LAYERS:
+            counts = self.layers[name]
+            for index, value in enumerate(other.layers[name]):
+                if value:
+                    counts[index] += value
+        self.frames += other.frames
+        self.runs += other.runs
+
+    def to_bytes(self):
+        """
+        Returns the heatmap in its binary file format.
+        """
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, self.columns, self.rows, self.tile_size, len(LAYERS),
+                             self.frames, self.runs, self.level.encode()[:32])
+        return header + b"".join(self.layers[name].tobytes() for name in LAYERS)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Reads a heatmap written by to_bytes().
+        """
+        magic, version, columns, rows, tile_size, layer_count, frames, runs, level = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or layer_count != len(LAYERS):
+            raise ValueError("Not a heatmap file or unsupported version")
+        heatmap = cls(columns, rows, tile_size, level.rstrip(b"\0").decode())
+        heatmap.frames = frames
+        heatmap.runs = runs
+        offset = HEADER.size
+        size = 4 * columns * rows
+        for name in LAYERS:
+            heatmap.layers[name] = array("I", data[offset:offset + size])
+            offset += size
+        return heatmap
+
+    def save(self, path):
+        """
+        Writes the heatmap to a file.
+        """
+        with open(path, "wb") as heatmap_file:
+            heatmap_file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a heatmap file.
+        """
+        with open(path, "rb") as heatmap_file:
+            return cls.from_bytes(heatmap_file.read())
+
+    def render(self, layer, background=None, world_size=None, alpha=170):
+        """
+        Returns a world-sized surface with the layer drawn as coloured cells,
+        over the background if one is given. Counts are log-scaled so a few
+        very busy cells do not wash out the rest.
+        world_size is the level's size in pixels; the grid rounds it up to
+        whole cells, so the background is scaled to the world (as the game
+        draws it) and the last row and column of cells are clipped.
+        """
+        size = self.tile_size
+        surface = pygame.Surface(world_size or (self.columns * size, self.rows * size), pygame.SRCALPHA)
+        if background is not None:
+            surface.blit(pygame.transform.scale(background, surface.get_size()), (0, 0))
+        counts = self.layers[layer]
+        peak = math.log1p(max(counts, default=0))
+        if peak == 0:
+            return surface
+
+        cells = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+        for index, value in enumerate(counts):
+            if value:
+                row, column = divmod(index, self.columns)
+                cells.fill(ramp_color(math.log1p(value) / peak) + (alpha,), (column * size, row * size, size, size))
+        surface.blit(cells, (0, 0))
+        return surface
+
+
+def ramp_color(level):
+    """
+    Maps 0..1 onto the cold-to-hot colour ramp.
+    """
+    position = min(max(level, 0.0), 1.0) * (len(RAMP) - 1)
+    index = min(int(position), len(RAMP) - 2)
+    blend = position - index
+    start, end = RAMP[index], RAMP[index + 1]
+    return tuple(int(a + (b - a) * blend) for a, b in zip(start, end))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge and render gameplay heatmaps.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    merge_parser = commands.add_parser("merge", help="Add several heatmap files together")
+    merge_parser.add_argument("inputs", nargs="+")
+    merge_parser.add_argument("--out", required=True)
+    render_parser = commands.add_parser("render", help="Write one PNG per layer over the level background")
+    render_parser.add_argument("input")
+    render_parser.add_argument("--out", default="heatmaps")
+    render_parser.add_argument("--background", help="Image to draw under the heatmap "
+                                                    "(default: the level's background)")
+    args = parser.parse_args()
+
+    if args.command == "merge":
+        merged = Heatmap.load(args.inputs[0])
+        for path in args.inputs[1:]:
+            merged.merge(Heatmap.load(path))
+        merged.save(args.out)
+        print(f"Merged {len(args.inputs)} files ({merged.runs} runs, {merged.frames} frames) into {args.out}")
+    else:
+        import json
+
+        heatmap = Heatmap.load(args.input)
+        level_path = f"levels/{heatmap.level}.json"
+        level = {}
+        if args.background is None or os.path.exists(level_path):
+            with open(level_path) as level_file:
+                level = json.load(level_file)
+        background = pygame.image.load(args.background or level["background"])
+        world_size = level.get("size")
+        os.makedirs(args.out, exist_ok=True)
+        for name in LAYERS:
+            path = os.path.join(args.out, f"{heatmap.level}-{name}.png")
+            pygame.image.save(heatmap.render(name, background, world_size), path)
+            print(f"{name:<14}{sum(heatmap.layers[name]):>10} samples -> {path}")
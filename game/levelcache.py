@@ -0,0 +1,141 @@
+"""
+Level Cache
+Compiled walkability grids stored on disk so a level is only sampled once.
+
+Each level compiles to a bit-packed file in .level_cache/ named after a
+content hash of its geometry (size, rooms, obstacles, tile and chunk size).
+Editing a level changes the hash, so stale caches are never read. Files are
+opened with mmap, so every process running the same level (e.g. the batch
+simulator's workers) shares one copy of the pages.
+
+File layout (little-endian):
+    header   magic, format version, columns, rows, chunk_tiles,
+             chunk_columns, chunk_rows, 20-byte SHA-1 of the geometry
+    chunks   one block per chunk in row-major chunk order; each block holds
+             chunk_tiles * chunk_tiles walkable bits, row-major, LSB first
+
+Prebuild caches for every level with:
+
+    python -m game.levelcache levels/*.json
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+CACHE_DIR = ".level_cache"
+MAGIC = b"WUGRID"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<6sHIIHII20s")
+
+# Byte value -> the 8 walkable flags it packs, for fast unpacking
+_UNPACK = [bytes((value >> bit) & 1 for bit in range(8)) for value in range(256)]
+
+
+def geometry_hash(tile_map):
+    """
+    Returns a SHA-1 digest of everything that affects the compiled grid.
+    """
+    geometry = {
+        "version": FORMAT_VERSION,
+        "size": [tile_map.width, tile_map.height],
+        "tile_size": tile_map.tile_size,
+        "chunk_tiles": tile_map.chunk_tiles,
+        "rooms": sorted([name, list(rect)] for name, rect in tile_map.rooms.items()),
+        "obstacles": [list(rect) for rect in tile_map.obstacles],
+    }
+    return hashlib.sha1(json.dumps(geometry, sort_keys=True).encode()).digest()
+
+
+def cache_path(tile_map, digest, cache_dir=CACHE_DIR):
+    """
+    Returns the cache file path for a level and geometry hash.
+    """
+    return os.path.join(cache_dir, f"{tile_map.name}-{digest.hex()[:16]}.grid")
+
+
+def pack_chunk(walkable):
+    """
+    Packs a bytearray of 0/1 flags into bits, LSB first.
+    """
+    packed = bytearray((len(walkable) + 7) // 8)
+    for index, flag in enumerate(walkable):
+        if flag:
+            packed[index >> 3] |= 1 << (index & 7)
+    return packed
+
+
+def build_cache(tile_map, path, digest):
+    """
+    Compiles every chunk of the level and writes the cache file.
+    Writes to a temporary file first so concurrent processes never read a partial cache.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as cache_file:
+        cache_file.write(HEADER.pack(MAGIC, FORMAT_VERSION, tile_map.columns, tile_map.rows,
+                                     tile_map.chunk_tiles, tile_map.chunk_columns, tile_map.chunk_rows, digest))
+        for cy in range(tile_map.chunk_rows):
+            for cx in range(tile_map.chunk_columns):
+                cache_file.write(pack_chunk(tile_map.compile_chunk((cx, cy))))
+    os.replace(temp_path, path)
+
+
+class LevelCache:
+    """
+    Read-only, memory-mapped view of a compiled level grid.
+    """
+    def __init__(self, path, digest):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        header = HEADER.unpack_from(self.data, 0)
+        magic, version, self.columns, self.rows, self.chunk_tiles, self.chunk_columns, self.chunk_rows, stored = header
+        if magic != MAGIC or version != FORMAT_VERSION or stored != digest:
+            self.close()
+            raise ValueError(f"Level cache {path} does not match the level")
+        self.chunk_bytes = (self.chunk_tiles * self.chunk_tiles + 7) // 8
+
+    @classmethod
+    def for_tile_map(cls, tile_map, cache_dir=CACHE_DIR):
+        """
+        Opens the cache for a tile map, building it first if it is missing or stale.
+        """
+        digest = geometry_hash(tile_map)
+        path = cache_path(tile_map, digest, cache_dir)
+        if os.path.exists(path):
+            try:
+                return cls(path, digest)
+            except (ValueError, struct.error):
+                pass
+        build_cache(tile_map, path, digest)
+        return cls(path, digest)
+
+    def chunk(self, key):
+        """
+        Returns a chunk's walkable flags as a bytearray, unpacked from the mapped file.
+        """
+        offset = HEADER.size + (key[1] * self.chunk_columns + key[0]) * self.chunk_bytes
+        packed = self.data[offset:offset + self.chunk_bytes]
+        cells = self.chunk_tiles * self.chunk_tiles
+        return bytearray(b"".join([_UNPACK[value] for value in packed])[:cells])
+
+    def close(self):
+        """
+        Releases the memory map and file handle.
+        """
+        self.data.close()
+        self.file.close()
+
+
+if __name__ == "__main__":
+    from game.tilemap import TileMap
+
+    for level_path in sys.argv[1:]:
+        tile_map = TileMap.load(level_path)
+        digest = geometry_hash(tile_map)
+        path = cache_path(tile_map, digest)
+        build_cache(tile_map, path, digest)
+        print(f"{level_path} -> {path} ({os.path.getsize(path)} bytes)")
@@ -0,0 +1,184 @@
+"""
+Lighting
+A darkness layer with torchlight around the player and glowing projectiles.
+
+Per-pixel lighting in Python is far too slow, so lights are built from
+pre-rendered radial masks: one RGB surface per (radius, intensity,
+colour), drawn once and cached, bright in the middle and black at the
+edge. Each frame the game adds its lights in screen space, then
+apply() does two things:
+
+    light map   a reused, screen-sized surface holding the ambient
+                colour plus every light, summed with BLEND_ADD
+    darkness    the screen is multiplied by the light map
+                (BLEND_MULT), so unlit areas take the ambient colour
+                and lit areas keep their own
+
+Only regions whose light changed since the last frame are rebuilt in the
+light map: the rects of lights that moved, appeared or went out (old and
+new position), with overlapping rects merged. Each such region is
+refilled with the ambient colour and every light touching it is added
+back. A still scene with a still camera rebuilds nothing; the final
+multiply always covers the whole screen.
+
+`cost` is the number of light-map pixels rebuilt in the last frame and is
+reported to the profiler as the "light_pixels" counter.
+
+    python main.py --lighting
+    python -m game.lighting --lights 1 10 50
+"""
+
+import argparse
+import os
+import time
+
+import pygame
+
+from game.profiler import profiler
+
+AMBIENT = (55, 50, 70)          # Colour of unlit areas: a cold, dim blue
+RADIUS_STEP = 4                 # Radii are rounded to this many pixels, so masks are shared
+INTENSITY_STEPS = 16            # Intensities are rounded to 1/16
+
+
+def merge_regions(rects):
+    """
+    Returns rects covering the same area with overlapping ones merged into their union.
+    """
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        index = rect.collidelist(merged)
+        while index >= 0:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class LightingLayer:
+    """
+    Cached light masks, a reused light map and dirty-region rebuilding.
+    """
+    def __init__(self, size, ambient=AMBIENT, scale=1.0):
+        self.size = size
+        self.ambient = ambient
+        self.scale = scale              # Light map pixels per screen pixel (the scaled renderer's world surface)
+        self.bounds = pygame.Rect((0, 0), size)
+        self.light_map = pygame.Surface(size)
+        if pygame.display.get_surface() is not None:
+            self.light_map = self.light_map.convert()
+        self.light_map.fill(ambient)
+        self.masks = {}                 # (radius, intensity, colour) -> Surface
+        self.lights = []                # (mask, rect) added this frame
+        self.previous = set()           # (mask, rect tuple) applied last frame
+        self.cost = 0                   # Light-map pixels rebuilt last frame
+        self.masks_built = 0
+
+    def light_mask(self, radius, intensity=1.0, color=(255, 255, 255)):
+        """
+        Returns the cached radial mask for a light, drawing it the first time.
+        Brightness falls off with the square of the distance from the centre.
+        """
+        radius = max(RADIUS_STEP, round(radius / RADIUS_STEP) * RADIUS_STEP)
+        intensity = round(min(1.0, intensity) * INTENSITY_STEPS) / INTENSITY_STEPS
+        key = (radius, intensity, color)
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = pygame.Surface((radius * 2, radius * 2))
+            mask.fill((0, 0, 0))
+            for ring in range(radius, 0, -1):
+                falloff = intensity * (1 - ring / radius) ** 2
+                pygame.draw.circle(mask, [int(channel * falloff) for channel in color], (radius, radius), ring)
+            if pygame.display.get_surface() is not None:
+                mask = mask.convert()
+            self.masks[key] = mask
+            self.masks_built += 1
+        return mask
+
+    def add(self, position, radius, intensity=1.0, color=(255, 255, 255)):
+        """
+        Adds a light centred on a screen position for this frame.
+        """
+        scale = self.scale
+        mask = self.light_mask(radius * scale, intensity, color)
+        rect = mask.get_rect(center=(int(position[0] * scale), int(position[1] * scale)))
+        if rect.colliderect(self.bounds):
+            self.lights.append((mask, rect))
+
+    def rebuild(self, region):
+        """
+        Refills a light-map region with the ambient colour and adds back every light touching it.
+        """
+        light_map = self.light_map
+        light_map.fill(self.ambient, region)
+        for mask, rect in self.lights:
+            overlap = region.clip(rect)
+            if overlap:
+                light_map.blit(mask, overlap.topleft, overlap.move(-rect.x, -rect.y), pygame.BLEND_ADD)
+        return region.width * region.height
+
+    def apply(self, surface):
+        """
+        Rebuilds the changed parts of the light map, darkens the surface with
+        it and starts a new frame of lights.
+        """
+        current = {(mask, tuple(rect)) for mask, rect in self.lights}
+        changed = [rect for _, rect in current.symmetric_difference(self.previous)]
+        cost = 0
+        for region in merge_regions(changed):
+            region = self.bounds.clip(region)
+            if region:
+                cost += self.rebuild(region)
+        surface.blit(self.light_map, (0, 0), special_flags=pygame.BLEND_MULT)
+        self.previous = current
+        self.lights.clear()
+        self.cost = cost
+        profiler.count("light_pixels", cost)
+
+    def reset(self):
+        """
+        Forgets every light, so the next frame starts from a dark, ambient light map.
+        """
+        self.light_map.fill(self.ambient)
+        self.lights.clear()
+        self.previous = set()
+
+
+# ------------------------
+# Cost Benchmark
+# ------------------------
+def benchmark(lights, frames, moving, size=(800, 700)):
+    """
+    Lights a screen-sized surface with `lights` lights, the first `moving`
+    of them drifting each frame, and returns (mean ms per frame, mean pixels rebuilt).
+    """
+    surface = pygame.Surface(size)
+    layer = LightingLayer(size)
+    spacing = size[0] // (lights + 1)
+    cost = 0
+    start = time.perf_counter()
+    for frame in range(frames):
+        surface.fill((120, 120, 120))
+        for index in range(lights):
+            x = spacing * (index + 1) + (frame % 40 if index < moving else 0)
+            layer.add((x, size[1] // 2), 60 if index else 220, color=(255, 190, 120) if index == 0 else (255, 40, 40))
+        layer.apply(surface)
+        cost += layer.cost
+    return (time.perf_counter() - start) * 1000 / frames, cost / frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cost of the lighting layer.")
+    parser.add_argument("--lights", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((800, 700))
+    print(f"{'lights':>7}{'moving':>8}{'ms/frame':>10}{'pixels rebuilt':>16}")
+    for count in args.lights:
+        for moving in sorted({0, 1, count}):
+            frame_ms, pixels = benchmark(count, args.frames, moving)
+            print(f"{count:>7}{moving:>8}{frame_ms:>10.3f}{pixels:>16.0f}")
@@ -0,0 +1,114 @@
+"""
+Line of Sight
+Per-frame visibility field computed from the player's cell by recursive
+shadowcasting over the walkability grid. One pass marks every cell the
+player can see; enemies then ask "can the player see me?" (which is the
+same as "can I see the player") with a single array lookup.
+
+The field is only recomputed when the player changes cell or the grid
+changes (chunks streamed in or out), so most frames cost nothing.
+"""
+
+from array import array
+
+# Octant transforms (xx, xy, yx, yy) for the eight shadowcasting sectors
+OCTANTS = (
+    (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+    (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1),
+)
+
+
+class LineOfSight:
+    """
+    Visibility field around the player over a TileMap's grid.
+    A cell is visible when its stamp equals the current generation, so the
+    field never needs clearing.
+    """
+    def __init__(self, tile_map, radius=30):
+        self.tile_map = tile_map
+        self.radius = radius                    # In cells
+        self.stamps = array("I", bytes(4 * tile_map.columns * tile_map.rows))
+        self.generation = 0
+        self.origin = None                      # Player cell the field was cast from
+        self.grid_version = -1
+        self.recomputes = 0                     # Cost counter for profiling
+
+    def update(self, position):
+        """
+        Recasts the field if the player moved to another cell or the grid changed.
+        """
+        size = self.tile_map.tile_size
+        origin = (int(position[0] // size), int(position[1] // size))
+        if origin == self.origin and self.grid_version == self.tile_map.version:
+            return
+        self.origin = origin
+        self.grid_version = self.tile_map.version
+        self.generation += 1
+        self.recomputes += 1
+
+        columns = self.tile_map.columns
+        if 0 <= origin[0] < columns and 0 <= origin[1] < self.tile_map.rows:
+            self.stamps[origin[1] * columns + origin[0]] = self.generation
+        for xx, xy, yx, yy in OCTANTS:
+            self.cast_light(origin[0], origin[1], 1, 1.0, 0.0, xx, xy, yx, yy)
+
+    def cast_light(self, origin_x, origin_y, row, start, end, xx, xy, yx, yy):
+        """
+        Scans one octant row by row, recursing around opaque cells.
+        Slopes run from start (1.0) down to end (0.0).
+        """
+        if start < end:
+            return
+        grid = self.tile_map.grid
+        columns = self.tile_map.columns
+        rows = self.tile_map.rows
+        stamps = self.stamps
+        generation = self.generation
+        radius = self.radius
+        radius_squared = radius * radius
+
+        for distance in range(row, radius + 1):
+            dx = -distance - 1
+            dy = -distance
+            blocked = False
+            new_start = start
+            while dx <= 0:
+                dx += 1
+                x = origin_x + dx * xx + dy * xy
+                y = origin_y + dx * yx + dy * yy
+                left_slope = (dx - 0.5) / (dy + 0.5)
+                right_slope = (dx + 0.5) / (dy - 0.5)
+                if start < right_slope:
+                    continue
+                if end > left_slope:
+                    break
+
+                inside = 0 <= x < columns and 0 <= y < rows
+                if inside and dx * dx + dy * dy < radius_squared:
+                    stamps[y * columns + x] = generation
+                opaque = not inside or grid[y][x]
+
+                if blocked:
+                    if opaque:
+                        new_start = right_slope
+                    else:
+                        blocked = False
+                        start = new_start
+                elif opaque and distance < radius:
+                    blocked = True
+                    self.cast_light(origin_x, origin_y, distance + 1, start, left_slope, xx, xy, yx, yy)
+                    new_start = right_slope
+            if blocked:
+                break
+
+    def is_visible(self, position):
+        """
+        Returns True if the player can see the cell containing a world position.
+        """
+        size = self.tile_map.tile_size
+        x = int(position[0] // size)
+        y = int(position[1] // size)
+        columns = self.tile_map.columns
+        if not (0 <= x < columns and 0 <= y < self.tile_map.rows):
+            return False
+        return self.stamps[y * columns + x] == self.generation
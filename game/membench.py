@@ -0,0 +1,79 @@
+"""
+Memory Benchmark
+Reports bytes per live enemy for 1k and 10k enemies, measured headlessly.
+
+Two numbers are given for each count:
+    python   Python-heap bytes per enemy (tracemalloc: objects, dicts, paths)
+    rss      Resident-set growth per enemy, which also covers SDL surface pixels
+
+Each count runs in a fresh process so earlier runs do not skew the RSS.
+
+    python -m game.membench
+"""
+
+import copy
+import multiprocessing
+import os
+import tracemalloc
+
+COUNTS = (1000, 10000)
+
+
+def resident_bytes():
+    """
+    Returns the current resident set size of this process in bytes.
+    """
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure(count):
+    """
+    Creates `count` spawned enemies with a realistic A* path each and returns
+    (python bytes per enemy, rss bytes per enemy).
+    """
+    from game.headless import load_game
+
+    game = load_game()
+    for sprite in game.enemy_group.sprites():
+        sprite.kill()
+    game.wave_director.clear()
+    enemy_types = (game.Ghoul, game.Vampire, game.Werewolf)
+
+    # Warm up image caches and the path template so they are not counted per enemy
+    templates = []
+    for enemy_type in enemy_types:
+        enemy = enemy_type()
+        enemy.spawn_randomly(game.player.playable_area_grid, game.player.pos, 150)
+        enemy.update_path_to_player(game.player.pos)
+        templates.append(enemy.path)
+
+    enemies = []
+    tracemalloc.start()
+    python_before = tracemalloc.get_traced_memory()[0]
+    rss_before = resident_bytes()
+    for index in range(count):
+        enemy = enemy_types[index % len(enemy_types)]()
+        enemy.spawn_randomly(game.player.playable_area_grid, game.player.pos, 150)
+        enemy.path = copy.copy(templates[index % len(templates)])
+        game.enemy_group.add(enemy)
+        game.all_sprites_group.add(enemy)
+        enemies.append(enemy)
+    python_after = tracemalloc.get_traced_memory()[0]
+    rss_after = resident_bytes()
+    tracemalloc.stop()
+    return (python_after - python_before) / count, (rss_after - rss_before) / count
+
+
+if __name__ == "__main__":
+    context = multiprocessing.get_context("spawn")
+    print(f"{'enemies':>8}{'python B/enemy':>16}{'rss B/enemy':>14}")
+    for count in COUNTS:
+        # Close rather than terminate: SDL turns SIGTERM into a QUIT event
+        pool = context.Pool(1)
+        try:
+            python_bytes, rss_bytes = pool.apply(measure, (count,))
+        finally:
+            pool.close()
+            pool.join()
+        print(f"{count:>8}{python_bytes:>16.0f}{rss_bytes:>14.0f}")
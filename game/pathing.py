@@ -0,0 +1,78 @@
+"""
+Path Smoothing
+Turns a cell-by-cell grid path into a few straight-line waypoints.
+
+Paths traced over a 4-connected grid (MOVES, the steps the clearance
+flow fields use) are staircases with one entry per cell. String-pulling
+keeps only the cells where the path has to turn: a waypoint is dropped
+whenever the straight line from the previous kept waypoint to the one
+after it crosses no blocked cell. Enemies then walk the remaining
+waypoints with a cursor that only moves forward, so following a path
+costs the same per frame however long it is.
+"""
+
+from array import array
+
+MOVES = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+def line_walkable(grid, x0, y0, x1, y1):
+    """
+    Returns True if every cell touched by the segment between two cell
+    centres is walkable (grid[y][x] is False). Corners count as touching
+    both neighbours, so lines never squeeze diagonally between two walls.
+    """
+    rows = len(grid)
+    columns = len(grid[0]) if rows else 0
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    step_x = 1 if x1 > x0 else -1
+    step_y = 1 if y1 > y0 else -1
+    x, y = x0, y0
+
+    # Walk the cells in crossing order; error compares the two axes' crossings
+    error = dx - dy
+    remaining = dx + dy                     # Cell steps left to the end cell
+    while True:
+        if not (0 <= x < columns and 0 <= y < rows) or grid[y][x]:
+            return False
+        if remaining <= 0:
+            return True
+        if error > 0:
+            x += step_x
+            error -= 2 * dy
+            remaining -= 1
+        elif error < 0:
+            y += step_y
+            error += 2 * dx
+            remaining -= 1
+        else:
+            # Exactly through a corner: both side cells must be open
+            if (not (0 <= x + step_x < columns) or grid[y][x + step_x] or
+                    not (0 <= y + step_y < rows) or grid[y + step_y][x]):
+                return False
+            x += step_x
+            y += step_y
+            error += 2 * (dx - dy)
+            remaining -= 2
+
+
+def string_pull(path, grid):
+    """
+    Reduces a flat x, y cell path (array('h')) to the waypoints where it turns.
+    The first and last cells are always kept.
+    """
+    count = len(path) // 2
+    if count <= 2:
+        return path
+    waypoints = array("h", path[0:2])
+    anchor_x, anchor_y = path[0], path[1]
+    for index in range(2, count):
+        x, y = path[2 * index], path[2 * index + 1]
+        if not line_walkable(grid, anchor_x, anchor_y, x, y):
+            # The previous cell is the furthest one visible from the anchor
+            anchor_x, anchor_y = path[2 * index - 2], path[2 * index - 1]
+            waypoints.append(anchor_x)
+            waypoints.append(anchor_y)
+    waypoints.extend(path[-2:])
+    return waypoints
@@ -0,0 +1,58 @@
+"""
+Update Pipeline
+Runs the per-frame work of the game in fixed, ordered phases so every
+entity is updated exactly once per frame.
+
+Phase order and guarantees:
+    input      Player input is read. Attacks fired here exist for the rest of the frame.
+    ai         Queued wave spawns are released, then enemies run their state
+               machines and pathfinding to pick a desired velocity, and one
+               crowd steering pass moves them all (game/steering.py).
+               They see the player position from the previous frame.
+    movement   The player and projectiles move to their new positions.
+    collision  Projectile hits, enemy contact damage and pickups are resolved
+               against the positions produced by the ai and movement phases.
+    cleanup    Timers (cooldowns, invincibility) tick down after all damage is dealt.
+    render     Sprites, health bars and the HUD are drawn from the final state.
+
+Systems inside a phase run in the order they were added. Each sprite group
+should be handed to exactly one system; all_sprites_group is only drawn, never updated.
+"""
+
+from game.profiler import profiler
+
+PHASES = ("input", "ai", "movement", "collision", "cleanup", "render")
+
+
+class UpdatePipeline:
+    """
+    Ordered list of systems grouped by phase.
+    A system is any callable taking no arguments.
+    """
+    def __init__(self):
+        self.systems = {phase: [] for phase in PHASES}
+
+    def add(self, phase, system):
+        """
+        Registers a system to run in the given phase.
+        """
+        if phase not in self.systems:
+            raise ValueError(f"Unknown pipeline phase: {phase}")
+        self.systems[phase].append(system)
+
+    def run_phase(self, phase):
+        """
+        Runs every system registered for a single phase.
+        """
+        with profiler.scope(phase):
+            for system in self.systems[phase]:
+                system()
+
+    def run(self, render=True):
+        """
+        Runs all phases in order. Headless callers pass render=False to skip drawing.
+        """
+        for phase in PHASES:
+            if phase == "render" and not render:
+                continue
+            self.run_phase(phase)
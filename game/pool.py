@@ -0,0 +1,39 @@
+"""
+Object Pool
+Keeps released sprites so later spawns reuse them instead of allocating
+new objects. A pooled object is re-initialised with its own __init__, so
+it starts exactly like a freshly created one.
+"""
+
+
+class ObjectPool:
+    """
+    Free lists of released objects, one per class.
+    Only classes whose __init__ takes no arguments can be pooled.
+    """
+    def __init__(self, max_free=1024):
+        self.free = {}                  # class -> released objects
+        self.max_free = max_free        # Per class; extra objects are left to the garbage collector
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, cls):
+        """
+        Returns a pooled object of the class, re-initialised, or a new one.
+        """
+        free = self.free.get(cls)
+        if free:
+            obj = free.pop()
+            obj.__init__()
+            self.reused += 1
+            return obj
+        self.created += 1
+        return cls()
+
+    def release(self, obj):
+        """
+        Returns an object to its class's free list.
+        """
+        free = self.free.setdefault(type(obj), [])
+        if len(free) < self.max_free:
+            free.append(obj)
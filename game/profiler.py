@@ -0,0 +1,254 @@
+"""
+Frame Profiler
+Lightweight instrumentation for the main loop. Named timing scopes wrap
+each stage of a frame (event pump, updates, pathfinding, drawing, display
+flip) and the results are shown in a toggleable on-screen overlay or
+exported to CSV/JSON for offline analysis.
+
+Subsystems can also report per-frame work that is not time, such as
+pixels redrawn, with count(); counters are averaged and exported next to
+the stages.
+
+When the profiler is disabled, scope() hands back a shared no-op context
+manager, so instrumented code pays for one method call and nothing else.
+
+With --threaded, the simulation thread records scopes and counters while
+the main thread draws, so both go into the current frame under a lock.
+"""
+
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+import pygame
+
+FRAME_BUDGET_MS = 1000 / 60    # 16.6 ms per frame at 60 FPS
+
+
+class _NullScope:
+    """
+    Context manager that does nothing. Returned while profiling is off.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class _TimingScope:
+    """
+    Times a single named stage and adds the elapsed time to the current frame.
+    """
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = (time.perf_counter() - self.start) * 1000
+        profiler = self.profiler
+        with profiler.lock:
+            stages = profiler.current_stages
+            stages[self.name] = stages.get(self.name, 0.0) + elapsed
+        return False
+
+
+class FrameProfiler:
+    """
+    Collects per-stage timings and counters for every frame while enabled.
+    Scopes may nest (e.g. pathfinding inside sprite updates); each stage
+    reports its inclusive time.
+    """
+    def __init__(self, history=240):
+        self.enabled = False
+        self.show_overlay = False
+        self.history = history
+        self.frames = deque(maxlen=history)     # (frame_ms, {stage: ms}, {counter: amount}) per frame
+        self.stage_order = []                   # Stage names in first-seen order
+        self.counter_order = []                 # Counter names in first-seen order
+        self.current_stages = {}
+        self.current_counters = {}
+        self.lock = threading.Lock()            # Scopes and counters also run on the simulation thread (--threaded)
+        self.frame_start = 0.0
+        self.frame_number = 0
+        self.font = None
+        self.graph_surface = None
+
+    def toggle(self):
+        """
+        Switches profiling and the overlay on or off together.
+        Clears old samples so the graph never mixes two sessions.
+        """
+        self.enabled = not self.enabled
+        self.show_overlay = self.enabled
+        self.frames.clear()
+        with self.lock:
+            self.current_stages = {}
+            self.current_counters = {}
+        self.frame_start = time.perf_counter()  # Toggling mid-frame still gives a sane first sample
+
+    def scope(self, name):
+        """
+        Returns a context manager that times the named stage.
+        """
+        if not self.enabled:
+            return _NULL_SCOPE
+        return _TimingScope(self, name)
+
+    def count(self, name, amount=1):
+        """
+        Adds to a named per-frame counter.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            counters = self.current_counters
+            counters[name] = counters.get(name, 0) + amount
+
+    def begin_frame(self):
+        """
+        Marks the start of a frame.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.current_stages = {}
+            self.current_counters = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """
+        Marks the end of the frame's work (before clock.tick sleeps) and stores the sample.
+        """
+        if not self.enabled:
+            return
+        frame_ms = (time.perf_counter() - self.frame_start) * 1000
+        with self.lock:
+            stages, counters = self.current_stages, self.current_counters
+            self.current_stages = {}
+            self.current_counters = {}
+        for name in stages:
+            if name not in self.stage_order:
+                self.stage_order.append(name)
+        for name in counters:
+            if name not in self.counter_order:
+                self.counter_order.append(name)
+        self.frames.append((frame_ms, stages, counters))
+        self.frame_number += 1
+
+    def averages(self):
+        """
+        Returns the average frame time and a dict of average per-stage times
+        over the rolling history.
+        """
+        if not self.frames:
+            return 0.0, {}
+        count = len(self.frames)
+        frame_avg = sum(frame_ms for frame_ms, _, _ in self.frames) / count
+        stage_avg = {}
+        for name in self.stage_order:
+            stage_avg[name] = sum(stages.get(name, 0.0) for _, stages, _ in self.frames) / count
+        return frame_avg, stage_avg
+
+    def counter_averages(self):
+        """
+        Returns a dict of average per-frame counter values over the rolling history.
+        """
+        count = len(self.frames)
+        if not count:
+            return {}
+        return {name: sum(counters.get(name, 0) for _, _, counters in self.frames) / count
+                for name in self.counter_order}
+
+    def draw(self, screen):
+        """
+        Draws the rolling frame-time graph and per-stage breakdown in the top-left corner.
+        """
+        if not self.show_overlay:
+            return
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+            self.graph_surface = pygame.Surface((self.history, 60), pygame.SRCALPHA)
+
+        # Frame-time graph: one column per frame, scaled so 2x budget fills the height
+        graph = self.graph_surface
+        graph.fill((0, 0, 0, 180))
+        height = graph.get_height()
+        scale = height / (FRAME_BUDGET_MS * 2)
+        for i, (frame_ms, _, _) in enumerate(self.frames):
+            bar = min(height, int(frame_ms * scale))
+            color = (0, 200, 0) if frame_ms <= FRAME_BUDGET_MS else (220, 0, 0)
+            pygame.draw.line(graph, color, (i, height - 1), (i, height - bar))
+        budget_y = height - int(FRAME_BUDGET_MS * scale)
+        pygame.draw.line(graph, (255, 215, 0), (0, budget_y), (graph.get_width(), budget_y))
+        screen.blit(graph, (10, 100))
+
+        # Per-stage breakdown
+        frame_avg, stage_avg = self.averages()
+        lines = [f"frame {frame_avg:5.2f} ms / {FRAME_BUDGET_MS:.1f} ms"]
+        for name in self.stage_order:
+            lines.append(f"{name:<14}{stage_avg[name]:6.2f} ms")
+        for name, average in self.counter_averages().items():
+            lines.append(f"{name:<14}{average:9.0f}")
+        y = 100 + height + 4
+        for line in lines:
+            text = self.font.render(line, True, (255, 255, 255))
+            screen.blit(text, (10, y))
+            y += text.get_height()
+
+    def export_csv(self, path):
+        """
+        Writes the rolling history to a CSV file, one row per frame.
+        """
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["frame", "frame_ms"] + self.stage_order + self.counter_order)
+            first = self.frame_number - len(self.frames)
+            for i, (frame_ms, stages, counters) in enumerate(self.frames):
+                row = [first + i, f"{frame_ms:.4f}"]
+                row += [f"{stages.get(name, 0.0):.4f}" for name in self.stage_order]
+                row += [counters.get(name, 0) for name in self.counter_order]
+                writer.writerow(row)
+
+    def export_json(self, path):
+        """
+        Writes the rolling history and averages to a JSON file.
+        """
+        frame_avg, stage_avg = self.averages()
+        first = self.frame_number - len(self.frames)
+        data = {
+            "budget_ms": FRAME_BUDGET_MS,
+            "average_frame_ms": frame_avg,
+            "average_stage_ms": stage_avg,
+            "average_counters": self.counter_averages(),
+            "frames": [
+                {"frame": first + i, "frame_ms": frame_ms, "stages": stages, "counters": counters}
+                for i, (frame_ms, stages, counters) in enumerate(self.frames)
+            ],
+        }
+        with open(path, "w") as json_file:
+            json.dump(data, json_file, indent=2)
+
+    def export(self, basename="frame_profile"):
+        """
+        Exports both CSV and JSON files and returns their paths.
+        """
+        csv_path = basename + ".csv"
+        json_path = basename + ".json"
+        self.export_csv(csv_path)
+        self.export_json(json_path)
+        return csv_path, json_path
+
+
+# Shared profiler used by main.py and any subsystem that wants to add scopes
+profiler = FrameProfiler()
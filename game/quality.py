@@ -0,0 +1,180 @@
+"""
+Adaptive Quality
+Keeps frame times inside the budget by trading away optional work. Each
+subsystem registers a knob: a name and a list of settings ordered from
+best looking to cheapest. The governor watches a rolling window of frame
+work times (measured before clock.tick sleeps). When the average stays
+over the budget it steps one knob down; when it stays well under the
+budget it restores the most recently lowered knob first.
+
+The gap between the two thresholds and a cool-down after every change
+(the window is refilled before the next decision) keep it from flapping
+between two levels.
+
+Knobs are lowered in registration order, one step each in turn, so the
+knob registered first is the first to give. Subsystems read the current
+setting with governor.value(name) or get it pushed to them through an
+on_change callback.
+
+    from game.quality import governor
+    governor.register("minimap_interval", (1, 4, 15))
+    interval = governor.value("minimap_interval")
+
+    python main.py --endless --adaptive-quality
+"""
+
+import time
+from collections import deque
+
+from game.profiler import FRAME_BUDGET_MS
+
+STALL_MS = 250    # Longer frames are menus, story screens or loading, not load
+
+
+class QualityKnob:
+    """
+    One optional piece of work and its settings, best first.
+    """
+    __slots__ = ("name", "levels", "level", "on_change")
+
+    def __init__(self, name, levels, on_change=None):
+        self.name = name
+        self.levels = tuple(levels)
+        self.level = 0
+        self.on_change = on_change
+
+    @property
+    def value(self):
+        """
+        The current setting.
+        """
+        return self.levels[self.level]
+
+    def set_level(self, level):
+        """
+        Moves to a level and tells the subsystem.
+        """
+        self.level = level
+        if self.on_change is not None:
+            self.on_change(self.value)
+
+
+class QualityGovernor:
+    """
+    Lowers and restores registered knobs from rolling frame times.
+    Does nothing until enabled.
+    """
+    def __init__(self, budget_ms=FRAME_BUDGET_MS, window=45, degrade_ratio=1.0, restore_ratio=0.7):
+        self.enabled = False
+        self.budget_ms = budget_ms
+        self.degrade_ms = budget_ms * degrade_ratio     # Lower a knob when the average is above this
+        self.restore_ms = budget_ms * restore_ratio     # Restore one when it is below this
+        self.samples = deque(maxlen=window)
+        self.knobs = {}                                 # name -> QualityKnob, in registration order
+        self.lowered = []                               # Names in the order they were lowered
+        self.changes = 0
+        self.frame_start = 0.0
+        self.listeners = []                             # Called with (knob, direction) after every change
+
+    def register(self, name, levels, on_change=None):
+        """
+        Adds a knob and returns it. Re-registering a name replaces the knob
+        and puts it back at its best setting.
+        """
+        if not levels:
+            raise ValueError(f"Quality knob {name!r} needs at least one level")
+        if name in self.knobs:
+            self.lowered = [lowered for lowered in self.lowered if lowered != name]
+        knob = QualityKnob(name, levels, on_change)
+        self.knobs[name] = knob
+        if on_change is not None:
+            on_change(knob.value)
+        return knob
+
+    def value(self, name):
+        """
+        Returns the knob's current setting.
+        """
+        return self.knobs[name].value
+
+    def level(self):
+        """
+        Returns how many steps below full quality the game is running.
+        """
+        return len(self.lowered)
+
+    def begin_frame(self):
+        """
+        Marks the start of a frame's work.
+        """
+        if self.enabled:
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """
+        Adds the frame's work time and adjusts a knob if the window calls for it.
+        """
+        if not self.enabled:
+            return
+        self.record((time.perf_counter() - self.frame_start) * 1000)
+
+    def record(self, frame_ms):
+        """
+        Adds a frame time; once the window is full, lowers or restores one knob.
+        """
+        if frame_ms > STALL_MS:
+            return
+        samples = self.samples
+        samples.append(frame_ms)
+        if len(samples) < samples.maxlen:
+            return
+        average = sum(samples) / len(samples)
+        if average > self.degrade_ms:
+            self.degrade()
+        elif average < self.restore_ms:
+            self.restore()
+
+    def degrade(self):
+        """
+        Lowers the next knob by one step. Returns False if everything is already at its cheapest.
+        """
+        knobs = [knob for knob in self.knobs.values() if knob.level < len(knob.levels) - 1]
+        if not knobs:
+            return False
+        # The knob lowered the fewest times goes first; ties in registration order
+        knob = min(knobs, key=lambda knob: knob.level)
+        knob.set_level(knob.level + 1)
+        self.lowered.append(knob.name)
+        self.changed(knob, -1)
+        return True
+
+    def restore(self):
+        """
+        Raises the most recently lowered knob by one step. Returns False at full quality.
+        """
+        if not self.lowered:
+            return False
+        knob = self.knobs[self.lowered.pop()]
+        knob.set_level(knob.level - 1)
+        self.changed(knob, 1)
+        return True
+
+    def changed(self, knob, direction):
+        """
+        Starts the cool-down and notifies listeners.
+        """
+        self.samples.clear()
+        self.changes += 1
+        for listener in self.listeners:
+            listener(knob, direction)
+
+    def reset(self):
+        """
+        Puts every knob back at its best setting.
+        """
+        while self.restore():
+            pass
+        self.samples.clear()
+
+
+governor = QualityGovernor()
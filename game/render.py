@@ -0,0 +1,287 @@
+"""
+Render Backends
+Two ways of getting a frame on screen, chosen with --renderer:
+
+    surface   (default) software blits onto the display surface
+    scaled    the surface backend drawing the world at a lower internal
+              resolution (--render-scale 0.5 to 0.75), upscaled once per
+              frame; the HUD is still drawn at full resolution
+    texture   pygame._sdl2.video Renderer: every sprite image is uploaded
+              once as a Texture and SDL draws it with rotation and alpha,
+              on the GPU if there is one and with SDL's software renderer
+              otherwise (SDL_RENDER_DRIVER=software forces it)
+
+Both backends have the same interface, so the game draws the same way
+with either:
+
+    backend.screen                              surface for the HUD, menus and overlays
+    backend.world, backend.scale                surface for world-space effects, and its
+                                                size relative to `screen`
+    backend.draw_background(camera, background)
+    backend.draw_group(camera, group)
+    backend.finish_world()                      world drawing is done
+    backend.present()
+
+The scaled backend draws the world onto a smaller surface and upscales it
+onto `screen` in finish_world(). Effects that belong to the world
+(particles, lighting) are drawn onto `world` before that, scaled by
+`scale`, so they stay in register with the sprites; anything drawn on
+`screen` after it (health bars, HUD, menus) stays sharp. The background is
+shrunk once and sprite images are shrunk once per image, so the per-frame
+cost is the smaller blits plus one upscale; sprites with texture_source()
+are rotated from their shrunk image, in cached ROTATION_STEP steps.
+
+The texture backend records world drawing and replays it at present(),
+then draws `screen` on top as a single overlay texture. A menu that
+draws over the last frame without redrawing the world therefore still
+shows the world under it, as it does with the surface backend.
+
+Sprites that keep an unrotated image can define texture_source(),
+returning (image, angle) with the angle in pygame.transform.rotate's
+convention. The texture backend then draws the unrotated texture rotated
+by SDL, instead of uploading every rotated copy.
+
+If the texture backend cannot start, the surface backend is used.
+
+    python main.py --renderer texture
+    python main.py --render-scale 0.5 --render-filter smooth
+    python -m game.renderbench
+"""
+
+import weakref
+
+import pygame
+
+ROTATION_STEP = 3    # Degrees; finer steps are invisible at a reduced resolution
+
+
+class SurfaceBackend:
+    """
+    Software blits onto the display surface (the original drawing path).
+    """
+    name = "surface"
+    scale = 1.0
+
+    def __init__(self, size, caption):
+        self.screen = pygame.display.set_mode(size)
+        self.world = self.screen
+        pygame.display.set_caption(caption)
+
+    def draw_background(self, camera, background):
+        """
+        Blits the visible part of a world-sized background.
+        """
+        camera.draw_background(self.screen, background)
+
+    def draw_group(self, camera, group):
+        """
+        Blits every sprite in the group that intersects the view.
+        """
+        camera.draw_group(self.screen, group)
+
+    def finish_world(self):
+        """
+        Nothing to do: the world is drawn straight onto the screen.
+        """
+
+    def present(self):
+        """
+        Shows the finished frame.
+        """
+        pygame.display.update()
+
+
+class ScaledSurfaceBackend(SurfaceBackend):
+    """
+    Surface backend that draws the world at `scale` of the window size and
+    upscales it onto the display surface.
+    """
+    name = "scaled"
+
+    def __init__(self, size, caption, scale, smooth=False):
+        super().__init__(size, caption)
+        self.scale = scale
+        self.world = pygame.Surface((round(size[0] * scale), round(size[1] * scale))).convert()
+        self.upscale = pygame.transform.smoothscale if smooth else pygame.transform.scale
+        self.shrunk = weakref.WeakKeyDictionary()      # Full-size surface -> shrunk copy, freed with it
+        self.rotations = weakref.WeakKeyDictionary()   # Full-size surface -> {snapped angle: shrunk, rotated copy}
+
+    def shrink(self, surface):
+        """
+        Returns the surface scaled down to the internal resolution, shrinking it the first time.
+        """
+        small = self.shrunk.get(surface)
+        if small is None:
+            width, height = surface.get_size()
+            small = pygame.transform.scale(surface, (max(1, round(width * self.scale)),
+                                                     max(1, round(height * self.scale))))
+            self.shrunk[surface] = small
+        return small
+
+    def rotate(self, surface, angle):
+        """
+        Returns the shrunk surface rotated by the angle snapped to ROTATION_STEP degrees, cached.
+        """
+        angle = round(angle / ROTATION_STEP) * ROTATION_STEP % 360
+        rotations = self.rotations.get(surface)
+        if rotations is None:
+            rotations = self.rotations[surface] = {}
+        rotated = rotations.get(angle)
+        if rotated is None:
+            rotated = rotations[angle] = pygame.transform.rotate(self.shrink(surface), angle)
+        return rotated
+
+    def draw_background(self, camera, background):
+        """
+        Blits the visible part of the shrunk background onto the world surface.
+        """
+        scale = self.scale
+        view = camera.view
+        area = pygame.Rect(round(view.x * scale), round(view.y * scale), self.world.get_width(), self.world.get_height())
+        self.world.blit(self.shrink(background), (0, 0), area)
+
+    def draw_group(self, camera, group):
+        """
+        Blits the visible sprites onto the world surface, centred where they
+        would be at full size. finish_world() shows them.
+        """
+        scale = self.scale
+        view = camera.view
+        view_x, view_y = view.x, view.y
+        shrink = self.shrink
+        draw_list = []
+        for sprite in group:
+            rect = sprite.rect
+            if not view.colliderect(rect):
+                continue
+            source = getattr(sprite, "texture_source", None)
+            if source is None:
+                image = shrink(sprite.image)
+            else:
+                image, angle = source()
+                image = self.rotate(image, angle) if angle else shrink(image)
+            width, height = image.get_size()
+            draw_list.append((image, (round((rect.centerx - view_x) * scale) - width // 2,
+                                      round((rect.centery - view_y) * scale) - height // 2)))
+        self.world.blits(draw_list, doreturn=False)
+        camera.drawn = len(draw_list)
+        camera.culled = len(group) - len(draw_list)
+
+    def finish_world(self):
+        """
+        Upscales the world surface onto the screen, under whatever is drawn on the screen next.
+        """
+        self.upscale(self.world, self.screen.get_size(), self.screen)
+
+
+class TextureBackend:
+    """
+    SDL Renderer drawing cached textures, with `screen` as a transparent overlay on top.
+    """
+    name = "texture"
+    scale = 1.0
+
+    def __init__(self, size, caption):
+        from pygame._sdl2.video import Renderer, Texture, Window
+
+        # Images are still loaded with convert(), which needs a display mode; keep its window hidden
+        pygame.display.set_mode(size, pygame.HIDDEN)
+        self.window = Window(caption, size)
+        self.renderer = Renderer(self.window)
+        self.texture_type = Texture
+        self.textures = weakref.WeakKeyDictionary()    # Source surface -> Texture, freed with the surface
+        self.uploads = 0                                # Textures created so far
+        self.commands = []                              # (texture, source area, target rect, angle, alpha)
+
+        self.screen = pygame.Surface(size, pygame.SRCALPHA)
+        self.world = self.screen                        # World effects go on the overlay, over the sprites
+        self.overlay = Texture(self.renderer, size, streaming=True)
+        self.overlay.blend_mode = pygame.BLENDMODE_BLEND
+
+    def texture(self, surface):
+        """
+        Returns the texture for a surface, uploading it the first time it is drawn.
+        """
+        texture = self.textures.get(surface)
+        if texture is None:
+            texture = self.texture_type.from_surface(self.renderer, surface)
+            self.textures[surface] = texture
+            self.uploads += 1
+        return texture
+
+    def draw_background(self, camera, background):
+        """
+        Starts a new world frame: clears the overlay and queues the visible part of the background.
+        """
+        self.screen.fill((0, 0, 0, 0))
+        self.commands.clear()
+        view = camera.view
+        self.commands.append((self.texture(background), pygame.Rect(view),
+                              pygame.Rect(0, 0, view.width, view.height), 0, 255))
+
+    def draw_group(self, camera, group):
+        """
+        Queues every sprite in the group that intersects the view.
+        """
+        view = camera.view
+        view_x, view_y = view.x, view.y
+        commands = self.commands
+        drawn = 0
+        for sprite in group:
+            rect = sprite.rect
+            if not view.colliderect(rect):
+                continue
+            source = getattr(sprite, "texture_source", None)
+            if source is None:
+                image, angle = sprite.image, 0
+            else:
+                image, angle = source()
+            width, height = image.get_size()
+            alpha = image.get_alpha()
+            # SDL rotates clockwise, pygame counter-clockwise; both keep the centre fixed
+            commands.append((self.texture(image), None,
+                             pygame.Rect(rect.centerx - width // 2 - view_x, rect.centery - height // 2 - view_y,
+                                         width, height),
+                             -angle, 255 if alpha is None else alpha))
+            drawn += 1
+        camera.drawn = drawn
+        camera.culled = len(group) - drawn
+
+    def finish_world(self):
+        """
+        Nothing to do: the queued world is drawn under the overlay at present().
+        """
+
+    def present(self):
+        """
+        Draws the queued world, then the overlay, and shows the frame.
+        """
+        renderer = self.renderer
+        renderer.draw_color = (0, 0, 0, 255)
+        renderer.clear()
+        for texture, area, target, angle, alpha in self.commands:
+            texture.alpha = alpha
+            texture.draw(area, target, angle)
+        self.overlay.update(self.screen)
+        self.overlay.draw()
+        renderer.present()
+
+
+def create_backend(name, size, caption, scale=1.0, smooth=False):
+    """
+    Returns the named backend, falling back to the surface backend if the
+    texture backend is not available. A scale below 1 turns the surface
+    backend into the scaled one.
+    """
+    if name == "surface" and 0 < scale < 1:
+        return ScaledSurfaceBackend(size, caption, scale, smooth)
+    if scale != 1:
+        print(f"Render scale {scale} needs the surface renderer and 0 < scale < 1; drawing at full resolution")
+    if name == "texture":
+        try:
+            return TextureBackend(size, caption)
+        except (ImportError, RuntimeError) as error:     # pygame.error is a RuntimeError
+            print(f"Texture renderer unavailable ({error}); using the surface renderer")
+    elif name != "surface":
+        print(f"Unknown renderer {name!r}; using the surface renderer")
+    return SurfaceBackend(size, caption)
@@ -0,0 +1,100 @@
+"""
+Render Benchmark
+Times the render phase and present() with the surface and texture
+backends (game/render.py) for a growing number of on-screen enemies,
+measured headlessly. --scales adds runs of the surface backend drawing
+the world at lower internal resolutions.
+
+Enemies are placed in view of the camera with random facings, so every
+one of them is drawn rotated. Each backend and count runs in a fresh
+process, because the backend is picked when main.py is imported.
+Without a GPU (or with --driver software) the texture backend uses SDL's
+software renderer.
+
+    python -m game.renderbench
+    python -m game.renderbench --counts 100 1000 --frames 300 --driver opengl
+    python -m game.renderbench --backends surface --scales 1 0.75 0.5 --filter smooth
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+BACKENDS = ("surface", "texture")
+
+
+def measure(backend, count, frames, driver, scale=1.0, render_filter="nearest"):
+    """
+    Draws `frames` frames with `count` visible enemies and returns
+    (backend actually used, mean ms per frame, texture uploads).
+    """
+    os.environ["SDL_RENDER_DRIVER"] = driver
+    sys.argv = ["main.py", "--renderer", backend, "--render-scale", str(scale), "--render-filter", render_filter]
+    from game.headless import load_game
+
+    game = load_game()
+    for sprite in game.enemy_group.sprites():
+        sprite.kill()
+    game.wave_director.clear()
+    game.update_camera()
+
+    rng = game.rng
+    rng.seed(count)
+    view = game.camera.view
+    enemy_types = (game.Ghoul, game.Vampire, game.Werewolf)
+    for index in range(count):
+        enemy = game.enemy_pool.acquire(enemy_types[index % len(enemy_types)])
+        enemy.spawned = True
+        enemy.rect.center = (rng.randrange(view.left, view.right), rng.randrange(view.top, view.bottom))
+        enemy.rotation_angle = rng.uniform(0, 360)
+        enemy.refresh_image()
+        game.add_enemy(enemy)
+
+    render_systems = game.pipeline.systems["render"]
+    backend_used = game.render_backend
+
+    def draw_frame():
+        backend_used.draw_background(game.camera, game.background)
+        for system in render_systems:
+            system()
+        backend_used.present()
+
+    draw_frame()    # Warm up caches and texture uploads
+    start = time.perf_counter()
+    for _ in range(frames):
+        draw_frame()
+    frame_ms = (time.perf_counter() - start) * 1000 / frames
+    return backend_used.name, frame_ms, getattr(backend_used, "uploads", 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the surface and texture render backends.")
+    parser.add_argument("--counts", type=int, nargs="+", default=[0, 100, 500, 2000], help="On-screen enemies")
+    parser.add_argument("--frames", type=int, default=200, help="Frames timed per run")
+    parser.add_argument("--driver", default="software", help="SDL render driver for the texture backend")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0],
+                        help="Internal render scales for the surface backend")
+    parser.add_argument("--filter", choices=("nearest", "smooth"), default="nearest", help="Upscale filter")
+    args = parser.parse_args()
+
+    runs = []
+    for backend in args.backends:
+        for scale in (args.scales if backend == "surface" else [1.0]):
+            runs.append((backend, scale))
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'enemies':>8}{'backend':>10}{'scale':>7}{'ms/frame':>10}{'uploads':>9}")
+    for count in args.counts:
+        for backend, scale in runs:
+            # Close rather than terminate: SDL turns SIGTERM into a QUIT event
+            pool = context.Pool(1)
+            try:
+                used, frame_ms, uploads = pool.apply(
+                    measure, (backend, count, args.frames, args.driver, scale, args.filter))
+            finally:
+                pool.close()
+                pool.join()
+            print(f"{count:>8}{used:>10}{scale:>7.2f}{frame_ms:>10.2f}{uploads:>9}")
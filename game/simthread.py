@@ -0,0 +1,186 @@
+"""
+Simulation Thread
+Pipelined frames: while the main thread draws frame N, a worker thread
+simulates frame N+1. The two only share a double buffer of frame
+snapshots. The worker fills the back snapshot at the end of its frame,
+the main thread draws the front one, and they swap at a per-frame barrier
+once both are done.
+
+A snapshot is a draw list of (image, screen position) for the sprites in
+view plus the enemy health bars, copied out of the live sprites. Sprite
+images are replaced, never drawn into, when they change, so the images a
+snapshot holds stay valid while the simulation moves on. pygame releases
+the GIL inside some blits and transforms, which is where the two threads
+can overlap.
+
+The HUD is drawn after the barrier from the live state, so it is one
+frame ahead of the world under it.
+
+Anything that blocks or draws to the display (story text) must not run on
+the simulation thread; the game queues it there and shows it on the main
+thread after the barrier.
+
+    python main.py --threaded
+    python -m game.simthread --enemies 500 --frames 300
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import pygame
+
+
+class FrameSnapshot:
+    """
+    What the renderer needs from one simulated frame.
+    """
+    __slots__ = ("view", "sprites", "health_bars")
+
+    def __init__(self):
+        self.view = pygame.Rect(0, 0, 0, 0)
+        self.sprites = []           # (image, (screen x, screen y))
+        self.health_bars = []       # (health, screen x of the centre, screen y of the top)
+
+    def capture(self, camera, sprites, enemies):
+        """
+        Copies the visible sprites and health bars out of the live groups.
+        """
+        view = camera.view
+        self.view.update(view)
+        view_x, view_y = view.x, view.y
+        draw_list = self.sprites
+        draw_list.clear()
+        for sprite in sprites:
+            rect = sprite.rect
+            if view.colliderect(rect):
+                draw_list.append((sprite.image, (rect.x - view_x, rect.y - view_y)))
+        bars = self.health_bars
+        bars.clear()
+        for enemy in enemies:
+            rect = enemy.rect
+            if enemy.spawned and view.colliderect(rect):
+                bars.append((enemy.health, rect.centerx - view_x, rect.y - view_y))
+        camera.drawn = len(draw_list)
+        camera.culled = len(sprites) - len(draw_list)
+
+    def draw(self, surface):
+        """
+        Blits the captured sprites.
+        """
+        surface.blits(self.sprites, doreturn=False)
+
+    def draw_health_bars(self, surface, draw_health_bar):
+        """
+        Draws the captured health bars (after particles and lighting, like the game does).
+        """
+        for health, x, y in self.health_bars:
+            draw_health_bar(surface, health, x, y)
+
+
+class DoubleBuffer:
+    """
+    Front and back snapshots. The writer fills back, the reader uses front,
+    and swap() exchanges them under a lock.
+    """
+    def __init__(self, factory):
+        self.front = factory()
+        self.back = factory()
+        self.lock = threading.Lock()
+
+    def swap(self):
+        """
+        Publishes the back snapshot as the new front.
+        """
+        with self.lock:
+            self.front, self.back = self.back, self.front
+
+
+class SimulationThread:
+    """
+    Daemon thread that runs `step` once each time start_frame() is called.
+    wait() blocks until that frame is done and re-raises anything it raised.
+    """
+    def __init__(self, step):
+        self.step = step
+        self.go = threading.Event()
+        self.done = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="simulation", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """
+        Worker loop: one step per start_frame().
+        """
+        while True:
+            self.go.wait()
+            self.go.clear()
+            try:
+                self.step()
+            except BaseException as error:      # Handed to the main thread by wait()
+                self.error = error
+            self.done.set()
+
+    def start_frame(self):
+        """
+        Lets the worker simulate the next frame.
+        """
+        self.done.clear()
+        self.go.set()
+
+    def wait(self):
+        """
+        Blocks until the worker has finished the frame.
+        """
+        self.done.wait()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+
+# ------------------------
+# Throughput Benchmark
+# ------------------------
+def benchmark(enemies, frames):
+    """
+    Plays the same seeded frames with and without the simulation thread and
+    returns {mode: frames per second}.
+    """
+    from game.headless import load_game
+
+    game = load_game()
+    if game.simulation_thread is None:
+        game.simulation_thread = SimulationThread(game.simulate_and_capture)
+    game.wave_director.live_cap = game.wave_director.max_live
+
+    def play(threaded):
+        game.session.reset(seed=enemies)
+        for _ in range(enemies):
+            game.add_enemy(game.enemy_pool.acquire(game.Ghoul))
+        for _ in range(30):                         # Let every enemy spawn
+            game.pipeline.run(render=False)
+        run_frame = game.run_pipelined_frame if threaded else game.pipeline.run
+        start = time.perf_counter()
+        for _ in range(frames):
+            game.render_backend.draw_background(game.camera, game.background)
+            run_frame()
+            game.render_backend.present()
+        return frames / (time.perf_counter() - start)
+
+    return {"sequential": play(False), "threaded": play(True)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the throughput of pipelined frames.")
+    parser.add_argument("--enemies", type=int, nargs="+", default=[0, 200, 1000])
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'enemies':>8}{'sequential fps':>16}{'threaded fps':>14}{'gain':>8}")
+    for count in args.enemies:
+        rates = benchmark(count, args.frames)
+        print(f"{count:>8}{rates['sequential']:>16.1f}{rates['threaded']:>14.1f}"
+              f"{rates['threaded'] / rates['sequential'] - 1:>8.0%}")
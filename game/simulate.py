@@ -0,0 +1,356 @@
+"""
+Batch Simulator
+Plays many headless runs of the wave/upgrade loop with a scripted player
+policy to compare balancing configurations. Runs are spread over a
+process pool; each worker imports the game once and replays seeded runs.
+
+A configuration is a dict (or a JSON list of them passed with --config):
+
+    {
+        "name": "tough_ghouls",
+        "enemy_stats": {"ghoul": {"health": 3, "speed": 2.5}},
+        "wave_table": {"1": {"spawns": [{"type": "ghoul", "count": 4}]}}
+    }
+
+"enemy_stats" is applied to every enemy of that type when it is created;
+"stats" in the wave table still win for the waves that set them.
+Every configuration is played with the same list of seeds, so differences
+in the report come from the configuration rather than luck.
+
+    python -m game.simulate --runs 64 --workers 4 --config configs.json --out report.json
+
+With --heatmap, every run records a heatmap (see game/heatmap.py); the
+workers send them back with their results and they are merged into one file.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import random
+from collections import deque
+
+import pygame
+
+from game.headless import load_game
+from game.heatmap import Heatmap
+from game.waves import DEFAULT_WAVE_TABLE
+
+FPS = 60
+DEFAULT_CONFIGS = [{"name": "baseline"}]
+UPGRADE_PREFERENCE = ["health", "mist", "blood", "bat", "dash"]
+
+_game = None    # main.py module, loaded once per worker process
+
+
+class KitingPolicy:
+    """
+    Scripted player: walks a grid route to the nearest enemy until it is
+    within keep_distance, then backs off toward the room centre. Shoots whenever the attack is ready and uses mist form when
+    something gets too close.
+    """
+    def __init__(self, game, keep_distance=140, replan_interval=10):
+        self.game = game
+        self.keep_distance = keep_distance
+        self.replan_interval = replan_interval
+        self.replan_timer = 0
+        self.route = []                     # Grid cells still to walk through
+
+    def plan_route(self, target):
+        """
+        Breadth-first search over the player's walkability grid to the target position.
+        """
+        player = self.game.player
+        grid = player.playable_area_grid
+        size = player.grid_size
+        start = (int(player.pos.x / size), int(player.pos.y / size))
+        goal = (int(target[0] / size), int(target[1] / size))
+        came_from = {start: None}
+        frontier = deque([start])
+        while frontier:
+            cell = frontier.popleft()
+            if cell == goal:
+                break
+            for dx, dy in ((0, -1), (0, 1), (-1, 0), (1, 0)):
+                x, y = cell[0] + dx, cell[1] + dy
+                if (x, y) not in came_from and 0 <= y < len(grid) and 0 <= x < len(grid[0]) and not grid[y][x]:
+                    came_from[(x, y)] = cell
+                    frontier.append((x, y))
+
+        route = []
+        cell = goal if goal in came_from else None
+        while cell is not None and cell != start:
+            route.append(cell)
+            cell = came_from[cell]
+        self.route = route[::-1]
+
+    def route_direction(self, target):
+        """
+        Returns a unit vector toward the next cell of the route to target.
+        """
+        player = self.game.player
+        size = player.grid_size
+        self.replan_timer -= 1
+        if self.replan_timer <= 0:
+            self.plan_route(target)
+            self.replan_timer = self.replan_interval
+        while self.route:
+            cell = self.route[0]
+            waypoint = pygame.math.Vector2(cell[0] * size + size / 2, cell[1] * size + size / 2)
+            offset = waypoint - player.pos
+            if offset.length_squared() > (size / 2) ** 2:
+                return offset.normalize()
+            self.route.pop(0)
+        offset = pygame.math.Vector2(target) - player.pos
+        return offset.normalize() if offset.length_squared() > 0 else offset
+
+    def nearest_enemy(self):
+        """
+        Returns (enemy, offset) for the closest spawned enemy, or (None, None).
+        """
+        player = self.game.player
+        nearest, nearest_offset, nearest_distance = None, None, math.inf
+        for enemy in self.game.enemy_group:
+            if not enemy.spawned:
+                continue
+            offset = pygame.math.Vector2(enemy.rect.center) - player.pos
+            distance = offset.length_squared()
+            if distance < nearest_distance:
+                nearest, nearest_offset, nearest_distance = enemy, offset, distance
+        return nearest, nearest_offset
+
+    def step(self):
+        """
+        Sets the player's velocity and fires attacks (replaces Player.user_input).
+        """
+        player = self.game.player
+        player.velocity_x = 0
+        player.velocity_y = 0
+        enemy, offset = self.nearest_enemy()
+        if enemy is None or offset.length_squared() == 0:
+            return
+
+        distance = offset.length()
+        direction = offset / distance
+        if distance < self.keep_distance:
+            # Back off, pulled toward the room centre so the player is not pinned in a corner
+            room = self.game.create_room_layout()[player.current_room]
+            to_centre = pygame.math.Vector2(room.center) - player.pos
+            move = -direction
+            if to_centre.length_squared() > 0:
+                move += to_centre.normalize()
+        else:
+            move = self.route_direction(enemy.rect.center)
+        if move.length_squared() > 0:
+            move.normalize_ip()
+        player.velocity_x = move.x * player.speed
+        player.velocity_y = move.y * player.speed
+
+        # Aim at the enemy the same way player_rotation aims at the mouse
+        player.angle = math.degrees(math.atan2(offset.y, offset.x)) + 90
+        if player.can_attack:
+            player.can_attack = False
+            player.attack_cooldown = 20
+            player.perform_attack()
+
+        if distance < 40 and player.has_mist_form and not player.invincible and player.blood_essence.use(20):
+            player.activate_mist_form()
+
+    def choose_upgrade(self, choices):
+        """
+        Picks the offered upgrade that ranks highest in UPGRADE_PREFERENCE.
+        """
+        effects = [choice["effect"] for choice in choices]
+        for effect in UPGRADE_PREFERENCE:
+            if effect in effects:
+                return effect
+        return effects[0] if effects else None
+
+
+def make_factory(game, enemy_stats):
+    """
+    Returns a pooled enemy factory that applies per-type stat overrides.
+    """
+    def build(enemy_class, stats):
+        def create():
+            enemy = game.enemy_pool.acquire(enemy_class)
+            for name, value in stats.items():
+                setattr(enemy, name, value)
+            return enemy
+        return create
+
+    return {name: build(enemy_class, enemy_stats.get(name, {}))
+            for name, enemy_class in game.ENEMY_TYPES.items()}
+
+
+def reset_game(game, config, seed):
+    """
+    Rewinds the game session to wave 1 with the configuration's wave table and stats.
+    """
+    wave_table = config.get("wave_table")
+    if wave_table is not None:
+        wave_table = {int(wave): entry for wave, entry in wave_table.items()}
+    else:
+        wave_table = DEFAULT_WAVE_TABLE
+    game.session.reset(seed)
+    game.wave_director.reset(make_factory(game, config.get("enemy_stats", {})), wave_table)
+
+
+def _init_worker():
+    """
+    Loads the game once per worker process.
+    """
+    global _game
+    _game = load_game()
+
+
+def run_simulation(task):
+    """
+    Plays one seeded run through every wave and the boss.
+    task is (config, seed, max_frames, record_heatmap). Returns a dict of
+    results, with the run's heatmap in the file format under "heatmap" when recorded.
+    """
+    config, seed, max_frames, record_heatmap = task
+    game = _game
+    reset_game(game, config, seed)
+    game.heatmap.clear()
+    game.heatmap.enabled = record_heatmap
+
+    policy = KitingPolicy(game)
+    game.pipeline.systems["input"] = [policy.step]
+
+    frame = 0
+    damage_taken = 0
+    clear_frames = []
+    survived = False
+    last_wave = game.MAX_WAVES + 1
+    for wave in range(1, last_wave + 1):
+        game.session.current_wave = wave
+        game.spawn_enemies(wave)
+        wave_start = frame
+        while (len(game.enemy_group) > 0 or not game.wave_director.finished()) and frame < max_frames:
+            health_before = game.player.health
+            game.pipeline.run(render=False)
+            frame += 1
+            if game.player.health < health_before:
+                damage_taken += health_before - game.player.health
+            if game.player.health <= 0:
+                break
+
+        if game.player.health <= 0 or frame >= max_frames:
+            break
+        clear_frames.append(frame - wave_start)
+        if wave < game.MAX_WAVES:
+            game.apply_upgrade(policy.choose_upgrade(game.get_upgrade_choices()))
+    else:
+        survived = True
+
+    result = {
+        "config": config.get("name", "unnamed"),
+        "seed": seed,
+        "survived": survived,
+        "waves_cleared": len(clear_frames),
+        "clear_frames": clear_frames,
+        "damage_taken": damage_taken,
+        "frames": frame,
+    }
+    if record_heatmap:
+        game.heatmap.runs = 1
+        result["heatmap"] = game.heatmap.to_bytes()
+    return result
+
+
+def aggregate(results):
+    """
+    Groups run results by configuration and returns summary statistics.
+    """
+    by_config = {}
+    for result in results:
+        by_config.setdefault(result["config"], []).append(result)
+
+    report = {}
+    for name, runs in by_config.items():
+        waves = max(len(run["clear_frames"]) for run in runs)
+        time_to_clear = []
+        for wave in range(waves):
+            cleared = [run["clear_frames"][wave] for run in runs if len(run["clear_frames"]) > wave]
+            time_to_clear.append(sum(cleared) / len(cleared) / FPS)
+        report[name] = {
+            "runs": len(runs),
+            "survival_rate": sum(run["survived"] for run in runs) / len(runs),
+            "mean_waves_cleared": sum(run["waves_cleared"] for run in runs) / len(runs),
+            "mean_time_to_clear_s": time_to_clear,
+            "mean_damage_taken": sum(run["damage_taken"] for run in runs) / len(runs),
+        }
+    return report
+
+
+def run_batch(configs, runs, workers=None, base_seed=0, max_frames=FPS * 60 * 10, record_heatmap=False):
+    """
+    Plays `runs` seeded simulations of every configuration in a process pool.
+    Returns (report, raw results).
+    """
+    seed_source = random.Random(base_seed)
+    seeds = [seed_source.getrandbits(32) for _ in range(runs)]
+    tasks = [(config, seed, max_frames, record_heatmap) for config in configs for seed in seeds]
+
+    # SDL turns SIGTERM into a QUIT event, so Pool.terminate() would wait on
+    # workers forever. Close the pool and let the workers exit on their own.
+    pool = multiprocessing.Pool(processes=workers, initializer=_init_worker)
+    try:
+        results = list(pool.imap_unordered(run_simulation, tasks, chunksize=max(1, len(tasks) // 64)))
+    finally:
+        pool.close()
+        pool.join()
+    return aggregate(results), results
+
+
+def merge_heatmaps(results):
+    """
+    Removes the per-run heatmaps from the results and returns them added together.
+    """
+    merged = None
+    for result in results:
+        heatmap = Heatmap.from_bytes(result.pop("heatmap"))
+        if merged is None:
+            merged = heatmap
+        else:
+            merged.merge(heatmap)
+    return merged
+
+
+def print_report(report):
+    """
+    Prints one summary line per configuration.
+    """
+    print(f"{'config':<20}{'runs':>6}{'survival':>10}{'waves':>8}{'damage':>8}  time to clear (s)")
+    for name, stats in report.items():
+        times = " ".join(f"{seconds:.1f}" for seconds in stats["mean_time_to_clear_s"])
+        print(f"{name:<20}{stats['runs']:>6}{stats['survival_rate']:>10.0%}"
+              f"{stats['mean_waves_cleared']:>8.2f}{stats['mean_damage_taken']:>8.2f}  {times}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run headless balancing simulations.")
+    parser.add_argument("--config", help="JSON file with a list of configurations")
+    parser.add_argument("--runs", type=int, default=32, help="Seeded runs per configuration")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed for the run seeds")
+    parser.add_argument("--max-seconds", type=int, default=600, help="Game-time limit per run")
+    parser.add_argument("--out", help="Write the report and raw results to this JSON file")
+    parser.add_argument("--heatmap", help="Record every run and write the merged heatmap to this file")
+    args = parser.parse_args()
+
+    configs = DEFAULT_CONFIGS
+    if args.config:
+        with open(args.config) as config_file:
+            configs = json.load(config_file)
+
+    report, results = run_batch(configs, args.runs, args.workers, args.seed, FPS * args.max_seconds,
+                                args.heatmap is not None)
+    print_report(report)
+    if args.heatmap:
+        merge_heatmaps(results).save(args.heatmap)
+    if args.out:
+        with open(args.out, "w") as out_file:
+            json.dump({"report": report, "results": results}, out_file, indent=2)
@@ -0,0 +1,217 @@
+"""
+Crowd Steering
+Local movement for enemies, run once per frame over the whole crowd.
+
+Enemy AI only decides where each enemy wants to go this frame (its desired
+velocity, with arrival slowing applied by arrive()). CrowdSteering then
+moves every enemy in one batched pass:
+
+    separation       push apart from overlapping neighbours
+    wall avoidance   drop the part of the velocity that would run into a
+                     blocked cell a few frames ahead, so enemies slide along walls
+
+Neighbours come from a uniform grid rebuilt each frame, so an enemy only
+looks at agents in the 3x3 cells around it and the pass stays close to
+linear in the number of enemies. In very dense crowds each enemy stops
+after max_neighbors candidates, which bounds the cost per enemy.
+"""
+
+import math
+
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))    # Radians; successive multiples never line up
+
+
+def arrive(dx, dy, max_speed, slow_radius=0):
+    """
+    Returns a velocity towards an offset, capped at max_speed and slowing
+    down linearly inside slow_radius so agents do not overshoot their goal.
+    """
+    distance = math.hypot(dx, dy)
+    if distance == 0:
+        return 0.0, 0.0
+    speed = max_speed
+    if distance < slow_radius:
+        speed = max_speed * distance / slow_radius
+    speed = min(speed, distance)
+    return dx / distance * speed, dy / distance * speed
+
+
+def follow_path(path, index, x, y, cell_size, speed):
+    """
+    Returns (index, desired_x, desired_y) for an agent at x, y walking a flat
+    x, y waypoint array from the cursor `index`, which must be inside the path.
+    Waypoints within one step are passed, so the cursor only moves forward;
+    the agent slows down on the last waypoint.
+    """
+    half_cell = cell_size / 2
+    while True:
+        offset_x = path[index] * cell_size + half_cell - x
+        offset_y = path[index + 1] * cell_size + half_cell - y
+        last = index + 2 >= len(path)
+        if last or offset_x * offset_x + offset_y * offset_y > speed * speed:
+            break
+        index += 2
+    slow_radius = cell_size * 2 if last else 0
+    return (index,) + arrive(offset_x, offset_y, speed, slow_radius)
+
+
+class NeighborGrid:
+    """
+    Uniform spatial hash of agent centres, rebuilt every frame.
+    """
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def rebuild(self, agents):
+        """
+        Buckets agents by the cell containing their centre.
+        """
+        cells = {}
+        size = self.cell_size
+        for agent in agents:
+            x, y = agent.rect.center
+            key = (x // size, y // size)
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [agent]
+            else:
+                bucket.append(agent)
+        self.cells = cells
+
+    def near(self, x, y):
+        """
+        Yields the agents in the 3x3 cells around a position.
+        """
+        cells = self.cells
+        cell_x = x // self.cell_size
+        cell_y = y // self.cell_size
+        for key_y in (cell_y - 1, cell_y, cell_y + 1):
+            for key_x in (cell_x - 1, cell_x, cell_x + 1):
+                bucket = cells.get((key_x, key_y))
+                if bucket:
+                    yield from bucket
+
+
+class CrowdSteering:
+    """
+    Applies separation and wall avoidance to every agent's desired velocity
+    and moves it. Agents need rect, speed, size_class, desired_x and
+    desired_y; the desired velocity is consumed (reset to zero) once applied.
+    """
+    def __init__(self, cell_size=64, separation_weight=1.5, lookahead=4, max_neighbors=16):
+        self.grid = NeighborGrid(cell_size)
+        self.cell_size = cell_size
+        self.separation_weight = separation_weight
+        self.max_neighbors = max_neighbors
+        self.lookahead = lookahead              # Frames ahead to probe for walls
+        self.neighbor_checks = 0                # Pairs examined last frame, for profiling
+
+    def separation(self, agent, order):
+        """
+        Returns the push away from overlapping neighbours, strongest when centres coincide.
+        order is the agent's position in the list being stepped; it picks the
+        direction exactly stacked agents split in, so runs are repeatable.
+        """
+        x, y = agent.rect.center
+        radius = min(agent.rect.width, agent.rect.height) / 2
+        push_x = push_y = 0.0
+        checks = 0
+        for other in self.grid.near(x, y):
+            if other is agent:
+                continue
+            if checks == self.max_neighbors:
+                break
+            checks += 1
+            other_x, other_y = other.rect.center
+            dx = x - other_x
+            dy = y - other_y
+            spacing = min(radius + min(other.rect.width, other.rect.height) / 2, self.cell_size)
+            distance_squared = dx * dx + dy * dy
+            if distance_squared >= spacing * spacing:
+                continue
+            distance = math.sqrt(distance_squared)
+            if distance == 0:
+                # Exactly stacked: split them along a stable, per-agent direction
+                angle = order * GOLDEN_ANGLE
+                dx, dy, distance = math.cos(angle), math.sin(angle), 1.0
+            strength = (spacing - distance) / spacing
+            push_x += dx / distance * strength
+            push_y += dy / distance * strength
+        self.neighbor_checks += checks
+        return push_x, push_y
+
+    def step(self, agents, is_walkable, nearest_open=None):
+        """
+        Moves every agent by its steered velocity.
+        is_walkable(x, y, size) tells whether an agent of that size class fits
+        centred on a world position (see block_origin in game/clearance.py).
+        nearest_open(x, y, size) returns the closest such world position, or
+        None; agents stuck inside a wall head for it.
+        """
+        self.grid.rebuild(agents)
+        self.neighbor_checks = 0
+        for order, agent in enumerate(agents):
+            self.move(agent, self.separation(agent, order), is_walkable, nearest_open)
+
+    def step_batch(self, agents, movers, is_walkable, nearest_open=None):
+        """
+        Like step(), but only the agents at the indices in movers move, and
+        every push is worked out from the positions at the start of the pass.
+        The result for a mover does not depend on which other movers share
+        its batch, so batches can be stepped separately (see game/swarm.py).
+        """
+        self.grid.rebuild(agents)
+        self.neighbor_checks = 0
+        pushes = [self.separation(agents[order], order) for order in movers]
+        for order, push in zip(movers, pushes):
+            self.move(agents[order], push, is_walkable, nearest_open)
+
+    def move(self, agent, push, is_walkable, nearest_open=None):
+        """
+        Moves one agent by its desired velocity plus a separation push, sliding along walls.
+        """
+        push_x, push_y = push
+        weight = self.separation_weight
+        lookahead = self.lookahead
+        velocity_x = agent.desired_x + push_x * weight * agent.speed
+        velocity_y = agent.desired_y + push_y * weight * agent.speed
+
+        # Never exceed the faster of the agent's speed and what the AI asked for
+        limit = max(agent.speed, math.hypot(agent.desired_x, agent.desired_y))
+        agent.desired_x = agent.desired_y = 0.0
+        speed = math.hypot(velocity_x, velocity_y)
+        if speed > limit:
+            velocity_x *= limit / speed
+            velocity_y *= limit / speed
+        step_x = round(velocity_x)
+        step_y = round(velocity_y)
+
+        rect = agent.rect
+        x, y = rect.center
+        size = agent.size_class
+        if not is_walkable(x, y, size):
+            # Already inside a wall (knocked back or rotated into it): take the step
+            # only if it lands in the open, else head for the nearest open cell
+            if (step_x or step_y) and is_walkable(x + step_x, y + step_y, size):
+                rect.move_ip(step_x, step_y)
+                return
+            target = nearest_open(x, y, size) if nearest_open else None
+            if target is not None:
+                escape_x, escape_y = arrive(target[0] - x, target[1] - y, max(agent.speed, 1))
+                rect.move_ip(round(escape_x), round(escape_y))
+            return
+        if not (step_x or step_y):
+            return
+
+        # Wall avoidance: drop the blocked axis if the path ahead runs into a wall
+        if not is_walkable(x + step_x * lookahead, y + step_y * lookahead, size):
+            if is_walkable(x + step_x * lookahead, y, size):
+                step_y = 0
+            elif is_walkable(x, y + step_y * lookahead, size):
+                step_x = 0
+
+        for move_x, move_y in ((step_x, step_y), (step_x, 0), (0, step_y)):
+            if (move_x or move_y) and is_walkable(x + move_x, y + move_y, size):
+                rect.move_ip(move_x, move_y)
+                break
@@ -0,0 +1,515 @@
+"""
+Swarm AI
+Shards the shared enemy AI (state machine, flow-field pathing, path
+following and crowd steering) over worker processes, for endless waves with thousands
+of enemies.
+
+Enemy state lives in one multiprocessing.shared_memory block laid out as
+one array of doubles per field, indexed by slot; each enemy keeps its slot
+while it is alive. The walkability grid is a second, read-only block of
+bytes (1 = blocked); the rows of streamed chunks are re-copied, and the
+header says which cells changed since which version, so each worker
+updates its own clearance map (game/clearance.py) for just those cells.
+
+Each frame the main process writes positions, sizes, size classes and
+speeds in, and
+workers and main meet at a barrier. Worker k then handles the slots
+where slot % workers == k: it runs the AI, and steers against every
+enemy's position from the start of the frame (CrowdSteering.step_batch).
+It writes new positions to separate output arrays, so no worker reads
+anything another writes in the same frame. A second barrier ends the
+frame and the main process copies results back in slot order. State
+timers use a random generator seeded from (seed, frame, slot), so results
+are the same for any number of workers.
+
+Paths stay inside the workers. Boss enemies, enemies that have not
+spawned yet and enemies beyond the slot capacity keep running on the
+main process, as do sprite rotation and type-specific abilities.
+
+    python main.py --endless --swarm-workers 4
+    python -m game.swarm --enemies 2000 10000 --workers 0 1 2 4
+"""
+
+import argparse
+import atexit
+import multiprocessing
+import random
+import signal
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import pygame
+
+from game.clearance import ESCAPE_REACH, ClearanceMap, block_origin
+from game.steering import CrowdSteering, arrive, follow_path
+
+WORKER_TIMEOUT = 10.0      # Seconds the main process waits at a barrier before giving up on the workers
+STATES = ("hunt", "dodge", "recover")
+STATE_CODES = {name: code for code, name in enumerate(STATES)}
+
+# Frame header, then one array per field
+HEADER = ("player_x", "player_y", "view_x", "view_y", "view_width", "view_height",
+          "frame", "seed", "slots", "stop", "grid_version",
+          "grid_from", "dirty_left", "dirty_top", "dirty_right", "dirty_bottom")
+FIELDS = ("active", "generation", "x", "y", "width", "height", "size_class", "speed",
+          "state", "state_timer", "path_timer", "out_x", "out_y")
+
+
+class SharedState:
+    """
+    Typed views over the shared blocks: header[name] and fields[name][slot]
+    as doubles, and the grid as a list of byte rows indexed grid[y][x].
+    """
+    def __init__(self, state_memory, grid_memory, capacity, columns, rows):
+        self.state_memory = state_memory
+        self.grid_memory = grid_memory
+        doubles = state_memory.buf.cast("d")
+        self.doubles = doubles
+        self.header = {name: index for index, name in enumerate(HEADER)}
+        self.fields = {}
+        offset = len(HEADER)
+        for name in FIELDS:
+            self.fields[name] = doubles[offset:offset + capacity]
+            offset += capacity
+        self.grid_bytes = grid_memory.buf
+        self.grid = [grid_memory.buf[row * columns:(row + 1) * columns] for row in range(rows)]
+
+    def get(self, name):
+        """
+        Reads a header value.
+        """
+        return self.doubles[self.header[name]]
+
+    def set(self, name, value):
+        """
+        Writes a header value.
+        """
+        self.doubles[self.header[name]] = value
+
+    def release(self):
+        """
+        Drops the views so the shared blocks can be closed.
+        """
+        for view in self.fields.values():
+            view.release()
+        for row in self.grid:
+            row.release()
+        self.doubles.release()
+        self.fields.clear()
+        self.grid = []
+
+
+class Agent:
+    """
+    A worker's view of one enemy: what CrowdSteering needs plus the path it follows.
+    """
+    __slots__ = ("rect", "speed", "size_class", "desired_x", "desired_y", "path", "path_index", "generation")
+
+    def __init__(self):
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.speed = 0
+        self.size_class = 1
+        self.desired_x = 0.0
+        self.desired_y = 0.0
+        self.path = ()
+        self.path_index = 0
+        self.generation = -1
+
+
+def state_timer(seed, frame, slot):
+    """
+    Returns a new state duration (60-120 frames), the same for any shard layout.
+    """
+    return random.Random((int(seed) * 1000003 + int(frame)) * 1000003 + slot).randint(60, 120)
+
+
+def sync_clearance(shared, clearance):
+    """
+    Brings a worker's clearance map up to the shared grid's version, updating
+    only the changed cells if the map is at the version they were changed from.
+    """
+    version = shared.get("grid_version")
+    if clearance.version == version:
+        return
+    changes = None
+    if clearance.version == shared.get("grid_from"):
+        left, top = int(shared.get("dirty_left")), int(shared.get("dirty_top"))
+        changes = [(left, top, int(shared.get("dirty_right")) - left, int(shared.get("dirty_bottom")) - top)]
+    clearance.sync(version, changes)
+
+
+def step_shard(shared, agents, worker, workers, cell_size, steering, clearance):
+    """
+    Runs one frame of AI and steering for this worker's slots.
+    agents holds the worker's Agent objects by slot and persists between frames;
+    clearance is the worker's ClearanceMap over the shared grid.
+    """
+    fields = shared.fields
+    active = fields["active"]
+    generation = fields["generation"]
+    xs, ys = fields["x"], fields["y"]
+    widths, heights = fields["width"], fields["height"]
+    speeds = fields["speed"]
+    size_classes = fields["size_class"]
+    states = fields["state"]
+    state_timers = fields["state_timer"]
+    path_timers = fields["path_timer"]
+    sync_clearance(shared, clearance)
+    player_x = shared.get("player_x")
+    player_y = shared.get("player_y")
+    view = pygame.Rect(shared.get("view_x"), shared.get("view_y"),
+                       shared.get("view_width"), shared.get("view_height"))
+    frame = shared.get("frame")
+    seed = shared.get("seed")
+    goal = (int(player_x / cell_size), int(player_y / cell_size))
+    hunt, dodge = STATE_CODES["hunt"], STATE_CODES["dodge"]
+
+    # Every active enemy at its start-of-frame position, for separation
+    everyone = []
+    movers = []
+    for slot in range(int(shared.get("slots"))):
+        if not active[slot]:
+            continue
+        agent = agents.get(slot)
+        if agent is None:
+            agent = agents[slot] = Agent()
+        agent.rect.update(xs[slot], ys[slot], widths[slot], heights[slot])
+        agent.speed = speeds[slot]
+        agent.size_class = int(size_classes[slot])
+        if slot % workers == worker:
+            movers.append((slot, agent, len(everyone)))
+        everyone.append(agent)
+
+    for slot, agent, _ in movers:
+        if agent.generation != generation[slot]:
+            # A new enemy took over this slot
+            agent.generation = generation[slot]
+            agent.path = ()
+            agent.path_index = 0
+
+        rect = agent.rect
+        state = states[slot]
+        if state == hunt:
+            origin_x, origin_y = block_origin(*rect.center, agent.size_class, cell_size)
+            if path_timers[slot] <= 0:
+                agent.path = clearance.find_path(agent.size_class,
+                                                 (int(origin_x / cell_size), int(origin_y / cell_size)), goal)
+                agent.path_index = 2 if len(agent.path) > 2 else 0
+                path_timers[slot] = 10 if view.colliderect(rect) else 30
+            else:
+                path_timers[slot] -= 1
+            if agent.path_index < len(agent.path):
+                agent.path_index, agent.desired_x, agent.desired_y = follow_path(
+                    agent.path, agent.path_index, origin_x, origin_y, cell_size, agent.speed)
+        elif state == dodge:
+            agent.desired_x, agent.desired_y = arrive(rect.centerx - player_x, rect.centery - player_y,
+                                                      agent.speed * 1.5)
+
+        state_timers[slot] -= 1
+        if state_timers[slot] <= 0:
+            states[slot] = hunt
+            state_timers[slot] = state_timer(seed, frame, slot)
+
+    def is_walkable(x, y, size):
+        x, y = block_origin(x, y, size, cell_size)
+        return clearance.fits(int(x / cell_size), int(y / cell_size), size)
+
+    def nearest_open(x, y, size):
+        x, y = block_origin(x, y, size, cell_size)
+        cell = clearance.nearest_fit((int(x / cell_size), int(y / cell_size)), size, size + ESCAPE_REACH)
+        if cell is None:
+            return None
+        return cell[0] * cell_size + size * cell_size / 2, cell[1] * cell_size + size * cell_size / 2
+
+    steering.step_batch(everyone, [order for _, _, order in movers], is_walkable, nearest_open)
+    out_x, out_y = fields["out_x"], fields["out_y"]
+    for slot, agent, _ in movers:
+        out_x[slot] = agent.rect.x
+        out_y[slot] = agent.rect.y
+
+
+def worker_loop(worker, workers, state_name, grid_name, capacity, columns, rows, cell_size, barrier):
+    """
+    Worker process: waits at the start barrier, steps its shard, meets the
+    others at the end barrier, until the main process sets the stop flag.
+    """
+    # Ctrl+C reaches the whole process group; the main process decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    state_memory = shared_memory.SharedMemory(name=state_name)
+    grid_memory = shared_memory.SharedMemory(name=grid_name)
+    shared = SharedState(state_memory, grid_memory, capacity, columns, rows)
+    agents = {}
+    steering = CrowdSteering()
+    clearance = ClearanceMap(shared.grid)
+    try:
+        while True:
+            barrier.wait()
+            if shared.get("stop"):
+                break
+            step_shard(shared, agents, worker, workers, cell_size, steering, clearance)
+            barrier.wait()
+    except threading.BrokenBarrierError:
+        pass                                # The main process gave up on a worker and aborted the barrier
+    finally:
+        shared.release()
+        state_memory.close()
+        grid_memory.close()
+
+
+class SwarmAI:
+    """
+    Main-process side: owns the shared memory and worker processes and maps
+    enemies to slots. step() runs one frame of AI for a list of enemies.
+    """
+    def __init__(self, tile_map, workers, capacity=16384, seed=0):
+        self.tile_map = tile_map
+        self.workers = workers
+        self.capacity = capacity
+        self.cell_size = tile_map.tile_size
+        self.seed = seed
+        self.frame = 0
+        self.slots = {}                     # enemy -> slot
+        self.free = []                      # Released slots, reused lowest first
+        self.next_slot = 0                  # High-water mark
+        self.grid_version = -1
+
+        size = 8 * (len(HEADER) + len(FIELDS) * capacity)
+        self.state_memory = shared_memory.SharedMemory(create=True, size=size)
+        self.grid_memory = shared_memory.SharedMemory(create=True, size=tile_map.columns * tile_map.rows)
+        self.shared = SharedState(self.state_memory, self.grid_memory, capacity, tile_map.columns, tile_map.rows)
+
+        # Fork: main.py runs the game at import time, so a spawned child could not re-import it
+        context = multiprocessing.get_context("fork")
+        self.barrier = context.Barrier(workers + 1)
+        self.processes = [
+            context.Process(target=worker_loop, name=f"swarm-{worker}",
+                            args=(worker, workers, self.state_memory.name, self.grid_memory.name, capacity,
+                                  tile_map.columns, tile_map.rows, self.cell_size, self.barrier))
+            for worker in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+        atexit.register(self.close)
+
+    def slot_for(self, enemy):
+        """
+        Returns the enemy's slot, assigning a free one (or None if full).
+        """
+        slot = self.slots.get(enemy)
+        if slot is not None:
+            return slot
+        if self.free:
+            self.free.sort(reverse=True)
+            slot = self.free.pop()
+        elif self.next_slot < self.capacity:
+            slot = self.next_slot
+            self.next_slot += 1
+        else:
+            return None
+        fields = self.shared.fields
+        fields["generation"][slot] += 1
+        fields["state"][slot] = STATE_CODES.get(enemy.state, 0)
+        fields["state_timer"][slot] = enemy.state_timer
+        fields["path_timer"][slot] = enemy.path_update_timer
+        fields["active"][slot] = 1
+        self.slots[enemy] = slot
+        return slot
+
+    def release_missing(self, present):
+        """
+        Frees the slots of enemies that are no longer in the swarm.
+        """
+        active = self.shared.fields["active"]
+        for enemy in [enemy for enemy in self.slots if enemy not in present]:
+            slot = self.slots.pop(enemy)
+            active[slot] = 0
+            self.free.append(slot)
+
+    def sync_grid(self):
+        """
+        Copies the rows of the tile map's walkability grid that changed into
+        shared memory, with the bounds of the changed cells for the workers.
+        """
+        tile_map = self.tile_map
+        if self.grid_version == tile_map.version:
+            return
+        shared = self.shared
+        columns, rows = tile_map.columns, tile_map.rows
+        changes = tile_map.changes_since(self.grid_version)
+        if changes is None:
+            left, top, right, bottom = 0, 0, columns, rows
+            shared.set("grid_from", -1)                 # Workers rebuild everything
+        else:
+            left = max(0, min(column for column, _, _, _ in changes))
+            top = max(0, min(row for _, row, _, _ in changes))
+            right = min(columns, max(column + width for column, _, width, _ in changes))
+            bottom = min(rows, max(row + height for _, row, _, height in changes))
+            shared.set("grid_from", self.grid_version)
+        grid_bytes = shared.grid_bytes
+        for row in range(top, bottom):
+            grid_bytes[row * columns:(row + 1) * columns] = bytes(tile_map.grid[row])
+        for name, value in (("dirty_left", left), ("dirty_top", top), ("dirty_right", right), ("dirty_bottom", bottom)):
+            shared.set(name, value)
+        self.grid_version = tile_map.version
+        shared.set("grid_version", self.grid_version)
+
+    def step(self, enemies, player_position, view):
+        """
+        Runs one frame of AI and steering for the enemies in the worker
+        processes and moves them. Returns the enemies it could not take
+        (slot capacity reached), for the caller to update itself.
+        """
+        present = set(enemies)
+        self.release_missing(present)
+        self.sync_grid()
+
+        shared = self.shared
+        fields = shared.fields
+        xs, ys = fields["x"], fields["y"]
+        widths, heights = fields["width"], fields["height"]
+        speeds, states = fields["speed"], fields["state"]
+        size_classes = fields["size_class"]
+        overflow = []
+        members = []
+        for enemy in enemies:
+            slot = self.slot_for(enemy)
+            if slot is None:
+                overflow.append(enemy)
+                continue
+            rect = enemy.rect
+            xs[slot] = rect.x
+            ys[slot] = rect.y
+            widths[slot] = rect.width
+            heights[slot] = rect.height
+            speeds[slot] = enemy.speed
+            size_classes[slot] = enemy.size_class
+            states[slot] = STATE_CODES.get(enemy.state, 0)
+            members.append((slot, enemy))
+
+        shared.set("player_x", player_position[0])
+        shared.set("player_y", player_position[1])
+        shared.set("view_x", view.x)
+        shared.set("view_y", view.y)
+        shared.set("view_width", view.width)
+        shared.set("view_height", view.height)
+        shared.set("frame", self.frame)
+        shared.set("seed", self.seed)
+        shared.set("slots", self.next_slot)
+        try:
+            self.barrier.wait(timeout=WORKER_TIMEOUT)       # Workers start
+            self.barrier.wait(timeout=WORKER_TIMEOUT)       # Workers done
+        except threading.BrokenBarrierError:
+            raise RuntimeError("A swarm worker died or stopped responding") from None
+        self.frame += 1
+
+        # Merge in slot order
+        out_x, out_y = fields["out_x"], fields["out_y"]
+        state_timers, path_timers = fields["state_timer"], fields["path_timer"]
+        members.sort(key=lambda member: member[0])
+        for slot, enemy in members:
+            enemy.rect.topleft = (out_x[slot], out_y[slot])
+            enemy.state = STATES[int(states[slot])]
+            enemy.state_timer = int(state_timers[slot])
+            enemy.path_update_timer = int(path_timers[slot])
+        return overflow
+
+    def reset(self, seed=0):
+        """
+        Forgets every enemy and restarts the frame count, for a new run.
+        """
+        self.release_missing(set())
+        self.free.clear()
+        self.next_slot = 0
+        self.frame = 0
+        self.seed = seed
+
+    def close(self):
+        """
+        Stops the workers and frees the shared memory. Runs at exit, so it
+        never blocks for long: workers that do not reach the stop barrier
+        (dead or stuck) are released by aborting it, and any still running
+        after WORKER_TIMEOUT are terminated.
+        """
+        if not self.processes:
+            return
+        self.shared.set("stop", 1)
+        try:
+            self.barrier.wait(timeout=WORKER_TIMEOUT)
+        except threading.BrokenBarrierError:
+            self.barrier.abort()
+        for process in self.processes:
+            process.join(timeout=WORKER_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.processes = []
+        self.shared.release()
+        self.state_memory.close()
+        self.state_memory.unlink()
+        self.grid_memory.close()
+        self.grid_memory.unlink()
+
+
+# ------------------------
+# Scaling Benchmark
+# ------------------------
+def measure(enemies, workers, frames, connection):
+    """
+    Times the enemy AI and steering for `enemies` ghouls, on the main
+    process (workers=0) or sharded over worker processes, and sends the ms per frame.
+    main.py creates the swarm itself, before pygame starts.
+    """
+    sys.argv = ["main.py", "--swarm-workers", str(workers)] if workers else ["main.py"]
+    from game.headless import load_game
+
+    game = load_game()
+    swarm = game.swarm_ai
+    try:
+        game.session.reset(seed=enemies)
+        game.wave_director.clear()
+        for _ in range(enemies):
+            enemy = game.enemy_pool.acquire(game.Ghoul)
+            game.add_enemy(enemy)
+            while not enemy.spawned:
+                enemy.spawn_randomly(game.player.playable_area_grid, game.player.pos, 150)
+
+        game.update_enemies()               # First paths and worker warm-up
+        start = time.perf_counter()
+        for _ in range(frames):
+            game.update_enemies()
+        connection.send((time.perf_counter() - start) * 1000 / frames)
+    finally:
+        if swarm is not None:
+            swarm.close()           # A process target's exit skips atexit hooks
+
+
+def benchmark(enemies, workers, frames):
+    """
+    Runs measure() in a fresh process and returns ms per frame.
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=measure, args=(enemies, workers, frames, sender))
+    process.start()
+    sender.close()                  # So recv() fails instead of hanging if the process dies
+    try:
+        return receiver.recv()
+    finally:
+        process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how swarm AI scales with worker processes.")
+    parser.add_argument("--enemies", type=int, nargs="+", default=[2000, 10000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--frames", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{multiprocessing.cpu_count()} CPUs; workers 0 = single-process AI")
+    print(f"{'enemies':>8}{'workers':>9}{'ms/frame':>10}")
+    for count in args.enemies:
+        for workers in args.workers:
+            print(f"{count:>8}{workers:>9}{benchmark(count, workers, args.frames):>10.1f}")
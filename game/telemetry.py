@@ -0,0 +1,215 @@
+"""
+Telemetry
+In-process event bus for lining up frame-time spikes with what happened
+in the game (waves starting, enemies spawning, boss phases, teleports,
+upgrades, player damage).
+
+emit() appends a small tuple to a ring buffer and returns; a background
+thread drains the buffer and writes JSON lines to a local file, so the
+frame loop never waits on disk. If the writer falls behind, the oldest
+unwritten events are dropped and counted. While telemetry is off, emit()
+returns after a single attribute check.
+
+Every line is one event:
+
+    {"f": 812, "t": 13534.2, "e": "frame", "ms": 9.81}
+    {"f": 812, "t": 13530.1, "e": "boss_phase", "phase": 2}
+
+f is the frame number, t milliseconds since start, e the event kind.
+
+Record a session and analyse it:
+
+    python main.py --telemetry telemetry.jsonl
+    python -m game.telemetry telemetry.jsonl
+"""
+
+import atexit
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+FRAME_BUDGET_MS = 1000 / 60
+
+
+class TelemetryBus:
+    """
+    Ring buffer of (frame, time_ms, kind, fields) events with an asynchronous file writer.
+    """
+    def __init__(self, capacity=16384, flush_interval=0.5):
+        self.enabled = False
+        self.buffer = deque(maxlen=capacity)
+        self.flush_interval = flush_interval    # Seconds between writer wake-ups
+        self.frame_number = 0
+        self.frame_start = 0.0
+        self.start_time = 0.0
+        self.dropped = 0                        # Events lost because the writer fell behind
+        self.written = 0
+        self.path = None
+        self.writer = None
+        self.stop_event = threading.Event()
+
+    def start(self, path):
+        """
+        Opens the output file and starts the writer thread.
+        """
+        if self.enabled:
+            return
+        self.path = path
+        self.start_time = self.frame_start = time.perf_counter()
+        self.stop_event.clear()
+        self.writer = threading.Thread(target=self.write_loop, args=(open(path, "w"),),
+                                       name="telemetry-writer", daemon=True)
+        self.enabled = True
+        self.writer.start()
+        atexit.register(self.close)         # Menus quit with sys.exit(); still flush the tail
+
+    def emit(self, kind, **fields):
+        """
+        Records an event for the current frame.
+        """
+        if not self.enabled:
+            return
+        buffer = self.buffer
+        if len(buffer) == buffer.maxlen:
+            self.dropped += 1
+        buffer.append((self.frame_number, (time.perf_counter() - self.start_time) * 1000, kind, fields))
+
+    def begin_frame(self):
+        """
+        Marks the start of a frame's work.
+        """
+        if self.enabled:
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """
+        Records the frame's work time (before clock.tick sleeps) and advances the frame number.
+        """
+        if not self.enabled:
+            return
+        self.emit("frame", ms=round((time.perf_counter() - self.frame_start) * 1000, 3))
+        self.frame_number += 1
+
+    def write_loop(self, output):
+        """
+        Writer thread: drains the ring buffer to the file until stopped.
+        """
+        buffer = self.buffer
+        with output:
+            while True:
+                stopping = self.stop_event.wait(self.flush_interval)
+                lines = []
+                while buffer:
+                    frame, time_ms, kind, fields = buffer.popleft()
+                    record = {"f": frame, "t": round(time_ms, 2), "e": kind}
+                    record.update(fields)
+                    lines.append(json.dumps(record, separators=(",", ":")))
+                if lines:
+                    output.write("\n".join(lines) + "\n")
+                    output.flush()
+                    self.written += len(lines)
+                if stopping:
+                    break
+
+    def close(self):
+        """
+        Stops recording and waits for the writer to flush what is left.
+        """
+        if not self.enabled:
+            return
+        if self.dropped:
+            self.emit("telemetry_dropped", count=self.dropped)
+        self.enabled = False
+        self.stop_event.set()
+        self.writer.join()
+        self.writer = None
+
+
+# Shared instance used by the game
+telemetry = TelemetryBus()
+
+
+# ------------------------
+# Offline Analyzer
+# ------------------------
+def load_events(path):
+    """
+    Reads a telemetry file. Returns ({frame: frame_ms}, [event dicts without frame records]).
+    """
+    frame_times = {}
+    events = []
+    with open(path) as telemetry_file:
+        for line in telemetry_file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["e"] == "frame":
+                frame_times[record["f"]] = record["ms"]
+            else:
+                events.append(record)
+    return frame_times, events
+
+
+def analyze(frame_times, events, window=2, spikes=10):
+    """
+    Lines events up with frame time. For each event kind, reports how often
+    it occurs and the mean and worst frame time in the frames from the
+    event to `window` frames after it. Also lists the slowest frames with
+    the events just before them.
+    """
+    if not frame_times:
+        return {"frames": 0, "kinds": {}, "spikes": []}
+    times = sorted(frame_times.values())
+    report = {
+        "frames": len(times),
+        "mean_ms": sum(times) / len(times),
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "over_budget": sum(1 for ms in times if ms > FRAME_BUDGET_MS),
+        "kinds": {},
+        "spikes": [],
+    }
+
+    by_frame = {}
+    for event in events:
+        by_frame.setdefault(event["f"], []).append(event)
+        after = [frame_times[frame] for frame in range(event["f"], event["f"] + window + 1) if frame in frame_times]
+        kind = report["kinds"].setdefault(event["e"], {"count": 0, "total_ms": 0.0, "samples": 0, "worst_ms": 0.0})
+        kind["count"] += 1
+        kind["total_ms"] += sum(after)
+        kind["samples"] += len(after)
+        kind["worst_ms"] = max([kind["worst_ms"]] + after)
+    for kind in report["kinds"].values():
+        total_ms = kind.pop("total_ms")
+        samples = kind.pop("samples")
+        kind["mean_ms"] = total_ms / samples if samples else 0.0
+
+    for frame, frame_ms in sorted(frame_times.items(), key=lambda item: -item[1])[:spikes]:
+        nearby = [event["e"] for other in range(frame - window, frame + 1) for event in by_frame.get(other, [])]
+        report["spikes"].append({"frame": frame, "ms": frame_ms, "events": nearby})
+    return report
+
+
+def print_report(report):
+    """
+    Prints the analysis as two small tables.
+    """
+    if not report["frames"]:
+        print("No frames recorded")
+        return
+    print(f"{report['frames']} frames, mean {report['mean_ms']:.2f} ms, p95 {report['p95_ms']:.2f} ms, "
+          f"{report['over_budget']} over the {FRAME_BUDGET_MS:.1f} ms budget")
+    print(f"\n{'event':<20}{'count':>7}{'mean ms':>10}{'worst ms':>10}")
+    for name, kind in sorted(report["kinds"].items(), key=lambda item: -item[1]["mean_ms"]):
+        print(f"{name:<20}{kind['count']:>7}{kind['mean_ms']:>10.2f}{kind['worst_ms']:>10.2f}")
+    print(f"\n{'slowest frame':<14}{'ms':>8}  events in the frames before")
+    for spike in report["spikes"]:
+        print(f"{spike['frame']:<14}{spike['ms']:>8.2f}  {', '.join(spike['events']) or '-'}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python -m game.telemetry telemetry.jsonl")
+        sys.exit(1)
+    print_report(analyze(*load_events(sys.argv[1])))
@@ -0,0 +1,240 @@
+"""
+Tile Map
+Level format and chunk streaming for castle maps.
+
+A level is a JSON file in levels/ describing the world in pixels:
+
+    {
+        "size": [800, 700],                  World width and height
+        "background": "images/...png",       Stretched over the whole world
+        "tile_size": 15,                     Walkability grid cell size
+        "chunk_tiles": 16,                   Chunk width/height in tiles
+        "player_start": [x, y],
+        "boss_spawn": [x, y],
+        "rooms": {"name": [x, y, w, h]},     Walkable areas
+        "obstacles": [[x, y, w, h]],         Blocked areas inside rooms
+        "portals": [{"rooms": ["a", "b"], "rect": [x, y, w, h]}],
+        "spawn_zones": [[x, y, w, h]]        Where enemies may appear (default: every room)
+    }
+
+The walkability grid is split into chunks. A chunk is compiled from the
+room geometry the first time the player comes near it and written into
+the shared grid; chunks far from the player are evicted and read as
+blocked until they are streamed back in, unless an enemy is standing in
+them. Each chunk write is remembered, so the clearance map can update
+just the regions that changed. Compiled chunks are kept in a
+small LRU cache so walking back and forth does not recompile them.
+When a LevelCache (game/levelcache.py) is attached, chunks are read from
+the precompiled on-disk grid instead of being sampled.
+"""
+
+import json
+import math
+from collections import OrderedDict, deque
+
+import pygame
+
+CHANGE_HISTORY = 256        # Chunk writes remembered for changes_since()
+
+
+class TileMap:
+    """
+    Level geometry plus a streamed walkability grid.
+    grid[y][x] is True for obstacles, matching the original playable-area grid.
+    """
+    def __init__(self, level, load_radius=3, cache_chunks=64):
+        self.name = level.get("name", "level")
+        self.width, self.height = level["size"]
+        self.background_path = level["background"]
+        self.tile_size = level.get("tile_size", 15)
+        self.chunk_tiles = level.get("chunk_tiles", 16)
+        self.player_start = tuple(level["player_start"])
+        self.boss_spawn = tuple(level["boss_spawn"])
+        self.rooms = {name: pygame.Rect(rect) for name, rect in level["rooms"].items()}
+        self.obstacles = [pygame.Rect(rect) for rect in level.get("obstacles", [])]
+        self.portals = [(tuple(portal["rooms"]), pygame.Rect(portal["rect"])) for portal in level.get("portals", [])]
+        self.spawn_zones = [pygame.Rect(zone) for zone in level.get("spawn_zones", [])] or list(self.rooms.values())
+
+        self.columns = math.ceil(self.width / self.tile_size)
+        self.rows = math.ceil(self.height / self.tile_size)
+        self.chunk_columns = math.ceil(self.columns / self.chunk_tiles)
+        self.chunk_rows = math.ceil(self.rows / self.chunk_tiles)
+        self.load_radius = load_radius
+        self.cache_chunks = cache_chunks
+
+        self.grid = [[True] * self.columns for _ in range(self.rows)]
+        self.loaded = set()                 # Chunks currently written into the grid
+        self.compiled = OrderedDict()       # (cx, cy) -> bytearray of walkable flags, LRU order
+        self.version = 0                    # Bumped whenever the grid changes
+        self.changes = deque(maxlen=CHANGE_HISTORY)     # (version, (column, row, columns, rows)) per chunk write
+        self.level_cache = None             # Optional precompiled grid to read chunks from
+        self.spawn_cache = (-1, [])
+        self.streamed = None                # (x, y, version) of the last stream(), so standing still is free
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """
+        Loads a level from a JSON file.
+        """
+        with open(path) as level_file:
+            return cls(json.load(level_file), **kwargs)
+
+    def contains_point(self, position):
+        """
+        Returns True if a world position is inside a room and not inside an obstacle.
+        Uses the level geometry directly, so it works for unloaded chunks too.
+        """
+        for room in self.rooms.values():
+            if room.collidepoint(position):
+                break
+        else:
+            return False
+        for obstacle in self.obstacles:
+            if obstacle.collidepoint(position):
+                return False
+        return True
+
+    def room_at(self, position):
+        """
+        Returns the name of the room containing the position, or None.
+        """
+        for room_name, room_rect in self.rooms.items():
+            if room_rect.collidepoint(position):
+                return room_name
+        return None
+
+    def chunk_bounds(self, key):
+        """
+        Returns the world-space rect covered by a chunk.
+        """
+        size = self.chunk_tiles * self.tile_size
+        return pygame.Rect(key[0] * size, key[1] * size, size, size)
+
+    def compile_chunk(self, key):
+        """
+        Samples each cell's top-left corner against the rooms and obstacles
+        overlapping the chunk. Returns a bytearray of walkable flags.
+        """
+        bounds = self.chunk_bounds(key)
+        rooms = [room for room in self.rooms.values() if room.colliderect(bounds)]
+        obstacles = [obstacle for obstacle in self.obstacles if obstacle.colliderect(bounds)]
+        tiles = self.chunk_tiles
+        walkable = bytearray(tiles * tiles)
+        if not rooms:
+            return walkable
+
+        for row in range(tiles):
+            y = bounds.y + row * self.tile_size
+            for column in range(tiles):
+                point = (bounds.x + column * self.tile_size, y)
+                if (any(room.collidepoint(point) for room in rooms) and
+                        not any(obstacle.collidepoint(point) for obstacle in obstacles)):
+                    walkable[row * tiles + column] = 1
+        return walkable
+
+    def write_chunk(self, key, walkable):
+        """
+        Copies a chunk's flags into the shared grid (None marks it blocked again).
+        """
+        tiles = self.chunk_tiles
+        first_column = key[0] * tiles
+        first_row = key[1] * tiles
+        for row in range(min(tiles, self.rows - first_row)):
+            grid_row = self.grid[first_row + row]
+            for column in range(min(tiles, self.columns - first_column)):
+                grid_row[first_column + column] = walkable is None or not walkable[row * tiles + column]
+        self.version += 1
+        self.changes.append((self.version, (first_column, first_row, tiles, tiles)))
+
+    def changes_since(self, version):
+        """
+        Returns the grid regions (column, row, columns, rows) written after
+        `version`, or None if that is further back than the history remembers.
+        """
+        if version is None or version < self.version - len(self.changes):
+            return None
+        return [region for written, region in self.changes if written > version]
+
+    def load_chunk(self, key):
+        """
+        Streams a chunk into the grid, compiling or reading it if it is not cached.
+        """
+        walkable = self.compiled.get(key)
+        if walkable is None:
+            if self.level_cache is not None:
+                walkable = self.level_cache.chunk(key)
+            else:
+                walkable = self.compile_chunk(key)
+            self.compiled[key] = walkable
+            if len(self.compiled) > self.cache_chunks:
+                self.compiled.popitem(last=False)
+        else:
+            self.compiled.move_to_end(key)
+        self.write_chunk(key, walkable)
+        self.loaded.add(key)
+
+    def evict_chunk(self, key):
+        """
+        Removes a chunk from the grid. Its compiled data stays in the LRU cache.
+        """
+        self.write_chunk(key, None)
+        self.loaded.discard(key)
+
+    def chunks_near(self, rect, radius):
+        """
+        Returns the chunk keys within `radius` chunks of a world-space rect.
+        """
+        size = self.chunk_tiles * self.tile_size
+        first_x = max(0, rect.left // size - radius)
+        last_x = min(self.chunk_columns - 1, rect.right // size + radius)
+        first_y = max(0, rect.top // size - radius)
+        last_y = min(self.chunk_rows - 1, rect.bottom // size + radius)
+        return {(cx, cy) for cy in range(first_y, last_y + 1) for cx in range(first_x, last_x + 1)}
+
+    def stream(self, position, occupied=None):
+        """
+        Loads chunks around the position and around any portal the player is
+        approaching, and evicts chunks that are well out of range.
+        occupied, if given, returns chunk keys that must stay loaded as well
+        (where enemies are, so they do not freeze on cells that read as blocked).
+        Does nothing if neither the position nor the grid changed since the last call.
+        """
+        x, y = int(position[0]), int(position[1])
+        if self.streamed == (x, y, self.version):
+            return
+        here = pygame.Rect(x, y, 0, 0)
+        wanted = self.chunks_near(here, self.load_radius)
+
+        # Preload the far side of nearby doorways so the next room is ready on arrival
+        reach = self.chunk_tiles * self.tile_size * self.load_radius
+        for _, portal_rect in self.portals:
+            if portal_rect.inflate(reach * 2, reach * 2).collidepoint(position):
+                wanted |= self.chunks_near(portal_rect, 1)
+        if occupied is not None:
+            wanted |= occupied()
+
+        for key in wanted - self.loaded:
+            self.load_chunk(key)
+
+        # One chunk of hysteresis so walking along a border does not thrash
+        keep = self.chunks_near(here, self.load_radius + 1) | wanted
+        for key in self.loaded - keep:
+            self.evict_chunk(key)
+        self.streamed = (x, y, self.version)
+
+    def random_spawn_position(self, rng):
+        """
+        Returns the top-left of a random loaded walkable cell inside a spawn zone.
+        """
+        version, positions = self.spawn_cache
+        if version != self.version:
+            positions = []
+            for y, row in enumerate(self.grid):
+                for x, blocked in enumerate(row):
+                    if blocked:
+                        continue
+                    point = (x * self.tile_size, y * self.tile_size)
+                    if any(zone.collidepoint(point) for zone in self.spawn_zones):
+                        positions.append(point)
+            self.spawn_cache = (self.version, positions)
+        return rng.choice(positions) if positions else (0, 0)
@@ -0,0 +1,197 @@
+"""
+Wave Director
+Data-driven enemy waves. A wave table maps wave numbers to spawn entries;
+waves beyond the table come from an endless-mode generator that grows
+enemy counts and shifts the enemy mix geometrically.
+
+Wave table format (Python dict or JSON file with string keys):
+
+    {
+        "1": {"spawns": [{"type": "ghoul", "count": 2}]},
+        "3": {"spawns": [{"type": "ghoul", "count": 3,
+                          "stats": {"health": 1, "speed": 1.5}}]}
+    }
+
+"type" names an entry in the enemy factory passed to WaveDirector and
+"stats" overrides attributes on each spawned enemy.
+
+The director spreads spawns over frames (a few per frame instead of a
+whole wave at once) and throttles the number of live enemies so the
+frame time stays under a target.
+"""
+
+import json
+from collections import deque
+
+import pygame
+
+# Story waves 1-3 and the boss wave, matching the original hand-written spawns
+DEFAULT_WAVE_TABLE = {
+    1: {"spawns": [{"type": "ghoul", "count": 2}]},
+    2: {"spawns": [{"type": "ghoul", "count": 4},
+                   {"type": "vampire", "count": 1}]},
+    3: {"spawns": [{"type": "ghoul", "count": 3,
+                    "stats": {"health": 1, "speed": 1.5, "blood_value": 15}},
+                   {"type": "vampire", "count": 1,
+                    "stats": {"health": 2, "speed": 2, "teleport_cooldown": 300, "blood_value": 30}},
+                   {"type": "werewolf", "count": 1,
+                    "stats": {"health": 2, "speed": 3, "blood_value": 50}}]},
+    4: {"spawns": [{"type": "vampire_lord", "count": 1}]},
+}
+
+# Endless mode tuning
+ENDLESS_BASE_COUNT = 6        # Enemies in the first endless wave
+ENDLESS_GROWTH = 1.35         # Count multiplier per wave
+ENDLESS_MIX_TARGETS = {       # Share of each type the mix converges to
+    "ghoul": 0.5,
+    "vampire": 0.3,
+    "werewolf": 0.2,
+}
+ENDLESS_MIX_RATE = 0.8        # Per-wave decay of the distance to the target mix
+
+
+def load_wave_table(path):
+    """
+    Loads a wave table from a JSON file. Keys are converted to wave numbers.
+    """
+    with open(path) as wave_file:
+        data = json.load(wave_file)
+    return {int(wave): entry for wave, entry in data.items()}
+
+
+def endless_wave(wave_number, first_wave=1):
+    """
+    Generates spawn entries for an endless-mode wave.
+    The count grows geometrically and the mix starts as all ghouls, moving
+    geometrically toward ENDLESS_MIX_TARGETS.
+    """
+    step = max(0, wave_number - first_wave)
+    total = int(round(ENDLESS_BASE_COUNT * ENDLESS_GROWTH ** step))
+    closeness = 1 - ENDLESS_MIX_RATE ** step
+
+    spawns = []
+    remaining = total
+    for enemy_type, target in ENDLESS_MIX_TARGETS.items():
+        if enemy_type == "ghoul":
+            continue
+        count = int(total * target * closeness)
+        if count > 0:
+            spawns.append({"type": enemy_type, "count": count})
+            remaining -= count
+    spawns.insert(0, {"type": "ghoul", "count": remaining})
+    return {"spawns": spawns}
+
+
+class WaveDirector:
+    """
+    Queues the spawns of a wave and releases them a few per frame.
+    The live-enemy cap shrinks when frames run over frame_target_ms and
+    grows back when there is headroom.
+    """
+    def __init__(self, factory, add_enemy, wave_table=None, endless=False,
+                 spawns_per_frame=4, frame_target_ms=14.0, min_live=10, max_live=10000):
+        self.factory = factory                  # Type name -> enemy class
+        self.add_enemy = add_enemy              # Callback adding an enemy to the game groups
+        self.wave_table = wave_table if wave_table is not None else DEFAULT_WAVE_TABLE
+        self.endless = endless
+        self.last_story_wave = self.find_last_story_wave()
+        self.spawns_per_frame = spawns_per_frame
+        self.frame_target_ms = frame_target_ms
+        self.min_live = min_live
+        self.max_live = max_live
+        self.live_cap = max_live
+        self.frame_ms_average = None
+        self.throttle_cooldown = 0              # Frames to wait before the cap may shrink again
+        self.pending = deque()                  # (type, stats) waiting to spawn
+        self.wave_group = pygame.sprite.Group()
+
+    def find_last_story_wave(self):
+        """
+        Returns the last table wave without a boss. Endless mode takes over after it.
+        """
+        regular = [wave for wave, entry in self.wave_table.items()
+                   if all(spawn["type"] != "vampire_lord" for spawn in entry["spawns"])]
+        return max(regular) if regular else 0
+
+    def wave_entry(self, wave_number):
+        """
+        Returns the spawn entry for a wave: generated in endless mode past the
+        story waves, otherwise from the table (empty if the table has no entry).
+        """
+        if self.endless and wave_number > self.last_story_wave:
+            return endless_wave(wave_number, self.last_story_wave + 1)
+        return self.wave_table.get(wave_number, {"spawns": []})
+
+    def start_wave(self, wave_number):
+        """
+        Queues every spawn of the wave and returns the group that will hold its enemies.
+        """
+        self.wave_group = pygame.sprite.Group()
+        for spawn in self.wave_entry(wave_number)["spawns"]:
+            stats = spawn.get("stats", {})
+            for _ in range(spawn["count"]):
+                self.pending.append((spawn["type"], stats))
+        return self.wave_group
+
+    def clear(self):
+        """
+        Drops any spawns that have not happened yet.
+        """
+        self.pending.clear()
+
+    def reset(self, factory=None, wave_table=None):
+        """
+        Drops pending spawns and restores the live cap for a new run.
+        A factory or wave table passed in replaces the current one.
+        """
+        if factory is not None:
+            self.factory = factory
+        if wave_table is not None:
+            self.wave_table = wave_table
+            self.last_story_wave = self.find_last_story_wave()
+        self.pending.clear()
+        self.live_cap = self.max_live
+        self.frame_ms_average = None
+        self.throttle_cooldown = 0
+        self.wave_group = pygame.sprite.Group()
+
+    def finished(self):
+        """
+        Returns True when every queued enemy has been spawned.
+        """
+        return not self.pending
+
+    def update_throttle(self, live_count, frame_ms):
+        """
+        Adjusts the live-enemy cap from a smoothed frame time.
+        """
+        if self.frame_ms_average is None:
+            self.frame_ms_average = frame_ms
+        else:
+            self.frame_ms_average += (frame_ms - self.frame_ms_average) * 0.1
+
+        if self.throttle_cooldown > 0:
+            self.throttle_cooldown -= 1
+        elif self.frame_ms_average > self.frame_target_ms:
+            # Shrink, then give the smoothed frame time a chance to react
+            self.live_cap = max(self.min_live, int(min(self.live_cap, live_count) * 0.9))
+            self.throttle_cooldown = 30
+        elif self.frame_ms_average < self.frame_target_ms * 0.8:
+            self.live_cap = min(self.max_live, self.live_cap + self.spawns_per_frame)
+
+    def update(self, live_count, frame_ms=None):
+        """
+        Spawns up to spawns_per_frame queued enemies while under the live cap.
+        frame_ms is the work time of the previous frame, or None to skip throttling.
+        """
+        if frame_ms is not None:
+            self.update_throttle(live_count, frame_ms)
+
+        budget = min(self.spawns_per_frame, len(self.pending), self.live_cap - live_count)
+        for _ in range(budget):
+            enemy_type, stats = self.pending.popleft()
+            enemy = self.factory[enemy_type]()
+            for name, value in stats.items():
+                setattr(enemy, name, value)
+            self.add_enemy(enemy)
+            self.wave_group.add(enemy)
@@ -5,26 +5,93 @@ initial story events, sound effects, and custom utility classes
 for core mechanics like blood essence and projectiles.
 """
 
+import atexit
+import os
 import sys
 import pygame
 import math
-import heapq
 import random
+import weakref
+from array import array
+
+from game.camera import Camera
+from game.clearance import ESCAPE_REACH, ClearanceMap, block_origin, size_class
+from game.heatmap import Heatmap
+from game.lighting import LightingLayer
+from game.pipeline import UpdatePipeline
+from game.pool import ObjectPool
+from game.levelcache import LevelCache
+from game.los import LineOfSight
+from game.particles import create_particle_system
+from game.profiler import profiler
+from game.quality import governor
+from game.render import create_backend
+from game.simthread import DoubleBuffer, FrameSnapshot, SimulationThread
+from game.steering import CrowdSteering, arrive, follow_path
+from game.swarm import SwarmAI
+from game.telemetry import telemetry
+from game.tilemap import TileMap
+from game.waves import WaveDirector
+from game import snapshot
+
+# ------------------------
+# Castle Map
+# ------------------------
+# Level geometry comes from levels/<name>.json; the walkability grid is
+# streamed in chunks around the player (see game/tilemap.py).
+MAP_NAME = sys.argv[sys.argv.index("--map") + 1] if "--map" in sys.argv else "castle"
+tile_map = TileMap.load(f"levels/{MAP_NAME}.json")
+tile_map.level_cache = LevelCache.for_tile_map(tile_map)   # Compiled once, then memory-mapped
+WORLD_WIDTH, WORLD_HEIGHT = tile_map.width, tile_map.height
+MINIMAP_SCALE = 4 * WORLD_WIDTH // 800    # World pixels per minimap pixel
+
+# Cells visible from the player, recast when the player changes cell
+line_of_sight = LineOfSight(tile_map)
+clearance_map = ClearanceMap(tile_map.grid)    # Where each enemy size fits, plus shared flow fields
+clearance_map.sync(tile_map.version)
+crowd_steering = CrowdSteering()
+
+# --swarm-workers N shards enemy AI over N processes (see game/swarm.py).
+# Forked before pygame.init(), so the workers do not inherit SDL's display and audio state.
+SWARM_WORKERS = int(sys.argv[sys.argv.index("--swarm-workers") + 1]) if "--swarm-workers" in sys.argv else 0
+swarm_ai = SwarmAI(tile_map, SWARM_WORKERS) if SWARM_WORKERS else None
 
 pygame.init()
 
 # ------------------------
 # Screen and Clock Setup
 # ------------------------
-screen = pygame.display.set_mode((800, 700))
-pygame.display.set_caption("Whispers of The Undead")
+# --renderer texture draws sprites as SDL textures instead of software blits (see game/render.py)
+RENDERER = sys.argv[sys.argv.index("--renderer") + 1] if "--renderer" in sys.argv else "surface"
+RENDER_SCALE = float(sys.argv[sys.argv.index("--render-scale") + 1]) if "--render-scale" in sys.argv else 1.0
+RENDER_FILTER = sys.argv[sys.argv.index("--render-filter") + 1] if "--render-filter" in sys.argv else "nearest"
+render_backend = create_backend(RENDERER, (800, 700), "Whispers of The Undead",
+                                scale=RENDER_SCALE, smooth=RENDER_FILTER == "smooth")
+screen = render_backend.screen
 clock = pygame.time.Clock()
 
+# Where the player and enemies spend time and take damage; off unless --heatmap is given
+heatmap = Heatmap.for_tile_map(tile_map)
+
+# Scrolling view over the world; sprites outside it are not drawn
+camera = Camera(800, 700, WORLD_WIDTH, WORLD_HEIGHT)
+
+# Blood sprays and bursts, updated and drawn in bulk (see game/particles.py)
+particles = create_particle_system()
+
+# --lighting darkens the castle outside the player's torch and glowing attacks (see game/lighting.py)
+lighting = None
+if "--lighting" in sys.argv:
+    if render_backend.name == "texture":
+        print("--lighting needs the surface renderer; drawing the castle fully lit")
+    else:
+        lighting = LightingLayer(render_backend.world.get_size(), scale=render_backend.scale)
+
 # ------------------------
 # Background Setup
 # ------------------------
-# Scaled pixel-art background for the vampire castle scene
-background = pygame.transform.scale(pygame.image.load("images/vampire_castle.png").convert(), (800, 700))
+# Scaled pixel-art background for the vampire castle scene, covering the whole world
+background = pygame.transform.scale(pygame.image.load(tile_map.background_path).convert(), (WORLD_WIDTH, WORLD_HEIGHT))
 
 import textwrap  # Used for formatting long story text
 
@@ -33,15 +100,117 @@ import textwrap  # Used for formatting long story text
 # ------------------------
 MAX_WAVES = 3             # Total number of waves before boss appears
 FINAL_BOSS_WAVE = 3       # Wave at which the final boss is triggered
+ENDLESS_MODE = "--endless" in sys.argv  # Generated waves forever instead of the boss
+HEADLESS = False          # Set by game/headless.py; skips blocking story and intro screens
+QUICKSAVE_PATH = "quicksave.snap"  # F5 saves a snapshot here, F9 restores it
+TELEMETRY_PATH = sys.argv[sys.argv.index("--telemetry") + 1] if "--telemetry" in sys.argv else None
+if TELEMETRY_PATH:
+    telemetry.start(TELEMETRY_PATH)  # Before the first wave is queued, so it is recorded
+THREADED_SIMULATION = "--threaded" in sys.argv  # Simulate the next frame while drawing this one
+HEATMAP_PATH = sys.argv[sys.argv.index("--heatmap") + 1] if "--heatmap" in sys.argv else None
+heatmap.enabled = HEATMAP_PATH is not None
+governor.enabled = "--adaptive-quality" in sys.argv  # Trade optional work for frame rate under load
 
 # ------------------------
 # Load In-Game Assets
 # ------------------------
+image_cache = {}
+
+def load_image(path, scale=None, size=None):
+    """
+    Loads and scales an image once; every later call returns the same surface.
+    Shared images must not be drawn onto - copy them first.
+    """
+    key = (path, scale, size)
+    image = image_cache.get(key)
+    if image is None:
+        image = pygame.image.load(path).convert_alpha()
+        if size is not None:
+            image = pygame.transform.scale(image, size)
+        elif scale is not None:
+            image = pygame.transform.rotozoom(image, 0, scale)
+        image_cache[key] = image
+    return image
+
+MASK_STEP = 5          # Degrees between the rotations collision masks are cached for
+# image -> {angle: [rotated image, its collision mask or None until needed]}. Weak keys:
+# an image's rotations are freed with it (e.g. the boss's tinted copy after a restore).
+rotation_cache = weakref.WeakKeyDictionary()
+rect_masks = {}        # (width, height) -> fully set mask
+
+def rotation_entry(image, angle):
+    """
+    Returns the cache entry for an (image, quantized angle) pair, rotating the image once.
+    """
+    rotations = rotation_cache.get(image)
+    if rotations is None:
+        rotations = rotation_cache[image] = {}
+    entry = rotations.get(angle)
+    if entry is None:
+        entry = rotations[angle] = [pygame.transform.rotate(image, angle), None]
+    return entry
+
+def rotated_image(image, angle):
+    """
+    Returns the image rotated by a quantized angle, rotating each (image, angle) pair once.
+    """
+    return rotation_entry(image, angle)[0]
+
+def rotated_mask(image, angle):
+    """
+    Returns the collision mask of the image rotated to the nearest MASK_STEP
+    degrees, built once and kept next to that rotation.
+    """
+    entry = rotation_entry(image, round(angle / MASK_STEP) * MASK_STEP % 360)
+    if entry[1] is None:
+        entry[1] = pygame.mask.from_surface(entry[0])
+    return entry[1]
+
+def rect_mask(size):
+    """
+    Returns a fully set mask for a hitbox of the given size.
+    """
+    mask = rect_masks.get(size)
+    if mask is None:
+        mask = rect_masks[size] = pygame.mask.Mask(size, fill=True)
+    return mask
+
+def masks_overlap(mask_a, center_a, mask_b, center_b):
+    """
+    Narrow phase: returns True if two masks centred on world positions share a set pixel.
+    Rotation keeps an image's centre, so centres line masks up whatever the rect sizes.
+    """
+    width_a, height_a = mask_a.get_size()
+    width_b, height_b = mask_b.get_size()
+    offset = (center_b[0] - width_b // 2 - center_a[0] + width_a // 2,
+              center_b[1] - height_b // 2 - center_a[1] + height_a // 2)
+    return mask_a.overlap(mask_b, offset) is not None
+
 partner_image = pygame.transform.scale(pygame.image.load("images/vampire_partner.png").convert_alpha(), (70, 70))
 blood_essence_image = pygame.transform.scale(pygame.image.load("images/blood_essence.png").convert_alpha(), (30, 30))
 vampire_lord_image = pygame.transform.scale(pygame.image.load("images/vampire_boss.png").convert_alpha(), (120, 120))
 rescue_background = pygame.transform.scale(pygame.image.load("images/rescue_scene.png").convert(), (800, 700))
 
+font_cache = {}        # size -> default font
+text_cache = {}        # (text, size, colour) -> rendered text
+TEXT_CACHE_LIMIT = 256
+
+def render_text(text, size, color):
+    """
+    Returns the text rendered in the default font, rendering each
+    (text, size, colour) once; the HUD draws the same strings every frame.
+    """
+    key = (text, size, color)
+    image = text_cache.get(key)
+    if image is None:
+        font = font_cache.get(size)
+        if font is None:
+            font = font_cache[size] = pygame.font.Font(None, size)
+        if len(text_cache) >= TEXT_CACHE_LIMIT:
+            text_cache.clear()
+        image = text_cache[key] = font.render(text, True, color)
+    return image
+
 # ------------------------
 # Story Events by Wave
 # ------------------------
@@ -71,14 +240,10 @@ pygame.mixer.Channel(0).play(menu_sound, -1)
 def create_room_layout():
     """
     Returns a dictionary defining rectangular boundaries of different rooms.
-    Used for collision detection and rendering logic.
+    Used for collision detection and rendering logic. The rects are shared
+    with the tile map, so callers must not modify them.
     """
-    rooms = {
-        "entrance": pygame.Rect(45, 110, 260, 440),
-        "hallway": pygame.Rect(300, 200, 180, 80),
-        "grand_hall": pygame.Rect(480, 110, 260, 440),
-    }
-    return rooms
+    return tile_map.rooms
 
 # ------------------------
 # Blood Essence System
@@ -88,6 +253,8 @@ class BloodEssence:
     Manages the player's blood essence resource used for healing or power-ups.
     Includes gain, use, display, and healing methods.
     """
+    __slots__ = ("current", "maximum", "font", "image")
+
     def __init__(self):
         self.current = 50
         self.maximum = 100
@@ -120,10 +287,8 @@ class BloodEssence:
         """
         Renders the blood essence UI bar and label on the screen.
         """
-        font = pygame.font.Font(None, 36)
-        
-        essence_label = font.render("Blood Essence", True, (255, 215, 0))
-        essence_shadow = font.render("Blood Essence", True, (0, 0, 0))
+        essence_label = render_text("Blood Essence", 36, (255, 215, 0))
+        essence_shadow = render_text("Blood Essence", 36, (0, 0, 0))
         
         label_x = screen.get_width() // 2 - essence_label.get_width() // 2
         image_x = label_x - self.image.get_width() - 5
@@ -163,6 +328,8 @@ class BloodProjectile(pygame.sprite.Sprite):
     Represents a blood orb projectile fired by the boss.
     Moves in a fixed direction and deals damage on contact.
     """
+    __slots__ = ("image", "rect", "direction", "speed", "lifetime")
+
     def __init__(self, x, y, direction):
         super().__init__()
         self.image = pygame.Surface((12, 12), pygame.SRCALPHA)
@@ -174,7 +341,7 @@ class BloodProjectile(pygame.sprite.Sprite):
         
     def update(self):
         """
-        Moves the projectile and handles collisions and expiration.
+        Moves the projectile and handles expiration (movement phase).
         """
         # Move projectile
         self.rect.x += self.direction.x * self.speed
@@ -183,18 +350,23 @@ class BloodProjectile(pygame.sprite.Sprite):
         self.lifetime -= 1
         if self.lifetime <= 0:
             self.kill()
+        
+        # Destroy projectile if it leaves bounds or hits invalid area
+        if (self.rect.x < 0 or self.rect.x > WORLD_WIDTH or 
+            self.rect.y < 0 or self.rect.y > WORLD_HEIGHT or
+            not is_within_playable_area(self.rect.center)):
+            self.kill()
 
-        # Deal damage to player on contact
+    def check_hits(self):
+        """
+        Deals damage to the player on contact (collision phase).
+        """
         if self.rect.colliderect(player.hitbox_rect) and not player.invincible:
             player.health -= 1
             player.invincible = True
             player.invincibility_timer = 60  # Frames of invincibility
-            self.kill()
-        
-        # Destroy projectile if it leaves bounds or hits invalid area
-        if (self.rect.x < 0 or self.rect.x > 800 or 
-            self.rect.y < 0 or self.rect.y > 700 or
-            not is_within_playable_area(pygame.math.Vector2(self.rect.centerx, self.rect.centery))):
+            telemetry.emit("player_hit", source="blood_projectile", health=player.health)
+            record_player_hit()
             self.kill()
 
 
@@ -206,6 +378,8 @@ class BloodDrop(pygame.sprite.Sprite):
     Represents a blood essence collectible that drops from enemies or events.
     Adds to the player's blood essence when collected.
     """
+    __slots__ = ("image", "rect", "amount")
+
     def __init__(self, x, y, amount):
         super().__init__()
         self.image = pygame.Surface((10, 10), pygame.SRCALPHA)
@@ -214,7 +388,9 @@ class BloodDrop(pygame.sprite.Sprite):
         self.amount = amount
         
     def update(self):
-        # Check for collision with player and apply the essence bonus
+        """
+        Checks for collision with player and applies the essence bonus (collision phase).
+        """
         if pygame.sprite.collide_rect(self, player):
             player.blood_essence.gain(self.amount)
             self.kill()
@@ -224,29 +400,48 @@ class BloodDrop(pygame.sprite.Sprite):
 # ------------------------
 def is_within_playable_area(position):
     """
-    Checks if a given position (Vector2) is inside any defined playable room.
-    Returns True if position is within a room.
+    Checks if a given position (Vector2 or x, y pair) is inside any defined playable room.
+    Returns True if position is within a room and not blocked by an obstacle.
     """
-    rooms = create_room_layout()
-    for room in rooms.values():
-        if room.collidepoint(position):
-            return True
-    return False
+    return tile_map.contains_point(position)
 
-def create_playable_area_grid(grid_size):
+def is_open_cell(x, y, size=1):
     """
-    Creates a 2D grid representing walkable vs non-walkable areas.
-    Used for movement and environmental restrictions.
+    Returns True if an enemy of the given size class fits centred on a world
+    position. Used by enemy steering.
     """
-    grid = []
-    for y in range(0, 700, grid_size):
-        row = []
-        for x in range(0, 800, grid_size):
-            pos = pygame.math.Vector2(x, y)
-            is_obstacle = not is_within_playable_area(pos)
-            row.append(is_obstacle)
-        grid.append(row)
-    return grid
+    tile_size = tile_map.tile_size
+    x, y = block_origin(x, y, size, tile_size)
+    return clearance_map.fits(int(x / tile_size), int(y / tile_size), size)
+
+def nearest_open_cell(x, y, size=1):
+    """
+    Returns the closest world position an enemy of the given size class fits
+    centred on, or None. Steering walks enemies stuck in a wall towards it.
+    """
+    tile_size = tile_map.tile_size
+    x, y = block_origin(x, y, size, tile_size)
+    cell = clearance_map.nearest_fit((int(x / tile_size), int(y / tile_size)), size, size + ESCAPE_REACH)
+    if cell is None:
+        return None
+    return cell[0] * tile_size + size * tile_size / 2, cell[1] * tile_size + size * tile_size / 2
+
+def record_player_hit():
+    """
+    Marks a hit on the player, and their death if it was the last one, on the heatmap.
+    """
+    heatmap.add("player_damage", player.rect.center)
+    if player.health <= 0:
+        heatmap.add("player_deaths", player.rect.center)
+
+KEY_STATE_EVENTS = (pygame.KEYDOWN, pygame.KEYUP, pygame.WINDOWFOCUSLOST)
+
+def forget_keys():
+    """
+    Drops the player's cached keyboard state so the next input phase re-reads it.
+    Menus and story screens run their own event loop and swallow key releases.
+    """
+    player.keys = None
 
 # ------------------------
 # Start Menu Screen
@@ -264,9 +459,11 @@ def start_menu():
     
     menu_text = menu_font.render("Press 'Space' to Start", True, (200, 200, 200))
     text_rect = menu_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2))
+    camera.follow(player.pos)
     
     pygame.mixer.Channel(0).play(menu_sound, loops=-1)
 
+    forget_keys()
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -278,8 +475,9 @@ def start_menu():
                 pygame.mixer.Channel(1).play(background_music, loops=-1)
                 return
 
-        # Draw background with dark overlay
-        screen.blit(background, (0, 0))
+        # Draw the castle around the player with a dark overlay
+        render_backend.draw_background(camera, background)
+        render_backend.finish_world()
         overlay = pygame.Surface((800, 700), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 150))
         screen.blit(overlay, (0, 0))
@@ -287,7 +485,7 @@ def start_menu():
         # Draw menu UI text
         screen.blit(title_text, title_rect)
         screen.blit(menu_text, text_rect)
-        pygame.display.update()
+        render_backend.present()
 
 # ------------------------
 # Player Class
@@ -297,10 +495,17 @@ class Player(pygame.sprite.Sprite):
     Represents the main player character.
     Handles movement, attacking, health, room transitions, and special abilities.
     """
+    __slots__ = ("pos", "image", "base_player_image", "hitbox_rect", "rect",
+                 "can_attack", "attack_cooldown", "health", "max_health", "invincible",
+                 "invincibility_timer", "grid_size", "playable_area_grid", "current_room", "speed",
+                 "blood_essence", "has_dash", "has_mist_form", "has_bat_transform",
+                 "velocity_x", "velocity_y", "mouse_coords", "x_change_mouse_player",
+                 "y_change_mouse_player", "angle", "attack", "keys")
+
     def __init__(self):
         super().__init__()
-        self.pos = pygame.math.Vector2(200, 500)
-        self.image = pygame.transform.rotozoom(pygame.image.load('images/vampire_player.png').convert_alpha(), 0, 0.18)
+        self.pos = pygame.math.Vector2(tile_map.player_start)
+        self.image = load_image('images/vampire_player.png', scale=0.18)
         self.base_player_image = self.image
 
         # Collision hitbox
@@ -316,11 +521,14 @@ class Player(pygame.sprite.Sprite):
         self.invincible = False
         self.invincibility_timer = 0
 
-        # Movement and environment
-        self.grid_size = 15
-        self.playable_area_grid = create_playable_area_grid(self.grid_size)
+        # Movement and environment (grid is shared with the tile map and streamed around the player)
+        tile_map.stream(self.pos)
+        self.grid_size = tile_map.tile_size
+        self.playable_area_grid = tile_map.grid
         self.current_room = "entrance"
         self.speed = 5
+        self.angle = 0                  # Facing, set from the mouse every movement phase
+        self.keys = None                # Keyboard state; None re-reads it after key events
 
         # Power-up system
         self.blood_essence = BloodEssence()
@@ -328,16 +536,45 @@ class Player(pygame.sprite.Sprite):
         self.has_mist_form = False
         self.has_bat_transform = False
 
+    def reset(self):
+        """
+        Restores the starting position, health, resources and abilities in place.
+        """
+        self.pos = pygame.math.Vector2(tile_map.player_start)
+        self.hitbox_rect.center = self.pos
+        self.rect.center = self.pos
+        self.can_attack = True
+        self.attack_cooldown = 0
+        self.health = 3
+        self.max_health = 3
+        self.invincible = False
+        self.invincibility_timer = 0
+        self.current_room = "entrance"
+        self.speed = 5
+        self.blood_essence.current = 50
+        self.blood_essence.maximum = 100
+        self.has_dash = self.has_mist_form = self.has_bat_transform = False
+        tile_map.stream(self.pos)
+
     def player_rotation(self):
         """
         Rotates player sprite to face the mouse pointer.
         """
-        self.mouse_coords = pygame.mouse.get_pos()
+        self.mouse_coords = camera.to_world(pygame.mouse.get_pos())
         self.x_change_mouse_player = self.mouse_coords[0] - self.hitbox_rect.centerx
         self.y_change_mouse_player = self.mouse_coords[1] - self.hitbox_rect.centery
         self.angle = math.degrees(math.atan2(self.y_change_mouse_player, self.x_change_mouse_player)) + 90
-        self.image = pygame.transform.rotate(self.base_player_image, -self.angle)
-        self.rect = self.image.get_rect(center=self.hitbox_rect.center)
+        self.image = rotated_image(self.base_player_image, round(-self.angle) % 360)
+        self.rect.size = self.image.get_size()
+        self.rect.center = self.hitbox_rect.center
+
+    def texture_source(self):
+        """
+        Returns the unrotated image and rotation angle for the texture renderer.
+        """
+        if self.image is self.base_player_image:
+            return self.image, 0
+        return self.base_player_image, -self.angle
 
     def user_input(self):
         """
@@ -345,7 +582,9 @@ class Player(pygame.sprite.Sprite):
         """
         self.velocity_x = 0
         self.velocity_y = 0
-        keys = pygame.key.get_pressed()
+        keys = self.keys
+        if keys is None:
+            keys = self.keys = pygame.key.get_pressed()
 
         # Movement inputs
         if keys[pygame.K_w]:
@@ -415,23 +654,23 @@ class Player(pygame.sprite.Sprite):
         """
         Updates player position based on input and room boundaries.
         """
-        new_pos = self.pos + pygame.math.Vector2(self.velocity_x, self.velocity_y)
-        grid_x = int(new_pos.x / self.grid_size)
-        grid_y = int(new_pos.y / self.grid_size)
+        if self.velocity_x or self.velocity_y:
+            new_x = self.pos.x + self.velocity_x
+            new_y = self.pos.y + self.velocity_y
+            grid_x = int(new_x / self.grid_size)
+            grid_y = int(new_y / self.grid_size)
 
-        if 0 <= grid_x < len(self.playable_area_grid[0]) and 0 <= grid_y < len(self.playable_area_grid):
-            if not self.playable_area_grid[grid_y][grid_x]:
-                self.pos = new_pos
+            if 0 <= grid_x < len(self.playable_area_grid[0]) and 0 <= grid_y < len(self.playable_area_grid):
+                if not self.playable_area_grid[grid_y][grid_x]:
+                    self.pos.update(new_x, new_y)
 
         self.hitbox_rect.center = self.pos
         self.rect.center = self.hitbox_rect.center
 
         # Update current room based on new position
-        rooms = create_room_layout()
-        for room_name, room_rect in rooms.items():
-            if room_rect.collidepoint(self.pos):
-                self.current_room = room_name
-                break
+        room_name = tile_map.room_at(self.pos)
+        if room_name is not None:
+            self.current_room = room_name
 
     def draw_health(self):
         """
@@ -447,13 +686,17 @@ class Player(pygame.sprite.Sprite):
 
     def update(self):
         """
-        Handles per-frame updates for input, health, blood essence, and room status.
+        Moves and rotates the player (movement phase).
+        Input is read separately by user_input() in the input phase.
         """
-        self.user_input()
         self.move()
         self.player_rotation()
         self.blood_essence.update()
 
+    def update_timers(self):
+        """
+        Ticks attack cooldown and invincibility timers (cleanup phase).
+        """
         # Handle attack cooldown
         if self.attack_cooldown > 0:
             self.attack_cooldown -= 1
@@ -466,15 +709,17 @@ class Player(pygame.sprite.Sprite):
             if self.invincibility_timer <= 0:
                 self.invincible = False
 
-        # UI rendering
+    def draw_hud(self):
+        """
+        Draws health, blood essence and current room (render phase).
+        """
         self.draw_health()
         self.blood_essence.draw(screen)
 
         # Display current room on screen
-        font = pygame.font.Font(None, 36)
         room_text_str = f"Room: {self.current_room.replace('_', ' ').title()}"
-        room_text = font.render(room_text_str, True, (255, 215, 0))
-        room_shadow = font.render(room_text_str, True, (0, 0, 0))
+        room_text = render_text(room_text_str, 36, (255, 215, 0))
+        room_shadow = render_text(room_text_str, 36, (0, 0, 0))
         room_x = screen.get_width() - room_text.get_width() - 10
         screen.blit(room_shadow, (room_x + 2, 62))
         screen.blit(room_text, (room_x, 60))
@@ -487,11 +732,12 @@ class VampireAttack(pygame.sprite.Sprite):
     Represents the player's melee or ranged attack (e.g., a slashing effect or projectile).
     Moves in the direction the player is facing and damages enemies on contact.
     """
+    __slots__ = ("original_image", "attack_angle", "direction", "image", "rect",
+                 "position", "lifetime", "spawn_time", "speed")
+
     def __init__(self, x, y, attack_angle):
         super().__init__()
-        self.original_image = pygame.transform.rotozoom(
-            pygame.image.load('images/vampire_attack.png').convert_alpha(), 0, 1.2
-        )
+        self.original_image = load_image('images/vampire_attack.png', scale=1.2)
         self.attack_angle = attack_angle
 
         # Calculate direction vector from attack angle
@@ -508,23 +754,46 @@ class VampireAttack(pygame.sprite.Sprite):
         self.spawn_time = pygame.time.get_ticks()
         self.speed = 8               # Speed of the attack's movement
 
+    def texture_source(self):
+        """
+        Returns the unrotated image and rotation angle for the texture renderer.
+        """
+        return self.original_image, -self.attack_angle
+
     def update(self):
         """
-        Moves the attack forward, checks collision with enemies, and removes it after lifespan or off-screen.
+        Moves the attack forward and removes it when it leaves the playable area (movement phase).
         """
-        self.position += self.direction * self.speed
-        self.rect.center = (self.position.x, self.position.y)
+        position = self.position
+        position.x += self.direction.x * self.speed     # Per component: no temporary Vector2
+        position.y += self.direction.y * self.speed
+        self.rect.center = (position.x, position.y)
 
         # Destroy if outside playable area
-        if (self.position.x < 0 or self.position.x > 800 or 
-            self.position.y < 0 or self.position.y > 700 or
+        if (self.position.x < 0 or self.position.x > WORLD_WIDTH or 
+            self.position.y < 0 or self.position.y > WORLD_HEIGHT or
             not is_within_playable_area(self.position)):
             self.kill()
 
-        # Check collision with enemies
+    def collision_mask(self):
+        """
+        Returns the mask of the attack at its (cached, quantized) rotation.
+        """
+        return rotated_mask(self.original_image, -self.attack_angle)
+
+    def check_hits(self):
+        """
+        Damages the first enemy the attack touches (collision phase).
+        Rects pick the candidates; masks decide the hit.
+        """
         enemy_hit = pygame.sprite.spritecollide(self, enemy_group, False)
+        if not enemy_hit:
+            return
+        mask = self.collision_mask()
         for enemy in enemy_hit:
-            if hasattr(enemy, 'take_damage'):
+            if hasattr(enemy, 'take_damage') and masks_overlap(mask, self.rect.center,
+                                                               enemy.collision_mask(), enemy.rect.center):
+                particles.spray(enemy.rect.centerx, enemy.rect.centery, self.direction.x, self.direction.y, 15)
                 enemy.take_damage(1)
                 self.kill()
                 break
@@ -537,17 +806,22 @@ class BaseEnemy(pygame.sprite.Sprite):
     Base class for all enemy types.
     Handles enemy AI states (hunt, dodge, recover), movement, health, pathfinding, and visual behavior.
     """
+    __slots__ = ("image", "base_image", "rect", "hitbox_rect", "grid_size", "speed",
+                 "path", "path_index", "path_update_timer", "spawned", "rotation_angle", "health", "state",
+                 "state_timer", "blood_value", "desired_x", "desired_y", "size_class")
+    rotation_step = 1    # Degrees the facing snaps to, each rotation cached; 0 rotates exactly (an adaptive quality knob)
+
     def __init__(self, image_path, health=2, speed=2):
         super().__init__()
-        original_image = pygame.image.load(image_path).convert_alpha()
-        self.image = pygame.transform.rotozoom(original_image, 0, 0.6)
-        self.base_image = self.image.copy()
+        self.image = load_image(image_path, scale=0.6)
         self.rect = self.image.get_rect()
+        self.grid_size = 15
+        self.set_base_image(self.image)      # Shared with every enemy of this type
         self.hitbox_rect = self.base_image.get_rect(center=self.rect.center)
 
-        self.grid_size = 15
         self.speed = speed
-        self.path = []                       # Path to player
+        self.path = array("h")               # Waypoints to player as x, y cell pairs
+        self.path_index = 0                  # Cursor into path; only moves forward
         self.path_update_timer = 100
         self.spawned = False
         self.rotation_angle = 0
@@ -555,16 +829,46 @@ class BaseEnemy(pygame.sprite.Sprite):
         self.state = "hunt"                  # Enemy AI state
         self.state_timer = 0
         self.blood_value = 10                # Amount of blood essence dropped on death
+        self.desired_x = 0.0                 # Velocity the AI wants this frame; applied by steering
+        self.desired_y = 0.0
+
+    def set_base_image(self, image):
+        """
+        Replaces the unrotated image and updates the size class pathing and steering use.
+        """
+        self.base_image = image
+        self.size_class = size_class(*image.get_size(), self.grid_size)
 
     def update_rotation(self, target_x, target_y):
         """
         Rotates enemy to face the player.
+        Off-screen enemies keep their angle but skip the image rotation.
         """
         angle = math.degrees(math.atan2(target_y - self.rect.centery, target_x - self.rect.centerx))
-        self.rotation_angle = -angle - 90
-        self.image = pygame.transform.rotate(self.base_image, self.rotation_angle)
-        self.rect = self.image.get_rect(center=self.rect.center)
-        self.hitbox_rect.center = self.rect.center
+        step = self.rotation_step
+        if step:
+            self.rotation_angle = round((-angle - 90) / step) * step % 360
+        else:
+            self.rotation_angle = -angle - 90
+        if not camera.is_visible(self.rect):
+            self.hitbox_rect.center = self.rect.center
+            return
+        if step:
+            self.image = rotated_image(self.base_image, self.rotation_angle)
+        else:
+            self.image = pygame.transform.rotate(self.base_image, self.rotation_angle)
+        center = self.rect.center
+        self.rect.size = self.image.get_size()
+        self.rect.center = center
+        self.hitbox_rect.center = center
+
+    def texture_source(self):
+        """
+        Returns the unrotated image and rotation angle for the texture renderer.
+        """
+        if self.spawned:
+            return self.base_image, self.rotation_angle
+        return self.image, 0
 
     def spawn_randomly(self, playable_area_grid, player_position, min_distance):
         """
@@ -573,111 +877,70 @@ class BaseEnemy(pygame.sprite.Sprite):
         """
         if not self.spawned:
             x, y = self.get_random_position(playable_area_grid, self.grid_size)
-            distance_to_player = pygame.math.Vector2(x - player_position.x, y - player_position.y).length()
+            distance_to_player = math.hypot(x - player_position.x, y - player_position.y)
             if distance_to_player >= min_distance:
                 self.rect.topleft = (x, y)
                 self.spawned = True
 
     def get_random_position(self, playable_area_grid, grid_size):
         """
-        Returns a random valid (non-obstacle) position from the grid.
+        Returns a random valid (non-obstacle) position inside a spawn zone.
+        Only chunks streamed in around the player are considered.
         """
-        valid_positions = []
-        for y in range(0, len(playable_area_grid) * grid_size, grid_size):
-            for x in range(0, len(playable_area_grid[0]) * grid_size, grid_size):
-                grid_x = int(x / grid_size)
-                grid_y = int(y / grid_size)
-                if 0 <= grid_x < len(playable_area_grid[0]) and 0 <= grid_y < len(playable_area_grid):
-                    if not playable_area_grid[grid_y][grid_x]:
-                        valid_positions.append((x, y))
-        return random.choice(valid_positions) if valid_positions else (0, 0)
+        return tile_map.random_spawn_position(rng)
 
     def get_grid_position(self):
         """
-        Returns the enemy's current position in grid coordinates.
+        Returns the grid cell at the top-left of the block of cells the enemy's size class covers.
         """
-        return int(self.rect.x / self.grid_size), int(self.rect.y / self.grid_size)
+        x, y = block_origin(*self.rect.center, self.size_class, self.grid_size)
+        return int(x / self.grid_size), int(y / self.grid_size)
 
-    def update_path_to_player(self, player_pos, playable_area_grid):
+    def update_path_to_player(self, player_pos):
         """
-        Updates the enemy's A* path to the player using heuristic search.
+        Updates the enemy's path to the player from the flow field shared by
+        its size class, so large enemies only take routes they fit through.
+        An enemy too big for every route squeezes down to the largest size
+        class that has one, for steering as well as pathing.
         """
-        start = self.get_grid_position()
+        update_clearance()
         goal = (int(player_pos.x / self.grid_size), int(player_pos.y / self.grid_size))
-        moves = [(0, -1), (0, 1), (-1, 0), (1, 0)]
-
-        open_set = []
-        heapq.heappush(open_set, (0, start))
-        cost_to_point = {start: 0}
-        came_from = {start: None}
-
-        while open_set:
-            current_cost, current_point = heapq.heappop(open_set)
-            if current_point == goal:
-                path = []
-                while current_point:
-                    path.append(current_point)
-                    current_point = came_from[current_point]
-                self.path = path[::-1]
-                return
-
-            for move in moves:
-                new_point = (current_point[0] + move[0], current_point[1] + move[1])
-                if (0 <= new_point[0] < len(playable_area_grid[0]) and
-                    0 <= new_point[1] < len(playable_area_grid) and
-                    not playable_area_grid[new_point[1]][new_point[0]]):
-                    
-                    new_cost = cost_to_point[current_point] + 1
-                    if new_point not in cost_to_point or new_cost < cost_to_point[new_point]:
-                        cost_to_point[new_point] = new_cost
-                        priority = (new_cost + self.heuristic(new_point, goal), new_point)
-                        heapq.heappush(open_set, priority)
-                        came_from[new_point] = current_point
-        self.path = []
-
-    def heuristic(self, a, b):
-        """
-        Returns Euclidean distance heuristic between two grid points.
-        """
-        return math.sqrt((b[0] - a[0])**2 + (b[1] - a[1])**2)
+        full_size = size_class(*self.base_image.get_size(), self.grid_size)
+        for size in range(full_size, 0, -1):
+            self.size_class = size
+            self.path = clearance_map.find_path(size, self.get_grid_position(), goal)
+            if self.path:
+                break
+        else:
+            self.size_class = full_size
+        self.path_index = 2 if len(self.path) > 2 else 0  # Skip the cell we are in
 
     def move_towards_player_astar(self, playable_area_grid):
         """
-        Moves enemy one step along the computed A* path towards the player.
+        Sets the desired velocity towards the current waypoint of the smoothed path.
+        Reaching a waypoint advances the cursor, so a step costs the same for any path length.
+        Enemies slow down on the final waypoint; crowd steering does the actual move.
         """
-        if self.path:
-            for next_point in reversed(self.path):
-                target_x = next_point[0] * self.grid_size + self.grid_size / 2
-                target_y = next_point[1] * self.grid_size + self.grid_size / 2
-                direction = pygame.math.Vector2(target_x - self.rect.x, target_y - self.rect.y).normalize()
-                new_rect = self.rect.move(direction.x * self.speed, direction.y * self.speed)
-
-                grid_x = int(new_rect.x / self.grid_size)
-                grid_y = int(new_rect.y / self.grid_size)
-
-                if (0 <= grid_x < len(playable_area_grid[0]) and
-                    0 <= grid_y < len(playable_area_grid) and
-                    not playable_area_grid[grid_y][grid_x]):
-                    self.rect = new_rect
-                    break
+        if self.path_index >= len(self.path):
+            return
+        x, y = block_origin(*self.rect.center, self.size_class, self.grid_size)
+        self.path_index, self.desired_x, self.desired_y = follow_path(
+            self.path, self.path_index, x, y, self.grid_size, self.speed)
 
     def draw_health_bar(self):
         """
         Draws a dynamic health bar above the enemy based on current health.
         """
-        health_ratio = self.health / 2
-        bar_width = 40
-        bar_height = 5
-        health_bar_width = int(bar_width * health_ratio)
-        health_bar_surface = pygame.Surface((bar_width, bar_height), pygame.SRCALPHA)
-        pygame.draw.rect(health_bar_surface, (255, 255, 255), (0, 0, bar_width, bar_height))
-
-        # Change color based on remaining health
-        color = (0, 255, 0) if health_ratio > 0.6 else (255, 255, 0) if health_ratio > 0.3 else (255, 0, 0)
-        pygame.draw.rect(health_bar_surface, color, (0, 0, health_bar_width, bar_height))
+        x, y = camera.to_screen(self.rect.midtop)
+        draw_enemy_health_bar(screen, self.health, x, y)
 
-        health_bar_pos = (self.rect.centerx - bar_width // 2, self.rect.y - 10)
-        screen.blit(health_bar_surface, health_bar_pos)
+    def collision_mask(self):
+        """
+        Returns the enemy's mask at its facing, from the cached rotation masks.
+        """
+        if self.spawned:
+            return rotated_mask(self.base_image, self.rotation_angle)
+        return rotated_mask(self.image, 0)
 
     def take_damage(self, amount):
         """
@@ -688,37 +951,73 @@ class BaseEnemy(pygame.sprite.Sprite):
             blood_drop = BloodDrop(self.rect.centerx, self.rect.centery, self.blood_value)
             pickup_group.add(blood_drop)
             all_sprites_group.add(blood_drop)
+            heatmap.add("enemy_deaths", self.rect.center)
+            particles.burst(self.rect.centerx, self.rect.centery, 25 * self.size_class)
             self.kill()
         else:
             self.state = "hunt"  # Optional: enforce aggressive behavior after taking damage
 
+    def refresh_image(self):
+        """
+        Rebuilds the rotated image from base_image and rotation_angle, keeping the
+        rect where it is (used after a snapshot restore).
+        """
+        if self.spawned:
+            self.image = pygame.transform.rotate(self.base_image, self.rotation_angle)
+        self.hitbox_rect = self.base_image.get_rect(center=self.rect.center)
+
+    def kill(self):
+        """
+        Removes the enemy from every group and returns it to the enemy pool.
+        """
+        if self.alive():
+            super().kill()
+            enemy_pool.release(self)
+
+    def can_see_player(self):
+        """
+        Returns True if there is a clear line of sight between the enemy and the player.
+        """
+        return line_of_sight.is_visible(self.rect.center)
+
     def change_state(self, new_state):
         """
         Changes the AI state and resets the timer for the state duration.
         """
         self.state = new_state
-        self.state_timer = random.randint(60, 120)
+        self.state_timer = rng.randint(60, 120)
 
     def update(self):
         """
-        Main per-frame update loop for AI logic and interactions.
+        Main per-frame update for AI logic and movement (ai phase).
+        Health bars and contact damage are handled by later phases.
+        """
+        self.update_ai()
+        self.update_abilities()
+
+    def update_ai(self):
+        """
+        Spawns the enemy, then runs its state machine and pathing and faces the player.
         """
         if not self.spawned:
             self.spawn_randomly(player.playable_area_grid, player.pos, 150)
         else:
             if self.state == "hunt":
                 if self.path_update_timer <= 0:
-                    self.update_path_to_player(player.pos, player.playable_area_grid)
-                    self.path_update_timer = 10
+                    with profiler.scope("pathfinding"):
+                        self.update_path_to_player(player.pos)
+                    # Off-screen enemies replan less often
+                    interval = 10 if camera.is_visible(self.rect) else 30
+                    self.path_update_timer = interval * governor.value("replan_scale")
                 else:
                     self.path_update_timer -= 1
                 self.move_towards_player_astar(player.playable_area_grid)
 
             elif self.state == "dodge":
-                # Move away from player
-                direction = pygame.math.Vector2(self.rect.centerx - player.pos.x, self.rect.centery - player.pos.y).normalize()
-                new_rect = self.rect.move(direction.x * self.speed * 1.5, direction.y * self.speed * 1.5)
-                self.rect = new_rect
+                # Move away from player; steering keeps the retreat out of walls
+                self.desired_x, self.desired_y = arrive(self.rect.centerx - player.pos.x,
+                                                        self.rect.centery - player.pos.y,
+                                                        self.speed * 1.5)
 
             elif self.state == "recover":
                 pass  # Could add regeneration or delay behavior here
@@ -731,14 +1030,39 @@ class BaseEnemy(pygame.sprite.Sprite):
             # Face the player
             self.update_rotation(player.pos.x, player.pos.y)
 
-            # Display health bar
-            self.draw_health_bar()
+    def update_abilities(self):
+        """
+        Type-specific behaviour run after the shared AI each frame.
+        """
 
-            # Deal contact damage to player
-            if self.rect.colliderect(player.hitbox_rect) and not player.invincible:
-                player.health -= 1
-                player.invincible = True
-                player.invincibility_timer = 60  # 1 second at 60 FPS
+    def check_contact_damage(self):
+        """
+        Deals contact damage when the enemy's mask touches the player's hitbox (collision phase).
+        """
+        hitbox = player.hitbox_rect
+        if (self.spawned and self.rect.colliderect(hitbox) and not player.invincible and
+                masks_overlap(self.collision_mask(), self.rect.center, rect_mask(hitbox.size), hitbox.center)):
+            player.health -= 1
+            player.invincible = True
+            player.invincibility_timer = 60  # 1 second at 60 FPS
+            telemetry.emit("player_hit", source=type(self).__name__, health=player.health)
+            record_player_hit()
+
+def draw_enemy_health_bar(surface, health, x, y):
+    """
+    Draws an enemy health bar centred on x, just above the screen position y of the enemy's top edge.
+    """
+    health_ratio = health / 2
+    bar_width = 40
+    bar_height = 5
+    health_bar_width = int(bar_width * health_ratio)
+    left = x - bar_width // 2
+    top = y - 10
+    pygame.draw.rect(surface, (255, 255, 255), (left, top, bar_width, bar_height))
+
+    # Change color based on remaining health
+    color = (0, 255, 0) if health_ratio > 0.6 else (255, 255, 0) if health_ratio > 0.3 else (255, 0, 0)
+    pygame.draw.rect(surface, color, (left, top, health_bar_width, bar_height))
 
 # ------------------------
 # VampireLord (Boss Enemy)
@@ -748,10 +1072,13 @@ class VampireLord(BaseEnemy):
     Final boss enemy with multi-phase behaviors.
     Changes attack strategy and visual appearance based on remaining health.
     """
+    __slots__ = ("phase", "can_teleport", "teleport_cooldown", "summon_cooldown", "attack_cooldown",
+                 "active_minions", "max_minions")
+
     def __init__(self):
         super().__init__("images/vampire_boss.png", health=6, speed=3)
         self.image = vampire_lord_image
-        self.base_image = vampire_lord_image
+        self.set_base_image(vampire_lord_image)
         self.blood_value = 50
         self.phase = 1
         self.can_teleport = True
@@ -768,7 +1095,7 @@ class VampireLord(BaseEnemy):
         Each phase has unique patterns (summoning, charging, teleporting).
         """
         if not self.spawned:
-            self.rect.center = (610, 330)
+            self.rect.center = tile_map.boss_spawn
             self.spawned = True
         else:
             if self.health > 5:
@@ -776,36 +1103,53 @@ class VampireLord(BaseEnemy):
                 self.phase_one_behavior()
             elif self.health > 2:
                 if self.phase == 1:
-                    show_story_text("The vampire lord transforms into a giant bat!", 2000)
-                    self.base_image = pygame.transform.rotozoom(self.base_image, 0, 1.2)
+                    queue_story_text("The vampire lord transforms into a giant bat!", 2000)
+                    self.apply_phase_image(2)
+                    telemetry.emit("boss_phase", phase=2, health=self.health)
+                    particles.burst(self.rect.centerx, self.rect.centery, 400, speed=8.0)
                 self.phase = 2
                 self.phase_two_behavior()
             else:
                 if self.phase == 2:
-                    show_story_text("The vampire lord enters a blood rage!", 2000)
-                    red_overlay = pygame.Surface(self.base_image.get_size(), pygame.SRCALPHA)
-                    red_overlay.fill((255, 0, 0, 100))
-                    self.base_image.blit(red_overlay, (0, 0))
+                    queue_story_text("The vampire lord enters a blood rage!", 2000)
+                    self.apply_phase_image(3)
+                    telemetry.emit("boss_phase", phase=3, health=self.health)
+                    particles.burst(self.rect.centerx, self.rect.centery, 400, speed=8.0)
                 self.phase = 3
                 self.phase_three_behavior()
 
             self.update_rotation(player.pos.x, player.pos.y)
-            self.draw_health_bar()
 
-            # Damage the player on contact
-            if self.rect.colliderect(player.hitbox_rect) and not player.invincible:
-                player.health -= 1
-                player.invincible = True
-                player.invincibility_timer = 60
+    def apply_phase_image(self, phase):
+        """
+        Changes the boss's look on entering a phase: giant bat form in phase 2,
+        blood-red tint in phase 3.
+        """
+        if phase == 2:
+            self.set_base_image(load_image("images/vampire_boss.png", size=(144, 144)))
+        elif phase == 3:
+            red_overlay = pygame.Surface(self.base_image.get_size(), pygame.SRCALPHA)
+            red_overlay.fill((255, 0, 0, 100))
+            self.set_base_image(self.base_image.copy())  # Never tint the shared image
+            self.base_image.blit(red_overlay, (0, 0))
+
+    def refresh_image(self):
+        """
+        Re-applies the phase looks, then rotates the image (used after a snapshot restore).
+        """
+        for phase in range(2, self.phase + 1):
+            self.apply_phase_image(phase)
+        super().refresh_image()
 
     def phase_one_behavior(self):
         """
-        Phase 1: Maintains distance from player and summons Bats if under minion cap.
+        Phase 1: Maintains distance from player while in their line of sight
+        and summons Bats if under minion cap.
         """
-        distance_to_player = pygame.math.Vector2(self.rect.centerx - player.pos.x,
-                                                 self.rect.centery - player.pos.y).length()
+        distance_to_player = math.hypot(self.rect.centerx - player.pos.x, self.rect.centery - player.pos.y)
 
-        if distance_to_player < 200:
+        # Only back off when the player actually has a clear shot
+        if distance_to_player < 200 and self.can_see_player():
             direction = pygame.math.Vector2(self.rect.centerx - player.pos.x,
                                             self.rect.centery - player.pos.y).normalize()
             new_pos = pygame.math.Vector2(self.rect.centerx, self.rect.centery) + direction * self.speed
@@ -813,9 +1157,9 @@ class VampireLord(BaseEnemy):
                 self.rect.center = new_pos
 
         # Summon bats if allowed
-        self.active_minions = len([e for e in enemy_group if isinstance(e, Ghoul)])
+        self.active_minions = sum(isinstance(e, Ghoul) for e in enemy_group)
         if self.summon_cooldown <= 0 and self.active_minions < self.max_minions:
-            ghoul = Ghoul()
+            ghoul = enemy_pool.acquire(Ghoul)
             ghoul.rect.center = self.rect.center
             ghoul.spawned = True
             enemy_group.add(ghoul)
@@ -831,13 +1175,13 @@ class VampireLord(BaseEnemy):
         self.speed = 4
 
         # Random pathing around player
-        if random.random() < 0.02:
-            angle = random.randint(0, 360)
+        if rng.random() < 0.02:
+            angle = rng.randint(0, 360)
             direction = pygame.math.Vector2(math.cos(math.radians(angle)),
                                             math.sin(math.radians(angle))).normalize()
             target_pos = pygame.math.Vector2(player.pos.x, player.pos.y) + direction * 200
             if is_within_playable_area(target_pos):
-                self.update_path_to_player(target_pos, player.playable_area_grid)
+                self.update_path_to_player(target_pos)
 
         if hasattr(self, 'path') and self.path:
             self.move_towards_player_astar(player.playable_area_grid)
@@ -863,12 +1207,13 @@ class VampireLord(BaseEnemy):
         self.speed = 5
 
         if self.teleport_cooldown <= 0:
-            angle = random.randint(0, 360)
+            angle = rng.randint(0, 360)
             direction = pygame.math.Vector2(math.cos(math.radians(angle)),
                                             math.sin(math.radians(angle))).normalize()
             teleport_pos = pygame.math.Vector2(player.pos.x, player.pos.y) + direction * 100
             if is_within_playable_area(teleport_pos):
                 self.rect.center = teleport_pos
+                telemetry.emit("teleport", enemy="VampireLord", x=self.rect.centerx, y=self.rect.centery)
             self.teleport_cooldown = 60  # 1 second cooldown
         else:
             self.teleport_cooldown -= 1
@@ -881,10 +1226,11 @@ class Ghoul(BaseEnemy):
     Small, fast enemy usually summoned by VampireLord.
     Appears smaller and weaker, but swarms the player.
     """
+    __slots__ = ()
+
     def __init__(self):
         original_image_path = "images/ghoul.png"
-        tiny_image = pygame.image.load(original_image_path).convert_alpha()
-        tiny_image = pygame.transform.scale(tiny_image, (20, 20))
+        tiny_image = load_image(original_image_path, size=(20, 20))
 
         super().__init__(original_image_path, health=2, speed=2)
         self.image = tiny_image
@@ -896,26 +1242,30 @@ class Ghoul(BaseEnemy):
 # ------------------------
 class Vampire(BaseEnemy):
     """
-    Medium-health enemy that teleports behind the player if within range.
+    Medium-health enemy that teleports behind the player if within range
+    and in their line of sight.
     Uses deceptive movement to evade direct attacks.
     """
+    __slots__ = ("can_teleport", "teleport_cooldown")
+
     def __init__(self):
         super().__init__("images/vampire_enemy.png", health=3, speed=3)
         self.blood_value = 20
         self.can_teleport = True
         self.teleport_cooldown = 0
 
-    def update(self):
-        super().update()
-
+    def update_abilities(self):
+        """
+        Teleports behind the player when in range and in sight, then ticks the cooldown.
+        """
         if self.can_teleport and self.teleport_cooldown <= 0:
-            distance_to_player = pygame.math.Vector2(self.rect.centerx - player.pos.x,
-                                                     self.rect.centery - player.pos.y).length()
-            if 100 < distance_to_player < 200:
+            distance_to_player = math.hypot(self.rect.centerx - player.pos.x, self.rect.centery - player.pos.y)
+            if 100 < distance_to_player < 200 and self.can_see_player():
                 behind_player = player.pos - pygame.math.Vector2(30, 0).rotate(player.angle)
                 if is_within_playable_area(behind_player):
                     self.rect.center = behind_player
                     self.teleport_cooldown = 180  # 3 seconds cooldown
+                    telemetry.emit("teleport", enemy="Vampire", x=self.rect.centerx, y=self.rect.centery)
 
         if self.teleport_cooldown > 0:
             self.teleport_cooldown -= 1
@@ -928,19 +1278,31 @@ class Werewolf(BaseEnemy):
     Strong enemy that enrages and becomes faster when low on health.
     Visual transformation indicates state change.
     """
+    __slots__ = ("enraged",)
+
     def __init__(self):
         super().__init__("images/warewolf.png", health=4, speed=4)
         self.blood_value = 30
         self.enraged = False
 
-    def update(self):
-        super().update()
-
+    def update_abilities(self):
+        """
+        Enrages at low health: faster and drawn larger.
+        """
         # Rage state: Increase speed and scale up sprite
         if self.health <= 2 and not self.enraged:
             self.enraged = True
             self.speed = 6
-            self.base_image = pygame.transform.rotozoom(self.base_image, 0, 1.2)
+            self.set_base_image(load_image("images/warewolf.png", scale=0.72))  # 1.2x the normal size
+
+    def refresh_image(self):
+        """
+        Re-applies the rage scaling, then rotates the image (used after a snapshot restore).
+        """
+        if self.enraged:
+            self.set_base_image(load_image("images/warewolf.png", scale=0.72))
+        super().refresh_image()
+
 # ------------------------
 # Boss Introduction Function
 # ------------------------
@@ -948,6 +1310,8 @@ def show_boss_intro():
     """
     Displays a flashing red screen sequence and introduces the final boss.
     """
+    if HEADLESS:
+        return
     boss_intro_text = "The vampire lord appears! Defeat him to rescue your beloved!"
     
     # Flash red screen to signal boss appearance
@@ -955,13 +1319,14 @@ def show_boss_intro():
         overlay = pygame.Surface((800, 700))
         overlay.fill((150, 0, 0))
         screen.blit(overlay, (0, 0))
-        pygame.display.update()
+        render_backend.present()
         pygame.time.delay(100)
 
         # Re-draw background and sprites to clear flash
-        screen.blit(background, (0, 0))
-        all_sprites_group.draw(screen)
-        pygame.display.update()
+        render_backend.draw_background(camera, background)
+        render_backend.draw_group(camera, all_sprites_group)
+        render_backend.finish_world()
+        render_backend.present()
         pygame.time.delay(100)
     
     # Show the final story line before the battle
@@ -970,69 +1335,117 @@ def show_boss_intro():
 # ------------------------
 # Enemy Spawning Logic
 # ------------------------
+# Enemy type names used by wave tables
+ENEMY_TYPES = {
+    "ghoul": Ghoul,
+    "vampire": Vampire,
+    "werewolf": Werewolf,
+    "vampire_lord": VampireLord,
+}
+
+def add_enemy(enemy):
+    """
+    Adds a newly spawned enemy to the game's sprite groups.
+    """
+    enemy_group.add(enemy)
+    all_sprites_group.add(enemy)
+
+def enemy_factory(enemy_types):
+    """
+    Returns a wave-director factory that takes enemies from the pool.
+    """
+    return {name: (lambda enemy_class=enemy_class: enemy_pool.acquire(enemy_class))
+            for name, enemy_class in enemy_types.items()}
+
 def spawn_enemies(wave_number):
     """
-    Spawns enemies based on the current wave number.
-    Handles regular enemies for waves 1–3 and the Vampire Lord boss for wave 4.
-    Returns a sprite group containing all spawned enemies.
-    """
-    enemies = pygame.sprite.Group()
-
-    if wave_number <= MAX_WAVES:
-        # Spawn bats
-        num_ghouls = 3 if wave_number == 3 else wave_number * 2
-        for i in range(num_ghouls):
-            enemy = Ghoul()
-            if wave_number == 3:
-                enemy.health = 1
-                enemy.speed = 1.5
-                enemy.blood_value = 15
-            enemy_group.add(enemy)
-            all_sprites_group.add(enemy)
-            enemies.add(enemy)
-
-        # Spawn Vampires
-        if wave_number >= 2:
-            num_vampires = 1 if wave_number == 3 else wave_number - 1
-            for i in range(num_vampires):
-                enemy = Vampire()
-                if wave_number == 3:
-                    enemy.health = 2
-                    enemy.speed = 2
-                    enemy.teleport_cooldown = 300
-                    enemy.blood_value = 30
-                enemy_group.add(enemy)
-                all_sprites_group.add(enemy)
-                enemies.add(enemy)
-
-        # Spawn a Werewolf only in final regular wave
-        if wave_number == 3:
-            enemy = Werewolf()
-            enemy.health = 2
-            enemy.speed = 3
-            enemy.blood_value = 50
-            enemy_group.add(enemy)
-            all_sprites_group.add(enemy)
-            enemies.add(enemy)
-
-    elif wave_number == MAX_WAVES + 1:
+    Queues the enemies for the given wave on the wave director.
+    Waves 1-3 and the Vampire Lord boss (wave 4) come from the wave table;
+    endless mode generates every wave after 3 instead of the boss.
+    Enemies appear a few per frame, so the returned sprite group fills up
+    over the next frames.
+    """
+    if wave_number == MAX_WAVES + 1 and not ENDLESS_MODE:
         # Final boss spawn
         show_boss_intro()
-        boss = VampireLord()
-        enemy_group.add(boss)
-        all_sprites_group.add(boss)
-        enemies.add(boss)
+    wave_group = wave_director.start_wave(wave_number)
+    telemetry.emit("wave_start", wave=wave_number, queued=len(wave_director.pending))
+    return wave_group
 
-    return enemies
+def spawn_pending_enemies():
+    """
+    Releases queued enemies, throttled by the previous frame's work time.
+    """
+    pending = len(wave_director.pending)
+    wave_director.update(len(enemy_group), clock.get_rawtime())
+    if len(wave_director.pending) < pending:
+        telemetry.emit("spawn", count=pending - len(wave_director.pending), live=len(enemy_group),
+                       cap=wave_director.live_cap)
+
+# ------------------------
+# Game Session
+# ------------------------
+class GameSession:
+    """
+    Owns the state of one run: sprite groups, the player, wave progress,
+    discovered rooms and the random number generator.
+    reset() rewinds the run to the start of wave 1 in place. Groups and
+    the player are reused, killed enemies wait in the pool for the next
+    spawn, and the tile map keeps its compiled chunks, so simulations can
+    play thousands of runs in one process.
+    """
+    def __init__(self, seed=None):
+        self.all_sprites_group = pygame.sprite.Group()
+        self.attack_group = pygame.sprite.Group()
+        self.enemy_group = pygame.sprite.Group()
+        self.pickup_group = pygame.sprite.Group()
+        self.enemy_pool = ObjectPool()
+        self.rng = random.Random(seed)
+        self.wave_director = WaveDirector(enemy_factory(ENEMY_TYPES), add_enemy, endless=ENDLESS_MODE)
+        self.player = Player()
+        self.player_group = pygame.sprite.GroupSingle(self.player)
+        self.all_sprites_group.add(self.player)
+
+        # Wave progress and room tracking
+        self.current_wave = 1
+        self.room_cleared = False
+        self.waiting_for_next_wave = False
+        self.wave_transition_timer = 0
+        self.discovered_areas = {"entrance"}
+        self.resets = 0
+
+    def reset(self, seed=None):
+        """
+        Clears every sprite except the player and restores the starting state.
+        The caller spawns the first wave.
+        """
+        self.wave_director.reset()
+        for group in (self.all_sprites_group, self.attack_group, self.enemy_group, self.pickup_group):
+            for sprite in group.sprites():
+                if sprite is not self.player:
+                    sprite.kill()
+        self.player.reset()
+        particles.clear()
+        if lighting is not None:
+            lighting.reset()
+        self.rng.seed(seed)
+        if swarm_ai is not None:
+            swarm_ai.reset(seed or 0)
+
+        self.current_wave = 1
+        self.room_cleared = False
+        self.waiting_for_next_wave = False
+        self.wave_transition_timer = 0
+        self.discovered_areas.clear()
+        self.discovered_areas.add("entrance")
+        self.resets += 1
 
 # ------------------------
 # Upgrade Selection Menu
 # ------------------------
-def show_upgrades():
+def get_upgrade_choices():
     """
-    Displays a choice of 1–3 random upgrades. Waits for player input to choose one.
-    Applies the selected upgrade to the player.
-    Returns the chosen upgrade effect as a string.
+    Returns up to 3 random upgrades the player has not unlocked yet.
     """
     upgrades = [
         {"name": "Mist Form", "description": "Temporary invincibility", "effect": "mist"},
@@ -1054,7 +1467,33 @@ def show_upgrades():
             available_upgrades.append(upgrade)
 
     # Pick 3 random upgrades
-    chosen_upgrades = random.sample(available_upgrades, 3) if len(available_upgrades) > 3 else available_upgrades
+    return rng.sample(available_upgrades, 3) if len(available_upgrades) > 3 else available_upgrades
+
+def apply_upgrade(selection):
+    """
+    Applies the upgrade with the given effect name to the player.
+    """
+    telemetry.emit("upgrade", effect=selection, wave=session.current_wave)
+    if selection == "dash":
+        player.has_dash = True
+    elif selection == "mist":
+        player.has_mist_form = True
+    elif selection == "bat":
+        player.has_bat_transform = True
+    elif selection == "blood":
+        player.blood_essence.maximum += 25
+        player.blood_essence.current += 25
+    elif selection == "health":
+        player.max_health += 1
+        player.health += 1
+
+def show_upgrades():
+    """
+    Displays a choice of 1–3 random upgrades. Waits for player input to choose one.
+    Applies the selected upgrade to the player.
+    Returns the chosen upgrade effect as a string.
+    """
+    chosen_upgrades = get_upgrade_choices()
 
     font = pygame.font.Font(None, 36)
     small_font = pygame.font.Font(None, 24)
@@ -1083,11 +1522,12 @@ def show_upgrades():
         key_text = font.render(f"Press {i+1}", True, (200, 200, 200))
         screen.blit(key_text, (x + 75 - key_text.get_width() // 2, 350))
 
-    pygame.display.update()
+    render_backend.present()
 
     # Wait for player selection
     waiting = True
     selection = None
+    forget_keys()
     while waiting:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -1105,18 +1545,7 @@ def show_upgrades():
                     waiting = False
 
     # Apply selected upgrade to player
-    if selection == "dash":
-        player.has_dash = True
-    elif selection == "mist":
-        player.has_mist_form = True
-    elif selection == "bat":
-        player.has_bat_transform = True
-    elif selection == "blood":
-        player.blood_essence.maximum += 25
-        player.blood_essence.current += 25
-    elif selection == "health":
-        player.max_health += 1
-        player.health += 1
+    apply_upgrade(selection)
 
     return selection
 # ------------------------
@@ -1156,7 +1585,7 @@ def victory_screen():
     retry_rect = retry_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 + 200))
     screen.blit(retry_text, retry_rect)
 
-    pygame.display.update()
+    render_backend.present()
 
     # Music switch
     pygame.mixer.Channel(1).stop()
@@ -1164,6 +1593,7 @@ def victory_screen():
 
     waiting = True
     replay = False
+    forget_keys()
     while waiting:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -1190,7 +1620,8 @@ def game_over_screen(wave_number):
     Displays a game over screen when the player dies.
     Offers retry option to restart the game from wave 1.
     """
-    screen.blit(background, (0, 0))
+    render_backend.draw_background(camera, background)
+    render_backend.finish_world()
     overlay = pygame.Surface((800, 700), pygame.SRCALPHA)
     overlay.fill((0, 0, 0, 150))
     screen.blit(overlay, (0, 0))
@@ -1207,8 +1638,8 @@ def game_over_screen(wave_number):
     screen.blit(game_over_text, text_rect)
 
     # Display wave reached
-    wave_text = font.render(f'Wave: {current_wave}', True, (255, 215, 0))
-    wave_text_shadow = font.render(f'Wave: {current_wave}', True, (0, 0, 0))
+    wave_text = font.render(f'Wave: {wave_number}', True, (255, 215, 0))
+    wave_text_shadow = font.render(f'Wave: {wave_number}', True, (0, 0, 0))
     screen.blit(wave_text_shadow, (12, 62))
     screen.blit(wave_text, (10, 60))
 
@@ -1218,11 +1649,12 @@ def game_over_screen(wave_number):
     retry_rect = retry_text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 + 80))
     screen.blit(retry_text, retry_rect)
 
-    pygame.display.update()
+    render_backend.present()
     pygame.mixer.Channel(1).stop()
     pygame.mixer.Channel(0).play(menu_sound, loops=-1)
 
     space_pressed = False
+    forget_keys()
     while not space_pressed:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -1231,7 +1663,8 @@ def game_over_screen(wave_number):
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                 space_pressed = True
 
-    # Clear enemies
+    # Clear enemies, including any still waiting to spawn
+    wave_director.clear()
     for enemy in enemy_group.sprites():
         enemy.kill()
 
@@ -1247,6 +1680,8 @@ def show_story_text(text, duration=3000):
     Displays a multi-line text overlay with styled background and border.
     Used for narrative moments.
     """
+    if HEADLESS:
+        return
     font = pygame.font.Font(None, 36)
     words = text.split()
     lines, current_line = [], []
@@ -1275,9 +1710,10 @@ def show_story_text(text, duration=3000):
     overlay_y = screen.get_height() - text_height - 60
 
     # Show after a delay
-    screen.blit(background, (0, 0))
-    all_sprites_group.draw(screen)
-    pygame.display.update()
+    render_backend.draw_background(camera, background)
+    render_backend.draw_group(camera, all_sprites_group)
+    render_backend.finish_world()
+    render_backend.present()
     pygame.time.delay(1500)
 
     screen.blit(overlay, ((screen.get_width() - max_width - 60) // 2, overlay_y))
@@ -1285,16 +1721,36 @@ def show_story_text(text, duration=3000):
         text_rect = surf.get_rect(center=(screen.get_width() // 2, overlay_y + 30 + i * line_height))
         screen.blit(surf, text_rect)
 
-    pygame.display.update()
+    render_backend.present()
 
     # Wait for duration or key press
     pygame.time.set_timer(pygame.USEREVENT + 1, duration)
     waiting = True
+    forget_keys()
     while waiting:
         for event in pygame.event.get():
             if event.type in (pygame.QUIT, pygame.KEYDOWN, pygame.USEREVENT + 1):
                 waiting = False
 
+story_queue = []    # (text, duration) raised mid-frame, shown between frames
+
+def queue_story_text(text, duration=3000):
+    """
+    Queues a story line raised during the simulation. show_story_text()
+    blocks, draws to the screen and pumps events, so it only runs on the
+    main thread between frames; with --threaded the simulation runs on
+    its own thread.
+    """
+    if not HEADLESS:
+        story_queue.append((text, duration))
+
+def show_queued_story_text():
+    """
+    Shows the story lines queued during the last simulated frame (main thread).
+    """
+    while story_queue:
+        show_story_text(*story_queue.pop(0))
+
 # ------------------------
 # Area Transition Display
 # ------------------------
@@ -1302,6 +1758,8 @@ def show_area_transition(area_name):
     """
     Displays a fade-in/fade-out text overlay indicating the new area entered.
     """
+    if HEADLESS:
+        return
     font = pygame.font.Font(None, 48)
     text_surface = font.render(f"Entering: {area_name}", True, (150, 0, 0))
     if text_surface.get_width() > screen.get_width() - 60:
@@ -1311,46 +1769,60 @@ def show_area_transition(area_name):
     text_rect = text_surface.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2))
 
     for alpha in range(0, 255, 5):
-        screen.blit(background, (0, 0))
-        all_sprites_group.draw(screen)
+        render_backend.draw_background(camera, background)
+        render_backend.draw_group(camera, all_sprites_group)
+        render_backend.finish_world()
         overlay = pygame.Surface((800, 700), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, alpha))
         screen.blit(overlay, (0, 0))
         alpha_surface = text_surface.copy()
         alpha_surface.set_alpha(alpha)
         screen.blit(alpha_surface, text_rect)
-        pygame.display.update()
+        render_backend.present()
         pygame.time.delay(10)
 
     pygame.time.delay(1000)
 
     for alpha in range(255, 0, -5):
-        screen.blit(background, (0, 0))
-        all_sprites_group.draw(screen)
+        render_backend.draw_background(camera, background)
+        render_backend.draw_group(camera, all_sprites_group)
+        render_backend.finish_world()
         overlay = pygame.Surface((800, 700), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, alpha))
         screen.blit(overlay, (0, 0))
         alpha_surface = text_surface.copy()
         alpha_surface.set_alpha(alpha)
         screen.blit(alpha_surface, text_rect)
-        pygame.display.update()
+        render_backend.present()
         pygame.time.delay(10)
 
 # ------------------------
 # Main Game Loop
 # ------------------------
-# Sprite groups
-all_sprites_group = pygame.sprite.Group()
-attack_group = pygame.sprite.Group()
-enemy_group = pygame.sprite.Group()
-pickup_group = pygame.sprite.Group()
-
-# Initialize player and first wave
-player = Player()
-all_sprites_group.add(player)
-current_wave = 1
-room_cleared = False
-enemies = spawn_enemies(current_wave)
+# The session's long-lived objects are used directly by every class and system
+session = GameSession()
+all_sprites_group = session.all_sprites_group
+attack_group = session.attack_group
+enemy_group = session.enemy_group
+pickup_group = session.pickup_group
+enemy_pool = session.enemy_pool
+rng = session.rng
+wave_director = session.wave_director
+player = session.player
+player_group = session.player_group
+
+def save_heatmap():
+    """
+    Writes the heatmap on exit. Each restart after a game over counts as a run.
+    """
+    heatmap.runs = session.resets + 1
+    heatmap.save(HEATMAP_PATH)
+
+if HEATMAP_PATH:
+    atexit.register(save_heatmap)  # Menus quit with sys.exit(), so save from atexit
+
+# First wave
+enemies = spawn_enemies(session.current_wave)
 show_minimap = False
 
 # Narrative and room tracking
@@ -1362,7 +1834,6 @@ story_events = {
     7: "The castle's master approaches. Prepare yourself.",
     "boss": "The ancient vampire lord stands between you and your partner. End this, once and for all."
 }
-discovered_areas = set(["entrance"])
 area_descriptions = {
     "entrance": "Castle Entrance - A foreboding gateway to darkness",
     "hallway": "Connecting Hallway - Shadows linger in every corner",
@@ -1372,122 +1843,368 @@ area_descriptions = {
 # Game state flags
 running = True
 show_menu = True
-wave_transition_timer = 0
-waiting_for_next_wave = False
 
 # ------------------------
-# Game Loop
+# Frame Systems
 # ------------------------
-while running:
-    if show_menu:
-        start_menu()
-        show_menu = False
-        show_story_text(story_events[1])
-
-    screen.blit(background, (0, 0))
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.KEYDOWN and event.key == pygame.K_m:
-            show_minimap = not show_minimap
-        elif event.type == pygame.USEREVENT:
-            player.speed = 5  # Reset bat speed
+def resolve_collisions():
+    """
+    Resolves projectile hits and enemy contact damage for the frame.
+    """
+    for attack in attack_group.sprites():
+        attack.check_hits()
+    for enemy in enemy_group.sprites():
+        enemy.check_contact_damage()
 
-    # Wave indicator
-    font = pygame.font.Font(None, 36)
-    wave_text = font.render(f'Wave: {current_wave}', True, (255, 215, 0))
-    wave_text_shadow = font.render(f'Wave: {current_wave}', True, (0, 0, 0))
+def draw_wave_indicator():
+    """
+    Draws the current wave number under the health display.
+    """
+    wave_text = render_text(f'Wave: {session.current_wave}', 36, (255, 215, 0))
+    wave_text_shadow = render_text(f'Wave: {session.current_wave}', 36, (0, 0, 0))
     screen.blit(wave_text_shadow, (12, 62))
     screen.blit(wave_text, (10, 60))
 
-    # Room discovery logic
-    if player.current_room not in discovered_areas:
-        discovered_areas.add(player.current_room)
+def draw_minimap():
+    """
+    Draws the minimap with discovered rooms, the player and enemies if toggled.
+    """
+    if not show_minimap:
+        return
+    surface = minimap_cache["surface"]
+    minimap_cache["age"] += 1
+    if surface is None or minimap_cache["age"] >= governor.value("minimap_interval"):
+        if surface is None:
+            surface = minimap_cache["surface"] = pygame.Surface((200, 200), pygame.SRCALPHA)
+        render_minimap(surface)
+        minimap_cache["age"] = 0
+    screen.blit(surface, (screen.get_width() - 210, screen.get_height() - 210))
+
+minimap_cache = {"surface": None, "age": 0}    # One surface, redrawn every minimap_interval frames
+
+def render_minimap(minimap_surface):
+    """
+    Redraws the minimap surface with the rooms, the player and enemies.
+    """
+    minimap_surface.fill((0, 0, 0, 150))
+    rooms = create_room_layout()
+    for room_name, room_rect in rooms.items():
+        mini_rect = pygame.Rect(room_rect.x // MINIMAP_SCALE + 10, room_rect.y // MINIMAP_SCALE + 10,
+                                room_rect.width // MINIMAP_SCALE, room_rect.height // MINIMAP_SCALE)
+        color = (100, 0, 0) if room_name in session.discovered_areas else (50, 50, 50)
+        pygame.draw.rect(minimap_surface, color, mini_rect)
+        if room_name == player.current_room:
+            pygame.draw.rect(minimap_surface, (150, 0, 0), mini_rect, 2)
+
+    # Player and enemy dots
+    pygame.draw.circle(minimap_surface, (255, 255, 255), (player.pos.x // MINIMAP_SCALE + 10, player.pos.y // MINIMAP_SCALE + 10), 3)
+    for enemy in enemy_group:
+        pygame.draw.circle(minimap_surface, (255, 0, 0), (enemy.rect.centerx // MINIMAP_SCALE + 10, enemy.rect.centery // MINIMAP_SCALE + 10), 2)
+
+def update_clearance():
+    """
+    Updates the clearance map where chunks were streamed since the last frame.
+    """
+    if clearance_map.version != tile_map.version:
+        clearance_map.sync(tile_map.version, tile_map.changes_since(clearance_map.version))
 
-    # Update attacks
-    for attack in attack_group.sprites():
-        attack.update()
-
-    # Handle wave transitions and victory
-    if len(enemy_group) == 0 and not room_cleared and not waiting_for_next_wave:
-        if current_wave > MAX_WAVES:
-            if victory_screen():
-                # Reset state for replay
-                player.health = player.max_health
-                player.blood_essence.current = 50
-                player.blood_essence.maximum = 100
-                player.has_dash = player.has_mist_form = player.has_bat_transform = False
-                current_wave = 1
-                room_cleared = False
-                enemies = spawn_enemies(current_wave)
-                discovered_areas = set(["entrance"])
-            else:
-                running = False
+def update_line_of_sight():
+    """
+    Recasts the player's visibility field before enemies make decisions.
+    """
+    with profiler.scope("line_of_sight"):
+        line_of_sight.update(player.pos)
+
+def update_enemies():
+    """
+    Runs every enemy's AI. With swarm workers, spawned regular enemies think
+    and move in the worker processes and only rotate and use their abilities
+    here; the boss and enemies still spawning update as usual.
+    """
+    if swarm_ai is None:
+        enemy_group.update()
+        steer_enemies()
+        return
+    members = []
+    local = []
+    for enemy in enemy_group:
+        if enemy.spawned and not isinstance(enemy, VampireLord):
+            members.append(enemy)
         else:
-            room_cleared = True
-            waiting_for_next_wave = True
-            wave_transition_timer = 60
-
-    # Begin next wave after delay
-    if waiting_for_next_wave:
-        wave_transition_timer -= 1
-        if wave_transition_timer <= 0:
-            if current_wave in story_events:
-                show_story_text(story_events[current_wave])
-
-            if current_wave == MAX_WAVES:
-                current_wave += 1
-                enemies = spawn_enemies(current_wave)
+            local.append(enemy)
+    with profiler.scope("swarm"):
+        overflow = swarm_ai.step(members, player.pos, camera.view)
+    if overflow:
+        skipped = set(overflow)
+        members = [enemy for enemy in members if enemy not in skipped]
+        local += overflow
+    for enemy in members:
+        enemy.update_rotation(player.pos.x, player.pos.y)
+        enemy.update_abilities()
+    for enemy in local:
+        enemy.update()
+    with profiler.scope("steering"):
+        crowd_steering.step([enemy for enemy in local if enemy.spawned], is_open_cell, nearest_open_cell)
+
+def steer_enemies():
+    """
+    Moves every spawned enemy by its desired velocity plus separation and
+    wall avoidance, after all enemies have picked their goals.
+    """
+    with profiler.scope("steering"):
+        crowd_steering.step([enemy for enemy in enemy_group if enemy.spawned], is_open_cell, nearest_open_cell)
+
+def record_heatmap():
+    """
+    Adds this frame's player and enemy positions to the heatmap (cleanup phase).
+    """
+    heatmap.record_frame(player.rect.center, enemy_group)
+
+def render_particles():
+    """
+    Advances the particles one frame and draws them over the world (render
+    phase; they are visual only, so headless runs skip them).
+    """
+    with profiler.scope("particles"):
+        particles.update()
+        particles.draw(render_backend.world, camera.view, render_backend.scale)
+
+def render_lighting():
+    """
+    Lights the player, attacks and blood drops in view and darkens everything else.
+    """
+    if lighting is None:
+        return
+    with profiler.scope("lighting"):
+        lighting.add(camera.to_screen(player.rect.center), 220, 1.0, (255, 190, 130))
+        for attack in attack_group:
+            if camera.is_visible(attack.rect):
+                lighting.add(camera.to_screen(attack.rect.center), 70, 0.9, (255, 60, 60))
+        for pickup in pickup_group:
+            if camera.is_visible(pickup.rect):
+                lighting.add(camera.to_screen(pickup.rect.center), 24, 0.5, (255, 40, 40))
+        lighting.apply(render_backend.world)
+
+def update_camera():
+    """
+    Keeps the camera centred on the player and streams map chunks around them.
+    """
+    camera.follow(player.pos)
+    tile_map.stream(player.pos, occupied_chunks)
+
+def occupied_chunks():
+    """
+    Returns the chunks spawned enemies stand in, which streaming keeps loaded.
+    """
+    chunks = set()
+    for enemy in enemy_group:
+        if enemy.spawned:
+            chunks |= tile_map.chunks_near(enemy.rect, 0)
+    return chunks
+
+def render_world():
+    """
+    Draws all sprites in view.
+    """
+    render_backend.draw_group(camera, all_sprites_group)
+
+def draw_health_bars():
+    """
+    Draws enemy health bars over the finished world, at full resolution.
+    """
+    if not governor.value("health_bars"):
+        return
+    for enemy in enemy_group:
+        if enemy.spawned and camera.is_visible(enemy.rect):
+            enemy.draw_health_bar()
+
+# Each group is updated by exactly one system; see game/pipeline.py for phase guarantees
+pipeline = UpdatePipeline()
+pipeline.add("input", player.user_input)
+pipeline.add("ai", spawn_pending_enemies)
+pipeline.add("ai", update_clearance)
+pipeline.add("ai", update_line_of_sight)
+pipeline.add("ai", update_enemies)
+pipeline.add("movement", player_group.update)
+pipeline.add("movement", update_camera)
+pipeline.add("movement", attack_group.update)
+pipeline.add("collision", resolve_collisions)
+pipeline.add("collision", pickup_group.update)
+pipeline.add("cleanup", player.update_timers)
+pipeline.add("cleanup", record_heatmap)
+pipeline.add("render", render_world)
+pipeline.add("render", render_particles)
+pipeline.add("render", render_lighting)
+pipeline.add("render", render_backend.finish_world)
+pipeline.add("render", draw_health_bars)
+hud_systems = [player.draw_hud, draw_wave_indicator, draw_minimap]
+for system in hud_systems:
+    pipeline.add("render", system)
+
+# ------------------------
+# Adaptive Quality
+# ------------------------
+# With --adaptive-quality the governor lowers these, first to last, while
+# frames run over budget and restores them when there is headroom again
+# (see game/quality.py)
+def set_particle_scale(scale):
+    """
+    Sets the multiplier on how many particles each emitter produces.
+    """
+    particles.scale = scale
+
+def set_rotation_step(step):
+    """
+    Sets the angle enemy facings snap to; snapped rotations are cached.
+    """
+    BaseEnemy.rotation_step = step
+
+def report_quality_change(knob, direction):
+    """
+    Records every governor decision in the telemetry stream.
+    """
+    telemetry.emit("quality", knob=knob.name, value=knob.value, level=governor.level(),
+                   direction="restore" if direction > 0 else "degrade")
+
+governor.register("particle_scale", (1.0, 0.5, 0.25), set_particle_scale)
+governor.register("minimap_interval", (1, 5, 15))         # Frames between minimap redraws
+governor.register("replan_scale", (1, 2, 3))              # Multiplier on enemy path replanning intervals
+governor.register("rotation_step", (1, 6, 15), set_rotation_step)
+governor.register("health_bars", (True, False))
+governor.listeners.append(report_quality_change)
+
+# ------------------------
+# Pipelined Frames
+# ------------------------
+# With --threaded, a worker thread simulates the next frame while the main
+# thread draws a snapshot of the last one (see game/simthread.py)
+frame_buffer = DoubleBuffer(FrameSnapshot)
+
+def simulate_and_capture():
+    """
+    Runs every phase but render, then captures what to draw (simulation thread).
+    """
+    pipeline.run(render=False)
+    frame_buffer.back.capture(camera, all_sprites_group, enemy_group if governor.value("health_bars") else ())
+
+def run_pipelined_frame():
+    """
+    Simulates the next frame on the simulation thread while drawing the last
+    one, then swaps the snapshots and draws the particles, lighting and HUD
+    from the new state, with the drawn snapshot's health bars under the HUD.
+    """
+    drawn = frame_buffer.front
+    simulation_thread.start_frame()
+    with profiler.scope("render"):
+        drawn.draw(screen)
+    simulation_thread.wait()
+    frame_buffer.swap()
+    render_particles()
+    render_lighting()
+    drawn.draw_health_bars(screen, draw_enemy_health_bar)      # Still intact: the worker refills it next frame
+    for system in hud_systems:
+        system()
+
+simulation_thread = None
+if THREADED_SIMULATION:
+    if render_backend.name == "surface":
+        simulation_thread = SimulationThread(simulate_and_capture)
+    else:
+        print("--threaded needs the full-resolution surface renderer; simulating on the main thread")
+
+# ------------------------
+# Game Loop
+# ------------------------
+if __name__ == "__main__":
+    while running:
+        if show_menu:
+            start_menu()
+            show_menu = False
+            show_story_text(story_events[1])
+
+        profiler.begin_frame()
+        telemetry.begin_frame()
+        governor.begin_frame()
+        render_backend.draw_background(camera, background)
+
+        with profiler.scope("events"):
+            for event in pygame.event.get():
+                if event.type in KEY_STATE_EVENTS:
+                    forget_keys()
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_m:
+                    show_minimap = not show_minimap
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                    profiler.export()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                    snapshot.save(sys.modules[__name__], QUICKSAVE_PATH)
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F9 and os.path.exists(QUICKSAVE_PATH):
+                    snapshot.load(sys.modules[__name__], QUICKSAVE_PATH)
+                elif event.type == pygame.USEREVENT:
+                    player.speed = 5  # Reset bat speed
+
+        # Room discovery logic
+        session.discovered_areas.add(player.current_room)
+
+        # Handle wave transitions and victory
+        if (len(enemy_group) == 0 and wave_director.finished() and
+                not session.room_cleared and not session.waiting_for_next_wave):
+            if session.current_wave > MAX_WAVES and not ENDLESS_MODE:
+                if victory_screen():
+                    # Reset state for replay
+                    session.reset()
+                    enemies = spawn_enemies(session.current_wave)
+                else:
+                    running = False
             else:
-                chosen_upgrade = show_upgrades()
-                if chosen_upgrade:
-                    show_story_text(f"New ability gained: {chosen_upgrade.replace('_', ' ').title()}")
-                current_wave += 1
-                enemies = spawn_enemies(current_wave)
-
-            room_cleared = False
-            waiting_for_next_wave = False
-
-    # Show minimap if toggled
-    if show_minimap:
-        minimap_surface = pygame.Surface((200, 200), pygame.SRCALPHA)
-        minimap_surface.fill((0, 0, 0, 150))
-        rooms = create_room_layout()
-        for room_name, room_rect in rooms.items():
-            mini_rect = pygame.Rect(room_rect.x // 4 + 10, room_rect.y // 4 + 10, room_rect.width // 4, room_rect.height // 4)
-            color = (100, 0, 0) if room_name in discovered_areas else (50, 50, 50)
-            pygame.draw.rect(minimap_surface, color, mini_rect)
-            if room_name == player.current_room:
-                pygame.draw.rect(minimap_surface, (150, 0, 0), mini_rect, 2)
-
-        # Player and enemy dots
-        pygame.draw.circle(minimap_surface, (255, 255, 255), (player.pos.x // 4 + 10, player.pos.y // 4 + 10), 3)
-        for enemy in enemy_group:
-            pygame.draw.circle(minimap_surface, (255, 0, 0), (enemy.rect.centerx // 4 + 10, enemy.rect.centery // 4 + 10), 2)
-
-        screen.blit(minimap_surface, (screen.get_width() - 210, screen.get_height() - 210))
-
-    all_sprites_group.draw(screen)
-    all_sprites_group.update()
-
-    for pickup in pickup_group:
-        pickup.update()
-
-    # Handle player death
-    if player.health <= 0:
-        if game_over_screen(current_wave):
-            # Reset game state on retry
-            player.health = player.max_health
-            player.blood_essence.current = 50
-            player.blood_essence.maximum = 100
-            player.has_dash = player.has_mist_form = player.has_bat_transform = False
-            current_wave = 1
-            room_cleared = False
-            enemies = spawn_enemies(current_wave)
-            discovered_areas = set(["entrance"])
+                session.room_cleared = True
+                session.waiting_for_next_wave = True
+                session.wave_transition_timer = 60
+
+        # Begin next wave after delay
+        if session.waiting_for_next_wave:
+            session.wave_transition_timer -= 1
+            if session.wave_transition_timer <= 0:
+                if session.current_wave in story_events:
+                    show_story_text(story_events[session.current_wave])
+
+                if session.current_wave == MAX_WAVES and not ENDLESS_MODE:
+                    session.current_wave += 1
+                    enemies = spawn_enemies(session.current_wave)
+                else:
+                    chosen_upgrade = show_upgrades()
+                    if chosen_upgrade:
+                        show_story_text(f"New ability gained: {chosen_upgrade.replace('_', ' ').title()}")
+                    session.current_wave += 1
+                    enemies = spawn_enemies(session.current_wave)
+
+                session.room_cleared = False
+                session.waiting_for_next_wave = False
+
+        # Input, AI, movement, collision, cleanup and render phases
+        if simulation_thread is not None:
+            run_pipelined_frame()
         else:
-            running = False
+            pipeline.run()
+        show_queued_story_text()
+
+        # Handle player death
+        if player.health <= 0:
+            telemetry.emit("game_over", wave=session.current_wave)
+            if game_over_screen(session.current_wave):
+                # Reset game state on retry
+                session.reset()
+                enemies = spawn_enemies(session.current_wave)
+            else:
+                running = False
 
-    pygame.display.update()
-    clock.tick(60)
+        profiler.draw(screen)
+        with profiler.scope("display"):
+            render_backend.present()
+        profiler.end_frame()
+        telemetry.end_frame()
+        governor.end_frame()
+        clock.tick(60)